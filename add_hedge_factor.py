@@ -1,59 +1,87 @@
-from langchain_aws import ChatBedrock
-from langchain_core.messages import HumanMessage
-from langgraph.graph import StateGraph, START, END
-import requests
-import json
+import hashlib
 import os
-import re
-import sys
+import threading
+import time
 from typing_extensions import TypedDict
-from typing import Optional
+from typing import List, Optional, Tuple
 from dotenv import load_dotenv
 
+try:
+    from . import hedge_factor_service, telemetry
+    from .intent_cache import get_intent_cache
+    from .intent_parser import parse_hedge_factor_command, split_instructions
+    from .llm_json import extract_rows, find_object
+except ImportError:
+    import hedge_factor_service
+    import telemetry
+    from intent_cache import get_intent_cache
+    from intent_parser import parse_hedge_factor_command, split_instructions
+    from llm_json import extract_rows, find_object
+
 load_dotenv(override=True)
 
+logger = telemetry.get_logger(__name__)
+
+# Commands parsed locally with at least this confidence skip the LLM call
+LOCAL_PARSE_CONFIDENCE = float(os.getenv("HEDGE_FACTOR_LOCAL_PARSE_CONFIDENCE", "0.8"))
+
+# Largest batch accepted by /api/chat/batch (lines the local parser cannot resolve share one LLM request)
+CHAT_BATCH_MAX_LINES = int(os.getenv("HEDGE_FACTOR_CHAT_BATCH_MAX_LINES", "200"))
+
 # Step 1. Define LLM (lazy initialization to avoid blocking on import)
-print("Initializing ChatBedrock LLM...")
-try:
-    llm = ChatBedrock(
-        model_id="amazon.nova-lite-v1:0",
-        region_name=os.getenv("AWS_REGION", "us-east-1"),
-        model_kwargs={"temperature": 0.7, "maxTokens": 512},
+LLM_MODEL_ID = "amazon.nova-lite-v1:0"
+# Room for a batch of instructions in one response; single commands use a few dozen tokens
+LLM_MAX_OUTPUT_TOKENS = 2048
+
+_llm = None
+_agent = None
+_init_lock = threading.RLock()
+
+
+def get_llm():
+    """Create the chat model on first use (thread-safe); calls go through the shared LLM gateway."""
+    global _llm
+    if _llm is None:
+        with _init_lock:
+            if _llm is None:
+                try:
+                    from .llm_gateway import get_llm_gateway
+                except ImportError:
+                    from llm_gateway import get_llm_gateway
+                _llm = get_llm_gateway().chat_model("add_hedge_factor", LLM_MODEL_ID, LLM_MAX_OUTPUT_TOKENS)
+    return _llm
+
+# Step 2. Define function (tool) to update the hedge factor
+# Runs in-process by default; HEDGE_FACTOR_API_MODE=remote posts to HEDGE_FACTOR_API_URL instead.
+def _log_update(sellerNumber: str, hedgeFactor: float) -> None:
+    logger.info(
+        "Updating hedge factor",
+        extra={"mode": hedge_factor_service.API_MODE, "sellerNumber": sellerNumber, "hedgeFactor": hedgeFactor},
     )
-    print("ChatBedrock LLM initialized successfully")
-except Exception as e:
-    print(f"Error initializing ChatBedrock: {e}", file=sys.stderr)
-    raise
 
-# Step 2. Define function (tool) to call API
 def call_hedge_factor_api(sellerNumber: str, hedgeFactor: float):
-    print("Calling hedge factor API...")
-    payload = {
-        "sellerNumber": sellerNumber,
-        "hedgeFactor": hedgeFactor
-    }
-    print("Payload:", payload)
+    _log_update(sellerNumber, hedgeFactor)
+    return hedge_factor_service.apply_hedge_factor_update(sellerNumber, hedgeFactor)
 
-    # Replace with your actual API endpoint
-    api_port = os.getenv("API_PORT", "8000")
-    url = f"http://localhost:{api_port}/api/update-hedge-factor"
-    response = requests.post(url, json=payload)
-    return response.json()
+async def acall_hedge_factor_api(sellerNumber: str, hedgeFactor: float):
+    _log_update(sellerNumber, hedgeFactor)
+    return await hedge_factor_service.aapply_hedge_factor_update(sellerNumber, hedgeFactor)
 
 # Step 3. Define the state
 class AgentState(TypedDict):
     input: str
     sellerNumber: Optional[str]
     hedgeFactor: Optional[float]
+    # Set when one command names several sellers, e.g. "sellers 1 and 2 to 25bps"
+    instructions: Optional[List[dict]]
+    parse_method: Optional[str]
     api_response: Optional[dict]
+    # Batch requests (/api/chat/batch): one input per line, parsed and applied together
+    inputs: Optional[List[str]]
+    line_results: Optional[List[dict]]
 
 # Step 4. Define graph nodes
-def parse_user_input(state: AgentState) -> AgentState:
-    """Use the LLM to extract structured info from user input."""
-    print("Parsing user input...")
-    user_input = state.get("input", "")
-
-    prompt = f"""Extract the seller number and hedge factor (in bps) from the text below:
+PARSE_PROMPT_TEMPLATE = """Extract the seller number and hedge factor (in bps) from the text below:
 "{user_input}"
 
 Return ONLY valid JSON in this exact format (no markdown, no code blocks, no explanation):
@@ -65,62 +93,367 @@ Important:
 - sellerNumber should be a string
 - hedgeFactor should be a decimal number
 """
+
+BATCH_PARSE_PROMPT_TEMPLATE = """Extract the seller number and hedge factor (in bps) from each numbered line below.
+
+Lines:
+{numbered}
+
+Return ONLY valid JSON in this exact format (no markdown, no code blocks, no explanation):
+{{"results": [{{"line": 1, "sellerNumber": "123450001", "hedgeFactor": 0.0025}}]}}
+
+Important:
+- One object per seller; a line that names several sellers gets several objects with the same line number
+- Skip lines that do not set a hedge factor
+- Convert basis points to decimal form (25bps = 0.0025, 100bps = 0.01)
+- sellerNumber should be a string
+- hedgeFactor should be a decimal number
+"""
+
+# Cached intents are only reused while both prompts and the model stay the same
+PROMPT_VERSION = hashlib.sha256((PARSE_PROMPT_TEMPLATE + BATCH_PARSE_PROMPT_TEMPLATE).encode()).hexdigest()[:12]
+
+
+def _intent_version() -> str:
+    return f"{PROMPT_VERSION}:{get_llm().model_id}"
+
+def _with_instructions(state: AgentState, instructions: List[dict], parse_method: str) -> AgentState:
+    return {
+        **state,
+        "sellerNumber": instructions[0]["sellerNumber"],
+        "hedgeFactor": instructions[0]["hedgeFactor"],
+        "instructions": instructions if len(instructions) > 1 else None,
+        "parse_method": parse_method,
+    }
+
+def _parse_locally(state: AgentState) -> Optional[AgentState]:
+    instructions, confidence = parse_hedge_factor_command(state.get("input", ""))
+    if not instructions or confidence < LOCAL_PARSE_CONFIDENCE:
+        return None
+    logger.info("Parsed locally", extra={"confidence": round(confidence, 2), "instructions": instructions})
+    return _with_instructions(state, instructions, "local")
+
+def _cached_intent(text: str) -> Optional[List[dict]]:
+    """Instructions an earlier LLM parse extracted from the same (normalized) command."""
+    cache = get_intent_cache()
+    return cache.get(text, _intent_version()) if cache is not None else None
+
+def _remember_intent(text: str, instructions: List[dict]) -> None:
+    """Cache LLM-parsed instructions, unless they would be rejected anyway (those are not worth replaying)."""
+    cache = get_intent_cache()
+    if cache is None or not instructions:
+        return
+    try:
+        for instruction in instructions:
+            hedge_factor_service.validate_hedge_factor_update(instruction["sellerNumber"], instruction["hedgeFactor"])
+    except ValueError:
+        return
+    cache.set(text, _intent_version(), instructions)
+
+def _parse_from_cache(state: AgentState) -> Optional[AgentState]:
+    instructions = _cached_intent(state.get("input", ""))
+    if not instructions:
+        return None
+    logger.info("Parsed from intent cache", extra={"instructions": instructions})
+    return _with_instructions(state, instructions, "cache")
+
+def _build_parse_messages(user_input: str):
+    from langchain_core.messages import HumanMessage
+
     # ChatBedrock expects a list of messages
-    response = llm.invoke([HumanMessage(content=prompt)])
+    return [HumanMessage(content=PARSE_PROMPT_TEMPLATE.format(user_input=user_input))]
+
+def _apply_llm_response(state: AgentState, response) -> AgentState:
     response_text = response.content.strip()
-    
-    # Try to extract JSON from the response (handle markdown code blocks)
-    if "```" in response_text:
-        # Extract JSON from markdown code block
-        json_match = re.search(r'```(?:json)?\s*(\{.*?\})\s*```', response_text, re.DOTALL)
-        if json_match:
-            response_text = json_match.group(1)
-    elif response_text.startswith("{") and response_text.endswith("}"):
-        # Already JSON
-        pass
-    else:
-        # Try to find JSON object in the text
-        json_match = re.search(r'\{[^{}]*"sellerNumber"[^{}]*"hedgeFactor"[^{}]*\}', response_text)
-        if json_match:
-            response_text = json_match.group(0)
-    
-    print(f"LLM response: {response_text}")
-    
-    try:
-        structured = json.loads(response_text)
-    except json.JSONDecodeError as e:
-        print(f"JSON decode error: {e}")
-        print(f"Response text: {response_text}")
+    logger.debug("LLM response", extra={"response": response_text[:500]})
+
+    # Tolerates code fences, prose around the JSON and extra objects
+    structured = find_object(response_text, ("sellerNumber", "hedgeFactor"))
+    if structured is None:
+        logger.warning("No hedge factor object in LLM response", extra={"response": response_text[:500]})
         raise ValueError(f"Failed to parse LLM response as JSON: {response_text}")
-    
+
+    seller_number = structured.get("sellerNumber")
+    hedge_factor = structured.get("hedgeFactor")
+    try:
+        hedge_factor = float(hedge_factor)
+    except (TypeError, ValueError):
+        raise ValueError(f"LLM returned a non-numeric hedgeFactor: {hedge_factor!r}")
+
+    seller_number = None if seller_number is None else str(seller_number)
+    _remember_intent(state.get("input", ""), [{"sellerNumber": seller_number, "hedgeFactor": hedge_factor}])
     # Return updated state
     return {
         **state,
-        "sellerNumber": structured.get("sellerNumber"),
-        "hedgeFactor": structured.get("hedgeFactor"),
+        "sellerNumber": seller_number,
+        "hedgeFactor": hedge_factor,
+        "parse_method": "llm",
+    }
+
+def _build_batch_parse_messages(lines: List[Tuple[int, str]]):
+    from langchain_core.messages import HumanMessage
+
+    numbered = "\n".join(f"{line_number}. {text}" for line_number, text in lines)
+    return [HumanMessage(content=BATCH_PARSE_PROMPT_TEMPLATE.format(numbered=numbered))]
+
+def _parse_batch_locally(state: AgentState) -> Tuple[List[dict], List[int]]:
+    """Per-line results with locally parsed (or cached) instructions, and the indexes left for the LLM."""
+    line_results = []
+    unresolved = []
+    for index, text in enumerate(state.get("inputs") or []):
+        instructions, confidence = parse_hedge_factor_command(text)
+        parse_method = "local" if instructions and confidence >= LOCAL_PARSE_CONFIDENCE else None
+        if parse_method is None:
+            instructions = _cached_intent(text)
+            parse_method = "cache" if instructions else None
+        line_results.append({
+            "index": index,
+            "input": text,
+            "parse_method": parse_method,
+            "instructions": instructions if parse_method else [],
+            "error": None,
+        })
+        if parse_method is None:
+            unresolved.append(index)
+    logger.info("Parsed batch locally", extra={"lines": len(line_results), "unresolved": len(unresolved)})
+    return line_results, unresolved
+
+def _apply_batch_llm_response(line_results: List[dict], unresolved: List[int], response) -> None:
+    """Attach LLM-parsed instructions to the unresolved lines (line numbers are 1-based batch positions)."""
+    pending = set(unresolved)
+    for obj in extract_rows(response.content, key="results"):
+        try:
+            index = int(obj.get("line")) - 1
+            hedge_factor = float(obj.get("hedgeFactor"))
+        except (TypeError, ValueError):
+            continue
+        seller_number = obj.get("sellerNumber")
+        if index not in pending or seller_number is None:
+            continue
+        line_results[index]["instructions"].append({"sellerNumber": str(seller_number), "hedgeFactor": hedge_factor})
+        line_results[index]["parse_method"] = "llm"
+    for index in unresolved:
+        _remember_intent(line_results[index]["input"], line_results[index]["instructions"])
+
+def _finish_batch_parse(state: AgentState, line_results: List[dict], unresolved: List[int], error: Optional[Exception]) -> AgentState:
+    for index in unresolved:
+        if not line_results[index]["instructions"]:
+            line_results[index]["error"] = (
+                f"LLM parse failed: {error}" if error else "Could not find a seller number and hedge factor"
+            )
+    return {**state, "line_results": line_results, "parse_method": "batch"}
+
+def _parse_batch(state: AgentState) -> AgentState:
+    line_results, unresolved = _parse_batch_locally(state)
+    error = None
+    if unresolved:
+        lines = [(index + 1, line_results[index]["input"]) for index in unresolved]
+        try:
+            _apply_batch_llm_response(line_results, unresolved, _invoke_llm(_build_batch_parse_messages(lines)))
+        except Exception as e:
+            logger.warning("Batch LLM parse failed", extra={"error": str(e)})
+            error = e
+    return _finish_batch_parse(state, line_results, unresolved, error)
+
+async def _aparse_batch(state: AgentState) -> AgentState:
+    line_results, unresolved = _parse_batch_locally(state)
+    error = None
+    if unresolved:
+        lines = [(index + 1, line_results[index]["input"]) for index in unresolved]
+        try:
+            _apply_batch_llm_response(line_results, unresolved, await _ainvoke_llm(_build_batch_parse_messages(lines)))
+        except Exception as e:
+            logger.warning("Batch LLM parse failed", extra={"error": str(e)})
+            error = e
+    return _finish_batch_parse(state, line_results, unresolved, error)
+
+def _invoke_llm(messages):
+    started = time.perf_counter()
+    try:
+        response = get_llm().invoke(messages)
+    except Exception:
+        telemetry.record_llm_call("add_hedge_factor", LLM_MODEL_ID, time.perf_counter() - started, error=True)
+        raise
+    telemetry.record_llm_call("add_hedge_factor", LLM_MODEL_ID, time.perf_counter() - started, response)
+    return response
+
+async def _ainvoke_llm(messages):
+    started = time.perf_counter()
+    try:
+        response = await get_llm().ainvoke(messages)
+    except Exception:
+        telemetry.record_llm_call("add_hedge_factor", LLM_MODEL_ID, time.perf_counter() - started, error=True)
+        raise
+    telemetry.record_llm_call("add_hedge_factor", LLM_MODEL_ID, time.perf_counter() - started, response)
+    return response
+
+def parse_user_input(state: AgentState) -> AgentState:
+    """Extract structured info from user input: locally, from the intent cache, otherwise with the LLM."""
+    if state.get("inputs") is not None:
+        return _parse_batch(state)
+    parsed = _parse_locally(state) or _parse_from_cache(state)
+    if parsed is not None:
+        return parsed
+    response = _invoke_llm(_build_parse_messages(state.get("input", "")))
+    return _apply_llm_response(state, response)
+
+async def aparse_user_input(state: AgentState) -> AgentState:
+    """Async variant of parse_user_input so the LLM call does not block the event loop."""
+    if state.get("inputs") is not None:
+        return await _aparse_batch(state)
+    parsed = _parse_locally(state) or _parse_from_cache(state)
+    if parsed is not None:
+        return parsed
+    response = await _ainvoke_llm(_build_parse_messages(state.get("input", "")))
+    return _apply_llm_response(state, response)
+
+def _batch_rows(line_results: List[dict]) -> Tuple[List[dict], List[dict]]:
+    """Flatten parsed instructions into bulk update rows, remembering which line each came from."""
+    rows, owners = [], []
+    for line in line_results:
+        for instruction in line["instructions"]:
+            rows.append({"sellerNumber": instruction["sellerNumber"], "hedgeFactor": instruction["hedgeFactor"]})
+            owners.append(line)
+    return rows, owners
+
+def _batch_response(line_results: List[dict], rows: List[dict], owners: List[dict], bulk: Optional[dict]) -> dict:
+    """One result per instruction (and per line that yielded none), plus counts."""
+    row_results = (bulk or {}).get("results") or []
+    failure = (bulk or {}).get("detail") or "Bulk update failed"  # remote errors come back as {"detail": ...}
+    results = []
+    for position, (row, line) in enumerate(zip(rows, owners)):
+        row_result = row_results[position] if position < len(row_results) else {}
+        results.append({
+            "index": line["index"],
+            "input": line["input"],
+            "parse_method": line["parse_method"],
+            "sellerNumber": row["sellerNumber"],
+            "hedgeFactor": row["hedgeFactor"],
+            "status": row_result.get("status", "rejected"),
+            "error": row_result.get("error") if row_result else str(failure),
+        })
+    for line in line_results:
+        if not line["instructions"]:
+            results.append({
+                "index": line["index"],
+                "input": line["input"],
+                "parse_method": line["parse_method"],
+                "sellerNumber": None,
+                "hedgeFactor": None,
+                "status": "unparsed",
+                "error": line["error"],
+            })
+    results.sort(key=lambda result: result["index"])
+
+    updated = sum(result["status"] == "updated" for result in results)
+    return {
+        "status": "success" if updated == len(results) else ("partial" if updated else "failed"),
+        "lines": len(line_results),
+        "instructions": len(rows),
+        "updated": updated,
+        "rejected": sum(result["status"] == "rejected" for result in results),
+        "unparsed": sum(result["status"] == "unparsed" for result in results),
+        "results": results,
     }
 
 def call_api_node(state: AgentState) -> AgentState:
+    line_results = state.get("line_results")
+    if line_results is not None:
+        # Batch: every parsed instruction in one bulk write
+        rows, owners = _batch_rows(line_results)
+        bulk = hedge_factor_service.apply_bulk_update(rows) if rows else None
+        return {**state, "api_response": _batch_response(line_results, rows, owners, bulk)}
+
+    instructions = state.get("instructions")
+    if instructions:
+        results = [
+            call_hedge_factor_api(instruction["sellerNumber"], instruction["hedgeFactor"])
+            for instruction in instructions
+        ]
+        return {
+            **state,
+            "api_response": {"status": "success", "results": results},
+        }
+
     result = call_hedge_factor_api(state["sellerNumber"], state["hedgeFactor"])
     return {
         **state,
         "api_response": result,
     }
 
+async def acall_api_node(state: AgentState) -> AgentState:
+    line_results = state.get("line_results")
+    if line_results is not None:
+        rows, owners = _batch_rows(line_results)
+        bulk = await hedge_factor_service.aapply_bulk_update(rows) if rows else None
+        return {**state, "api_response": _batch_response(line_results, rows, owners, bulk)}
+
+    instructions = state.get("instructions")
+    if instructions:
+        results = [
+            await acall_hedge_factor_api(instruction["sellerNumber"], instruction["hedgeFactor"])
+            for instruction in instructions
+        ]
+        return {
+            **state,
+            "api_response": {"status": "success", "results": results},
+        }
+
+    result = await acall_hedge_factor_api(state["sellerNumber"], state["hedgeFactor"])
+    return {
+        **state,
+        "api_response": result,
+    }
+
 # Step 5. Build graph
-graph = StateGraph(AgentState)
-graph.add_node("parse_user_input", parse_user_input)
-graph.add_node("call_api_node", call_api_node)
-graph.add_edge(START, "parse_user_input")
-graph.add_edge("parse_user_input", "call_api_node")
-graph.add_edge("call_api_node", END)
+def build_agent():
+    from langchain_core.runnables import RunnableLambda
+    from langgraph.graph import StateGraph, START, END
+
+    def node(name, func, afunc):
+        # Each node run is recorded as a span (duration histogram + OpenTelemetry span)
+        return RunnableLambda(
+            telemetry.traced_node("add_hedge_factor", name, func),
+            afunc=telemetry.traced_node("add_hedge_factor", name, afunc),
+        )
+
+    graph = StateGraph(AgentState)
+    graph.add_node("parse_user_input", node("parse_user_input", parse_user_input, aparse_user_input))
+    graph.add_node("call_api_node", node("call_api_node", call_api_node, acall_api_node))
+    graph.add_edge(START, "parse_user_input")
+    graph.add_edge("parse_user_input", "call_api_node")
+    graph.add_edge("call_api_node", END)
+    return graph.compile()
+
+# Step 6. Compile on first use (thread-safe)
+def get_agent():
+    global _agent
+    if _agent is None:
+        with _init_lock:
+            if _agent is None:
+                _agent = build_agent()
+    return _agent
+
+def agent_initialized() -> bool:
+    return _agent is not None
+
+def warm_up(include_llm: bool = True) -> None:
+    """Compile the graph (and optionally create the LLM client) before the first chat request."""
+    get_agent()
+    if include_llm:
+        get_llm()
 
-# Step 6. Compile
-agent = graph.compile()
+def __getattr__(name: str):
+    # Backwards-compatible module attributes for the lazily created objects
+    if name == "llm":
+        return get_llm()
+    if name == "agent":
+        return get_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Step 7. Run example
 # if __name__ == "__main__":
-#     result = agent.invoke({
+#     result = get_agent().invoke({
 #         "input": "add a hedge factor of 25bps for seller number 123450001"
 #     })
 #     print("API Result:", result["api_response"])
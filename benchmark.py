@@ -0,0 +1,174 @@
+"""
+Microbenchmarks for the report pipeline, run against the local Bedrock stand-in.
+
+Times LLM factor generation (chunking, prompts, response parsing and merging,
+with a zero-latency FakeChatBedrock, from whole and from streamed responses),
+response parsing and validation alone
+(clean and damaged responses), both chart
+renderers and _encode_image_base64 at several portfolio sizes. Save a run with
+--save and compare a later run against it with --baseline; the script exits
+non-zero when any median regresses by more than --max-regression.
+
+Usage: python benchmark.py [--sizes 100,1000,10000,100000] [--repeat 5]
+                           [--only chart] [--save bench.json]
+                           [--baseline bench.json] [--max-regression 0.25]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+
+DEFAULT_SIZES = (100, 1000, 10000, 100000)
+DEFAULT_REPEAT = int(os.getenv("BENCHMARK_REPEAT", "5"))
+# Runs are cut short once a benchmark has used this much time at one size
+TIME_BUDGET_SECONDS = float(os.getenv("BENCHMARK_TIME_BUDGET", "30"))
+
+
+def make_sellers(count: int, seed: int = 7) -> List[Dict[str, float]]:
+    """Synthetic portfolio with the same Id shape as data/mocked_sellers.csv."""
+    rng = np.random.default_rng(seed)
+    rates = np.round(rng.beta(5, 1.5, count), 2).tolist()
+    return [{"Id": f"{index:03d}ABC{index % 10}", "rt": rate} for index, rate in enumerate(rates)]
+
+
+def _setup(size: int):
+    """Return {benchmark name: zero-argument callable} for one portfolio size."""
+    import gen_hedge_factor_for_sellers as gen
+    from fake_bedrock import FakeChatBedrock
+    from seller_batch import SellerBatch
+    from hedge_factor_engine import compute_factors
+
+    sellers = make_sellers(size)
+    batch = SellerBatch.from_records(sellers)
+    output = batch.with_factors(np.round(compute_factors(batch.rt), 2))
+
+    fake = FakeChatBedrock()
+    gen._llm = fake  # zero latency (timings still include the stand-in building its JSON)
+    chunks = gen.chunk_sellers(sellers)
+    responses = [fake.invoke(gen._build_factor_messages(chunk)).content for chunk in chunks]
+
+    def generate_factors():
+        gen.LLM_STREAMING = False
+        gen.generate_factors({"sellers": sellers})
+
+    def generate_factors_streaming():
+        # Same work, consumed as streamed pieces (per-piece overhead of the streaming path)
+        gen.LLM_STREAMING = True
+        gen.generate_factors({"sellers": sellers})
+
+    # Prose around the JSON and a cut-off tail force the incremental salvage path
+    damaged = [f"Here are the factors:\n{text[:-40]}" for text in responses]
+
+    def parse_factor_response():
+        for chunk, text in zip(chunks, responses):
+            gen._new_collector(chunk).add_text(text)
+
+    def salvage_factor_response():
+        for chunk, text in zip(chunks, damaged):
+            gen._new_collector(chunk).add_text(text)
+
+    def distribution_chart():
+        gen.generate_distribution_chart(output, save_path=None, show_plot=False, dpi=100)
+
+    def standard_deviation_chart():
+        gen.generate_standard_deviation_chart(output, save_path=None, show_plot=False, dpi=100)
+
+    image_path = os.path.join(tempfile.mkdtemp(prefix="hedge-bench-"), "chart.png")
+    gen.generate_distribution_chart(output, save_path=image_path, show_plot=False, dpi=100)
+
+    def encode_image_base64():
+        gen._encode_image_base64(image_path)
+
+    return {
+        "generate_factors": generate_factors,
+        "generate_factors_streaming": generate_factors_streaming,
+        "parse_factor_response": parse_factor_response,
+        "salvage_factor_response": salvage_factor_response,
+        "distribution_chart": distribution_chart,
+        "standard_deviation_chart": standard_deviation_chart,
+        "encode_image_base64": encode_image_base64,
+    }
+
+
+def time_call(func: Callable[[], None], repeat: int) -> Dict[str, float]:
+    func()  # warm-up (imports, caches)
+    samples: List[float] = []
+    budget_end = time.perf_counter() + TIME_BUDGET_SECONDS
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+        if time.perf_counter() > budget_end:
+            break
+    return {
+        "runs": len(samples),
+        "min": min(samples),
+        "median": statistics.median(samples),
+        "mean": statistics.fmean(samples),
+    }
+
+
+def run(sizes, repeat: int, only: List[str]) -> Dict[str, Dict[str, Dict[str, float]]]:
+    results: Dict[str, Dict[str, Dict[str, float]]] = {}
+    print(f"{'benchmark':<26}{'sellers':>9}{'runs':>6}{'min ms':>12}{'median ms':>12}")
+    for size in sizes:
+        for name, func in _setup(size).items():
+            if only and not any(part in name for part in only):
+                continue
+            stats = time_call(func, repeat)
+            results.setdefault(name, {})[str(size)] = stats
+            print(f"{name:<26}{size:>9}{stats['runs']:>6}{stats['min'] * 1000:>12.2f}{stats['median'] * 1000:>12.2f}")
+    return results
+
+
+def compare(results, baseline, max_regression: float) -> List[str]:
+    """Benchmarks whose median is more than max_regression slower than the baseline."""
+    regressions = []
+    for name, by_size in results.items():
+        for size, stats in by_size.items():
+            before = baseline.get(name, {}).get(size)
+            if not before:
+                continue
+            change = stats["median"] / before["median"] - 1
+            if change > max_regression:
+                regressions.append(f"{name} @ {size}: {before['median'] * 1000:.2f} -> {stats['median'] * 1000:.2f} ms (+{change:.0%})")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)))
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--only", action="append", default=[], help="run benchmarks whose name contains this")
+    parser.add_argument("--save", help="write results as JSON")
+    parser.add_argument("--baseline", help="JSON from an earlier --save to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.25)
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    results = run(sizes, args.repeat, args.only)
+
+    if args.save:
+        with open(args.save, "w") as handle:
+            json.dump(results, handle, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as handle:
+            regressions = compare(results, json.load(handle), args.max_regression)
+        if regressions:
+            print("FAIL: regressions over baseline")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("OK: no regressions over baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
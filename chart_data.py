@@ -0,0 +1,115 @@
+import numpy as np
+from typing import Any, Dict, List, Union
+
+try:
+    from .seller_batch import SellerBatch
+except ImportError:
+    from seller_batch import SellerBatch
+
+FactorRows = Union[SellerBatch, List[Dict[str, float]]]
+
+
+def _valid_points(output_data: FactorRows):
+    """Rates and factors for rows with a positive factor (same filter the charts use)."""
+    valid = SellerBatch.coerce(output_data).positive()
+    return valid.rt, valid.factor
+
+
+def _factor_statistics(factors: np.ndarray) -> Dict[str, Any]:
+    mean = float(np.mean(factors))
+    std = float(np.std(factors))
+    return {
+        "mean": mean,
+        "median": float(np.median(factors)),
+        "std": std,
+        "min": float(factors.min()),
+        "max": float(factors.max()),
+        "range": float(factors.max() - factors.min()),
+        "cv": (std / mean) * 100 if mean else None,
+    }
+
+
+def summary_statistics(output_data: FactorRows) -> Dict[str, Any]:
+    """Count and factor statistics (mean, median, std, min, max, range, cv) over rows with a positive factor."""
+    _, factors = _valid_points(output_data)
+    if factors.size == 0:
+        return {"count": 0}
+    return {"count": int(factors.size), **_factor_statistics(factors)}
+
+
+def distribution_chart_data(output_data: FactorRows) -> Dict[str, Any]:
+    """Data behind the factor vs rate scatter: axis ranges and the linear trend line."""
+    rates, factors = _valid_points(output_data)
+    data: Dict[str, Any] = {"count": int(factors.size), "trend_line": None}
+    if factors.size == 0:
+        return data
+
+    data["factor_range"] = [float(factors.min()), float(factors.max())]
+    data["rate_range"] = [float(rates.min()), float(rates.max())]
+
+    if factors.size > 1 and np.std(rates) > 1e-10 and np.std(factors) > 1e-10:
+        slope, intercept = np.polyfit(factors, rates, 1)  # factors as X, rates as Y
+        data["trend_line"] = {"slope": float(slope), "intercept": float(intercept)}
+    return data
+
+
+def standard_deviation_chart_data(output_data: FactorRows) -> Dict[str, Any]:
+    """Histogram bins with sigma zones, sigma-zone counts and box-plot quartiles."""
+    _, factors = _valid_points(output_data)
+    if factors.size < 2:
+        return {"count": int(factors.size)}
+
+    statistics = _factor_statistics(factors)
+    mean, std, median = statistics["mean"], statistics["std"], statistics["median"]
+    q1, q3 = (float(q) for q in np.percentile(factors, [25, 75]))
+
+    # Histogram with the same adaptive bin count as the rendered chart
+    n_bins = min(30, int(np.sqrt(factors.size)))
+    counts, edges = np.histogram(factors, bins=n_bins)
+    centers = (edges[:-1] + edges[1:]) / 2
+    zones = np.select(
+        [np.abs(centers - mean) <= std, np.abs(centers - mean) <= 2 * std, np.abs(centers - mean) <= 3 * std],
+        ["1sigma", "2sigma", "3sigma"],
+        default="beyond_3sigma",
+    )
+
+    # Point counts per sigma band
+    distance = np.abs(factors - mean)
+    sigma_zone_counts = {
+        "within_1sigma": int(np.count_nonzero(distance <= std)),
+        "1_to_2sigma": int(np.count_nonzero((distance > std) & (distance <= 2 * std))),
+        "2_to_3sigma": int(np.count_nonzero((distance > 2 * std) & (distance <= 3 * std))),
+        "beyond_3sigma": int(np.count_nonzero(distance > 3 * std)),
+    }
+
+    # Box-plot whiskers follow matplotlib's default 1.5 * IQR rule
+    iqr = q3 - q1
+    low_limit, high_limit = q1 - 1.5 * iqr, q3 + 1.5 * iqr
+    inside = factors[(factors >= low_limit) & (factors <= high_limit)]
+
+    return {
+        "count": int(factors.size),
+        "statistics": statistics,
+        "histogram": {
+            "bin_edges": edges.tolist(),
+            "counts": counts.tolist(),
+            "zones": zones.tolist(),
+        },
+        "sigma_zone_counts": sigma_zone_counts,
+        "box_plot": {
+            "q1": q1,
+            "median": median,
+            "q3": q3,
+            "whisker_low": float(inside.min()),
+            "whisker_high": float(inside.max()),
+            "outliers": int(factors.size - inside.size),
+        },
+    }
+
+
+def compute_chart_data(output_data: FactorRows) -> Dict[str, Any]:
+    """Everything a client needs to draw both report charts itself."""
+    return {
+        "distribution": distribution_chart_data(output_data),
+        "standard_deviation": standard_deviation_chart_data(output_data),
+    }
@@ -0,0 +1,79 @@
+"""
+Import-time budget check for the API.
+
+Runs `python -X importtime -c "import main"` in a fresh interpreter and fails if
+importing main takes longer than the budget, or if any of the heavy modules that
+should only load on first use (Bedrock client, LangGraph, matplotlib, NumPy) are
+pulled in at import time.
+
+Usage: python check_import_time.py [--budget-ms 1000]
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+DEFAULT_BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", "1000"))
+
+# Modules that must stay lazy (loaded by the first chat/report request or the warm-up hook)
+DEFERRED_MODULES = (
+    "langchain_aws",
+    "langgraph.graph",
+    "matplotlib",
+    "numpy",
+    "gen_hedge_factor_for_sellers",
+    "seller_source",
+)
+
+
+def measure_import(module: str = "main"):
+    """Return (cumulative microseconds for module, set of imported module names)."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=here,
+        capture_output=True,
+        text=True,
+        env={**os.environ, "WARMUP_ON_STARTUP": "false"},
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+
+    cumulative_us = None
+    imported = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line.split("|"))
+        if not cumulative.isdigit():
+            continue  # header row
+        imported.add(name)
+        if name == module:
+            cumulative_us = int(cumulative)
+    return cumulative_us, imported
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    args = parser.parse_args()
+
+    cumulative_us, imported = measure_import("main")
+    elapsed_ms = cumulative_us / 1000
+    eager = [name for name in DEFERRED_MODULES if name in imported]
+
+    print(f"import main: {elapsed_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    ok = True
+    if elapsed_ms > args.budget_ms:
+        print("FAIL: import time over budget")
+        ok = False
+    if eager:
+        print(f"FAIL: modules imported eagerly: {', '.join(eager)}")
+        ok = False
+    if ok:
+        print("OK")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
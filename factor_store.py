@@ -0,0 +1,91 @@
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+try:
+    from .sqlite_pool import SQLiteConnectionPool
+except ImportError:
+    from sqlite_pool import SQLiteConnectionPool
+
+DEFAULT_FACTOR_STORE_PATH = os.getenv("HEDGE_FACTOR_STORE_PATH", os.path.join("cache", "factor_store.sqlite3"))
+
+
+class FactorStore:
+    """
+    Persistent per-seller factor results keyed by Id.
+
+    Each record keeps the last rt the factor was computed from, the per-seller
+    factor (before any portfolio-level rebalancing), when it was computed and
+    by which method/version, so only changed or new sellers need recomputing.
+    """
+
+    def __init__(self, path: str = DEFAULT_FACTOR_STORE_PATH):
+        self.path = path
+        self._pool = SQLiteConnectionPool(
+            path,
+            schema="""
+            CREATE TABLE IF NOT EXISTS seller_factors (
+                Id TEXT PRIMARY KEY,
+                rt REAL NOT NULL,
+                factor REAL NOT NULL,
+                computed_at REAL NOT NULL,
+                method TEXT NOT NULL,
+                version TEXT NOT NULL
+            );
+            """,
+        )
+
+    def get_many(self, ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Return stored records for the given Ids (missing Ids are simply absent)."""
+        ids = [str(seller_id) for seller_id in ids]
+        records: Dict[str, Dict[str, Any]] = {}
+        conn = self._pool.read()
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(ids), 900):
+            batch = ids[start:start + 900]
+            placeholders = ",".join("?" * len(batch))
+            for row in conn.execute(
+                f"SELECT * FROM seller_factors WHERE Id IN ({placeholders})", batch
+            ):
+                records[row["Id"]] = dict(row)
+        return records
+
+    def upsert_many(self, records: List[Dict[str, Any]], method: str, version: str) -> None:
+        """Insert or replace per-seller factors in one transaction."""
+        now = time.time()
+        with self._pool.write() as conn:
+            conn.executemany(
+                """
+                INSERT INTO seller_factors (Id, rt, factor, computed_at, method, version)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(Id) DO UPDATE SET
+                    rt = excluded.rt,
+                    factor = excluded.factor,
+                    computed_at = excluded.computed_at,
+                    method = excluded.method,
+                    version = excluded.version
+                """,
+                [
+                    (str(record["Id"]), float(record["rt"]), float(record["factor"]), now, method, version)
+                    for record in records
+                ],
+            )
+
+    def clear(self) -> None:
+        with self._pool.write() as conn:
+            conn.execute("DELETE FROM seller_factors")
+
+
+_factor_store: Optional[FactorStore] = None
+_factor_store_lock = threading.Lock()
+
+
+def get_factor_store() -> FactorStore:
+    """Return the process-wide factor store."""
+    global _factor_store
+    if _factor_store is None:
+        with _factor_store_lock:
+            if _factor_store is None:
+                _factor_store = FactorStore()
+    return _factor_store
@@ -0,0 +1,186 @@
+"""
+Local stand-in for ChatBedrock, for benchmarks and load tests without AWS.
+
+FakeChatBedrock answers both graphs' prompts with valid JSON: factor prompts get
+one {"Id", "rt", "factor"} row per input seller (factors from the local engine),
+chat prompts get {"sellerNumber", "hedgeFactor"} (one per line for batch prompts). Latency, token throughput and
+failure rate are configurable, and responses carry usage_metadata like Bedrock's.
+Streaming yields the same text in small pieces paced by the token throughput.
+
+Set HEDGE_FACTOR_FAKE_LLM=true to make the LLM gateway (llm_gateway.py) hand both graphs one,
+configured from the HEDGE_FACTOR_FAKE_LLM_* variables below.
+"""
+import asyncio
+import json
+import os
+import random
+import re
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+
+try:
+    from .hedge_factor_engine import interpolate_factors
+except ImportError:
+    from hedge_factor_engine import interpolate_factors
+
+# Sellers appear in the factor prompt as a Python list of dicts: [{'Id': '968ABC8', 'rt': 1.0}, ...]
+_SELLER_PATTERN = re.compile(r"'Id': '([^']*)', 'rt': ([^,}]+)")
+_CHAT_INPUT_PATTERN = re.compile(r'from the text below:\s*"(.*)"', re.DOTALL)
+_BATCH_LINE_PATTERN = re.compile(r"^(\d+)\. (.*)$", re.MULTILINE)
+_SELLER_NUMBER_PATTERN = re.compile(r"\d{5,}")
+_BPS_PATTERN = re.compile(r"(\d+(?:\.\d+)?)\s*(?:bps|bp|basis points)", re.IGNORECASE)
+# Streamed responses arrive in pieces of about this many characters (a few tokens)
+STREAM_PIECE_CHARS = 16
+
+
+class FakeBedrockError(RuntimeError):
+    """Injected failure (stands in for throttling and service errors)."""
+
+
+class FakeChatBedrock(BaseChatModel):
+    model_id: str = "fake-bedrock"
+    # Seconds before the first token, and output tokens per second after it (0 = instant)
+    latency_seconds: float = 0.0
+    tokens_per_second: float = 0.0
+    # Fraction of calls that raise FakeBedrockError
+    failure_rate: float = 0.0
+    seed: Optional[int] = None
+
+    _random: random.Random = PrivateAttr()
+
+    def __init__(self, **kwargs: Any):
+        super().__init__(**kwargs)
+        self._random = random.Random(self.seed)
+
+    @classmethod
+    def from_env(cls) -> "FakeChatBedrock":
+        seed = os.getenv("HEDGE_FACTOR_FAKE_LLM_SEED")
+        return cls(
+            latency_seconds=float(os.getenv("HEDGE_FACTOR_FAKE_LLM_LATENCY", "0.2")),
+            tokens_per_second=float(os.getenv("HEDGE_FACTOR_FAKE_LLM_TPS", "0")),
+            failure_rate=float(os.getenv("HEDGE_FACTOR_FAKE_LLM_FAILURE_RATE", "0")),
+            seed=int(seed) if seed else None,
+        )
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-bedrock"
+
+    def _respond(self, messages: List[BaseMessage]):
+        """Return (response message, simulated duration) or raise an injected failure."""
+        if self.failure_rate and self._random.random() < self.failure_rate:
+            raise FakeBedrockError("Injected Bedrock failure")
+
+        prompt = "\n".join(str(message.content) for message in messages)
+        sellers = _SELLER_PATTERN.findall(prompt)
+        if sellers:
+            rates = [float(rate) for _, rate in sellers]
+            factors = interpolate_factors(rates).round(2).tolist()
+            content = json.dumps(
+                {"output": [{"Id": seller_id, "rt": rate, "factor": factor}
+                            for (seller_id, _), rate, factor in zip(sellers, rates, factors)]}
+            )
+        elif '"results"' in prompt:
+            lines = _BATCH_LINE_PATTERN.findall(prompt.split("Lines:", 1)[-1].split("Return ONLY", 1)[0])
+            content = json.dumps(
+                {"results": [{"line": int(number), **self._parse_chat(text)}
+                             for number, text in lines if _SELLER_NUMBER_PATTERN.search(text)]}
+            )
+        else:
+            content = json.dumps(self._parse_chat(prompt))
+
+        input_tokens = len(prompt) // 4
+        output_tokens = len(content) // 3
+        duration = self.latency_seconds
+        if self.tokens_per_second:
+            duration += output_tokens / self.tokens_per_second
+        message = AIMessage(
+            content=content,
+            usage_metadata={
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens,
+            },
+        )
+        return message, duration
+
+    @staticmethod
+    def _parse_chat(prompt: str) -> dict:
+        match = _CHAT_INPUT_PATTERN.search(prompt)
+        text = match.group(1) if match else prompt
+        seller = _SELLER_NUMBER_PATTERN.search(text)
+        bps = _BPS_PATTERN.search(text)
+        return {
+            "sellerNumber": seller.group(0) if seller else "123450001",
+            "hedgeFactor": float(bps.group(1)) / 10000 if bps else 0.0025,
+        }
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        message, duration = self._respond(messages)
+        if duration:
+            time.sleep(duration)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        message, duration = self._respond(messages)
+        if duration:
+            await asyncio.sleep(duration)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _pieces(self, messages: List[BaseMessage]):
+        """(seconds before the piece, chunk) pairs for a streamed response."""
+        message, _ = self._respond(messages)
+        content = message.content
+        per_char = (1 / 3) / self.tokens_per_second if self.tokens_per_second else 0.0
+        for start in range(0, len(content), STREAM_PIECE_CHARS):
+            piece = content[start:start + STREAM_PIECE_CHARS]
+            last = start + STREAM_PIECE_CHARS >= len(content)
+            # Converse streams content blocks rather than plain strings
+            chunk = AIMessageChunk(
+                content=[{"type": "text", "text": piece, "index": 0}],
+                usage_metadata=message.usage_metadata if last else None,
+            )
+            delay = (self.latency_seconds if start == 0 else 0.0) + len(piece) * per_char
+            yield delay, ChatGenerationChunk(message=chunk)
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        for delay, chunk in self._pieces(messages):
+            if delay:
+                time.sleep(delay)
+            yield chunk
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        for delay, chunk in self._pieces(messages):
+            if delay:
+                await asyncio.sleep(delay)
+            yield chunk
@@ -1,87 +1,81 @@
-from langchain_aws import ChatBedrock
-from langchain_core.messages import HumanMessage
-from langgraph.graph import StateGraph, START, END
+import asyncio
 import json
 import os
-import re
-import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import repeat
 from typing_extensions import TypedDict
-from typing import Optional, List, Dict, Any
+from typing import TYPE_CHECKING, Optional, List, Dict, Any, Callable, Tuple, Union
 from dotenv import load_dotenv
-import matplotlib.pyplot as plt
+from io import BytesIO
 import numpy as np
 import base64
+import hashlib
+
+try:
+    from .chart_data import compute_chart_data
+    from .factor_store import get_factor_store
+    from .hedge_factor_engine import ANCHORS, ENGINE_VERSION, MAX_FACTOR, MIN_FACTOR, compute_factors, interpolate_factors, rebalance_to_target
+    from .llm_json import FactorRowCollector, JSONObjectExtractor
+    from .report_cache import get_report_cache, make_cache_key
+    from .seller_batch import SellerBatch
+    from .seller_source import load_sellers, require_unique_ids
+    from . import telemetry
+except ImportError:
+    from chart_data import compute_chart_data
+    from factor_store import get_factor_store
+    from hedge_factor_engine import ANCHORS, ENGINE_VERSION, MAX_FACTOR, MIN_FACTOR, compute_factors, interpolate_factors, rebalance_to_target
+    from llm_json import FactorRowCollector, JSONObjectExtractor
+    from report_cache import get_report_cache, make_cache_key
+    from seller_batch import SellerBatch
+    from seller_source import load_sellers, require_unique_ids
+    import telemetry
+
+if TYPE_CHECKING:
+    from langchain_core.runnables import RunnableConfig
 
 load_dotenv(override=True)
 
+logger = telemetry.get_logger(__name__)
+
+# Factor generation methods: "engine" (local monotone spline) or "llm" (Bedrock, opt-in)
+FACTOR_METHODS = ("engine", "llm")
+DEFAULT_FACTOR_METHOD = os.getenv("HEDGE_FACTOR_METHOD", "engine").lower()
+
+# Chart output: rendered images, or "data" for precomputed chart data without matplotlib
+CHART_FORMATS = ("png", "webp", "svg", "data")
+CHART_MEDIA_TYPES = {"png": "image/png", "webp": "image/webp", "svg": "image/svg+xml"}
+CHART_FILE_NAMES = {"distribution": "rate_factor_distribution", "standard_deviation": "standard_deviation_chart"}
+MAX_POINT_LABELS = 50
+
 # Step 1. Define LLM (lazy initialization to avoid blocking on import)
-print("Initializing ChatBedrock LLM...")
-try:
-    llm = ChatBedrock(
-        model_id="amazon.nova-lite-v1:0",
-        region_name=os.getenv("AWS_REGION", "us-east-1"),
-        max_tokens=8192,
-        model_kwargs={"temperature": 0.7, "maxTokens": 8192},
-    )
-    print("ChatBedrock LLM initialized successfully")
-except Exception as e:
-    print(f"Error initializing ChatBedrock: {e}", file=sys.stderr)
-    raise
-
-
-# Step 2. Define mocked seller data
-mocked_sellers: List[Dict[str, float]] = [
-#   {"Id": "5829431", "rt": 0.72}, {"Id": "7495812", "rt": 1.0}, {"Id": "2918457", "rt": 0.0}, {"Id": "6321548", "rt": 0.58}, {"Id": "8412570", "rt": 0.11},
-#   {"Id": "7584213", "rt": 1.00}, {"Id": "4598123", "rt": 0.43}, {"Id": "1928564", "rt": 0.37}, {"Id": "5784312", "rt": 0.97}, {"Id": "8942176", "rt": 0.18},
-#   {"Id": "4518972", "rt": 0.34}, {"Id": "3672481", "rt": 0.22}, {"Id": "5782934", "rt": 0.85}, {"Id": "2984715", "rt": 0.79}, {"Id": "6598712", "rt": 0.16},
-#   {"Id": "8419572", "rt": 0.88}, {"Id": "5221893", "rt": 0.57}, {"Id": "1365942", "rt": 0.41}, {"Id": "8425179", "rt": 0.52}, {"Id": "9824156", "rt": 0.14},
-#   {"Id": "7148392", "rt": 0.92}, {"Id": "2548793", "rt": 0.67}, {"Id": "6283719", "rt": 0.05}, {"Id": "4852719", "rt": 0.32}, {"Id": "1947836", "rt": 0.58},
-#   {"Id": "8759432", "rt": 0.83}, {"Id": "9237154", "rt": 0.20}, {"Id": "5914378", "rt": 0.61}, {"Id": "2148795", "rt": 0.45}, {"Id": "4512673", "rt": 0.89},
-#   {"Id": "7146529", "rt": 0.67}, {"Id": "5432918", "rt": 0.56}, {"Id": "9271543", "rt": 0.10}, {"Id": "7834159", "rt": 0.91}, {"Id": "6327198", "rt": 0.85},
-#    {"Id": "7298754", "rt": 0.21}, {"Id": "8214756", "rt": 0.54}, {"Id": "6927518", "rt": 0.17}, {"Id": "8173245", "rt": 0.88}, {"Id": "3259841", "rt": 0.78},
-#    {"Id": "9183275", "rt": 0.36}, {"Id": "4729851", "rt": 0.62}, {"Id": "5839247", "rt": 0.47}, {"Id": "1267945", "rt": 0.09}, {"Id": "4198632", "rt": 0.81},
-#    {"Id": "5824891", "rt": 0.64}, {"Id": "7192845", "rt": 0.42}, {"Id": "7814356", "rt": 0.12}, {"Id": "6238947", "rt": 0.93}, {"Id": "7824596", "rt": 0.58},
-#   {"Id": "2498751", "rt": 0.19}, {"Id": "6731829", "rt": 0.25}, {"Id": "3491827", "rt": 0.55}, {"Id": "2849167", "rt": 0.90}, {"Id": "9851742", "rt": 0.35},
-#   {"Id": "4573189", "rt": 0.74}, {"Id": "6214793", "rt": 0.65}, {"Id": "9152748", "rt": 0.08}, {"Id": "7482195", "rt": 0.91}, {"Id": "2915748", "rt": 0.47},
-#   {"Id": "4723816", "rt": 0.43}, {"Id": "5837294", "rt": 0.21}, {"Id": "3214879", "rt": 0.14}, {"Id": "5182947", "rt": 0.70}, {"Id": "2718594", "rt": 0.91},
-#   {"Id": "7826543", "rt": 0.50}, {"Id": "3492857", "rt": 0.48}, {"Id": "2684789", "rt": 0.79}, {"Id": "3491852", "rt": 0.44}, {"Id": "7812459", "rt": 0.53},
-#   {"Id": "5692831", "rt": 0.60}, {"Id": "1823467", "rt": 0.31}, {"Id": "3247859", "rt": 0.25}, {"Id": "5496321", "rt": 0.70}, {"Id": "7429815", "rt": 0.84},
-#   {"Id": "1857349", "rt": 0.63}, {"Id": "6728493", "rt": 0.26}, {"Id": "2378451", "rt": 0.49}, {"Id": "4817362", "rt": 0.77}, {"Id": "7493812", "rt": 0.12},
-#   {"Id": "5987432", "rt": 0.92}, {"Id": "2084759", "rt": 0.15}, {"Id": "1257893", "rt": 0.66}, {"Id": "7481629", "rt": 0.23}, {"Id": "5684231", "rt": 0.10},
-#   {"Id": "2138496", "rt": 0.94}, {"Id": "9632584", "rt": 0.41}, {"Id": "4723961", "rt": 0.78}, {"Id": "7834521", "rt": 0.67}, {"Id": "1248693", "rt": 0.33},
-#   {"Id": "9127845", "rt": 0.69}, {"Id": "4738216", "rt": 0.82}, {"Id": "3647928", "rt": 0.07}, {"Id": "5784921", "rt": 0.51}, {"Id": "9174825", "rt": 0.25},
-#   {"Id": "2894715", "rt": 0.74}, {"Id": "3857429", "rt": 0.03}, {"Id": "4258673", "rt": 0.91}, {"Id": "5714398", "rt": 0.86}, {"Id": "3714259", "rt": 0.19},
-#   {"Id": "8624173", "rt": 0.60}, {"Id": "5146287", "rt": 0.21}, {"Id": "6784329", "rt": 0.41}, {"Id": "2147865", "rt": 0.38}, {"Id": "3852164", "rt": 0.85},
-#   {"Id": "7954238", "rt": 0.17}, {"Id": "2914876", "rt": 0.76}, {"Id": "6283957", "rt": 0.79}, {"Id": "5314789", "rt": 0.44}, {"Id": "1825947", "rt": 0.34},
-#   {"Id": "7324895", "rt": 0.63}, {"Id": "1987354", "rt": 0.98}, {"Id": "6184732", "rt": 0.52}, {"Id": "7184259", "rt": 0.33}, {"Id": "4587129", "rt": 0.64},
-#   {"Id": "5714926", "rt": 0.49}, {"Id": "1938746", "rt": 0.25}, {"Id": "9324781", "rt": 0.56}, {"Id": "2497185", "rt": 0.85}, {"Id": "5671843", "rt": 0.17},
-#   {"Id": "1237548", "rt": 0.70}, {"Id": "4831752", "rt": 0.73}, {"Id": "7148932", "rt": 0.37}, {"Id": "5871349", "rt": 0.11}, {"Id": "9847213", "rt": 0.59},
-#   {"Id": "3187429", "rt": 0.40}, {"Id": "9624715", "rt": 0.21}, {"Id": "5618742", "rt": 0.91}, {"Id": "7421853", "rt": 0.65}, {"Id": "3857194", "rt": 0.34},
-#   {"Id": "8914725", "rt": 0.84}, {"Id": "3687425", "rt": 0.02}, {"Id": "4056739", "rt": 0.70}, {"Id": "9123458", "rt": 0.16}, {"Id": "5371489", "rt": 0.28},
-#   {"Id": "2348175", "rt": 0.52}, {"Id": "1394728", "rt": 0.93}, {"Id": "2475819", "rt": 0.48}, {"Id": "7418539", "rt": 0.54}, {"Id": "6739241", "rt": 0.49},
-#   {"Id": "2984375", "rt": 0.35}, {"Id": "5417692", "rt": 0.61}, {"Id": "3962784", "rt": 0.47}, {"Id": "7583496", "rt": 0.92}, {"Id": "3418752", "rt": 0.39},
-#   {"Id": "5869712", "rt": 0.66}, {"Id": "7251938", "rt": 0.83}, {"Id": "9841573", "rt": 0.73}, {"Id": "5628941", "rt": 0.50}, {"Id": "2849571", "rt": 0.28},
-#   {"Id": "4198573", "rt": 0.06}, {"Id": "7516329", "rt": 0.55}, {"Id": "8145729", "rt": 0.16}, {"Id": "2459861", "rt": 0.94}, {"Id": "1736852", "rt": 0.78},
-#   {"Id": "5692417", "rt": 0.42}, {"Id": "3852614", "rt": 0.67}, {"Id": "7928564", "rt": 0.29}, {"Id": "2719468", "rt": 0.12}, {"Id": "4178356", "rt": 0.33},
-#   {"Id": "5386321", "rt": 0.74}, {"Id": "2648195", "rt": 0.21}, {"Id": "7815624", "rt": 0.92}, {"Id": "3498715", "rt": 0.59}, {"Id": "4725869", "rt": 0.62},
-#   {"Id": "6128943", "rt": 0.45}, {"Id": "7594812", "rt": 0.93}, {"Id": "3284175", "rt": 0.84}, {"Id": "9147284", "rt": 0.22}, {"Id": "1087524", "rt": 0.79},
-#   {"Id": "2837546", "rt": 0.64}, {"Id": "7482139", "rt": 0.63}, {"Id": "5091834", "rt": 0.32}, {"Id": "8713549", "rt": 0.15}, {"Id": "6741532", "rt": 0.66},
-#   {"Id": "3594872", "rt": 0.94}, {"Id": "8124569", "rt": 0.48}, {"Id": "4159278", "rt": 0.83}, {"Id": "7538246", "rt": 0.25}, {"Id": "2481576", "rt": 0.52},
-#   {"Id": "3195467", "rt": 0.57}, {"Id": "9176438", "rt": 0.29}, {"Id": "7428639", "rt": 0.58}, {"Id": "6234581", "rt": 0.77}, {"Id": "5193274", "rt": 0.91},
-#   {"Id": "6912748", "rt": 0.46}, {"Id": "2538417", "rt": 0.82}, {"Id": "8947513", "rt": 0.03}, {"Id": "9286471", "rt": 0.49}, {"Id": "6143728", "rt": 0.94},
-#   {"Id": "9176452", "rt": 0.54}, {"Id": "2854691", "rt": 0.68}, {"Id": "1768542", "rt": 0.40}, {"Id": "8421576", "rt": 0.22}, {"Id": "6412573", "rt": 0.51},
-#   {"Id": "7318452", "rt": 0.69}, {"Id": "1795426", "rt": 0.10}, {"Id": "2189763", "rt": 0.88}, {"Id": "4978621", "rt": 0.19}, {"Id": "3514782", "rt": 0.62},
-#   {"Id": "7583624", "rt": 0.76}, {"Id": "8243195", "rt": 0.34}, {"Id": "9527841", "rt": 0.63}, {"Id": "5834672", "rt": 0.95}, {"Id": "3719482", "rt": 0.20},
-#   {"Id": "5148693", "rt": 0.49}, {"Id": "2498573", "rt": 0.71}, {"Id": "6831472", "rt": 0.12}, {"Id": "2315784", "rt": 0.35}, {"Id": "4785163", "rt": 0.66},
-#   {"Id": "5724613", "rt": 0.57}, {"Id": "8134927", "rt": 0.38}, {"Id": "6782519", "rt": 0.90}, {"Id": "2958471", "rt": 0.45}, {"Id": "3671594", "rt": 0.15},
-#   {"Id": "1245789", "rt": 0.77}, {"Id": "3497281", "rt": 0.56}, {"Id": "5849263", "rt": 0.84}, {"Id": "2761948", "rt": 0.53}, {"Id": "9861724", "rt": 0.0},
-# ]
-{"Id":"968ABC8","rt":1.0},{"Id":"156ABC8","rt":1.0},{"Id":"392ABC7","rt":1.0},{"Id":"155ABC8","rt":1.0},{"Id":"29ABC02","rt":1.0},{"Id":"805ABC3","rt":1.0},{"Id":"192ABC9","rt":1.0},{"Id":"039ABC7","rt":0.92},{"Id":"375ABC2","rt":1.0},{"Id":"251ABC3","rt":1.0},{"Id":"64ABC03","rt":1.0},{"Id":"662ABC0","rt":1.0},{"Id":"296ABC2","rt":0.89},{"Id":"226ABC3","rt":0.94},{"Id":"442ABC6","rt":0.92},{"Id":"435ABC3","rt":0.86},{"Id":"804ABC2","rt":1.0},{"Id":"013ABC7","rt":1.0},{"Id":"258ABC5","rt":0.88},{"Id":"8ABC007","rt":1.0},{"Id":"319ABC1","rt":0.69},{"Id":"033ABC4","rt":1.0},{"Id":"509ABC1","rt":0.98},{"Id":"48ABC00","rt":0.82},{"Id":"259ABC7","rt":1.0},{"Id":"681ABC8","rt":1.0},{"Id":"29ABC08","rt":1.0},{"Id":"52ABC07","rt":1.0},{"Id":"846ABC4","rt":0.93},{"Id":"06ABC01","rt":1.0},{"Id":"278ABC1","rt":1.0},{"Id":"953ABC3","rt":0.92},{"Id":"037ABC6","rt":0.76},{"Id":"054ABC9","rt":0.99},{"Id":"166ABC1","rt":0.98},{"Id":"977ABC2","rt":0.98},{"Id":"589ABC7","rt":0.85},{"Id":"722ABC0","rt":1.0},{"Id":"167ABC0","rt":1.0},{"Id":"114ABC5","rt":1.0},{"Id":"031ABC5","rt":0.77},{"Id":"819ABC9","rt":0.96},{"Id":"156ABC6","rt":0.79},{"Id":"453ABC3","rt":1.0},{"Id":"262ABC1","rt":1.0},{"Id":"05ABC09","rt":1.0},{"Id":"044ABC4","rt":1.0},{"Id":"892ABC8","rt":1.0},{"Id":"135ABC8","rt":0.96},{"Id":"61ABC00","rt":1.0},{"Id":"142ABC9","rt":0.6},{"Id":"272ABC6","rt":0.87},{"Id":"727ABC2","rt":0.98},{"Id":"411ABC5","rt":1.0},{"Id":"363ABC7","rt":0.86},
-   # {"Id":"178ABC5","rt":0.85},{"Id":"47ABC02","rt":0.71},{"Id":"375ABC5","rt":1.0},{"Id":"433ABC2","rt":0.64},
-  #  {"Id":"655ABC0","rt":0.88},{"Id":"869ABC3","rt":1.0},{"Id":"663ABC7","rt":1.0},{"Id":"362ABC9","rt":0.97},{"Id":"802ABC3","rt":0.97},{"Id":"39ABC05","rt":0.91},{"Id":"128ABC7","rt":1.0},{"Id":"292ABC0","rt":0.93},{"Id":"029ABC6","rt":1.0},{"Id":"835ABC8","rt":0.89},{"Id":"936ABC0","rt":0.93},{"Id":"038ABC7","rt":1.0},{"Id":"914ABC0","rt":0.91},{"Id":"858ABC1","rt":1.0},{"Id":"529ABC9","rt":1.0},{"Id":"0330029","rt":1.0},{"Id":"78ABC05","rt":0.73},{"Id":"915ABC4","rt":1.0},{"Id":"7ABC009","rt":1.0},{"Id":"753ABC6","rt":1.0},{"Id":"865ABC1","rt":1.0},{"Id":"367ABC7","rt":1.0},{"Id":"103ABC1","rt":1.0},{"Id":"001ABC7","rt":0.66},{"Id":"739ABC8","rt":1.0},{"Id":"02ABC08","rt":1.0},{"Id":"657ABC4","rt":1.0},{"Id":"211ABC9","rt":1.0},{"Id":"543ABC2","rt":0.87},{"Id":"034ABC9","rt":0.76},{"Id":"89ABC06","rt":0.92},{"Id":"159ABC1","rt":0.97},{"Id":"81ABC04","rt":1.0},{"Id":"507ABC9","rt":1.0},{"Id":"677ABC7","rt":0.95},{"Id":"389ABC4","rt":0.93},{"Id":"089ABC8","rt":1.0},{"Id":"045ABC7","rt":0.83},{"Id":"965ABC0","rt":1.0},{"Id":"864ABC0","rt":0.43},{"Id":"993ABC0","rt":1.0},{"Id":"246ABC7","rt":1.0},{"Id":"401ABC5","rt":1.0},{"Id":"261ABC6","rt":0.57},{"Id":"296ABC1","rt":1.0},{"Id":"015ABC3","rt":1.0},{"Id":"414ABC9","rt":1.0},{"Id":"164ABC9","rt":1.0},{"Id":"646ABC2","rt":1.0},{"Id":"385ABC2","rt":1.0},{"Id":"038ABC6","rt":1.0},{"Id":"508ABC3","rt":1.0},{"Id":"7310047","rt":1.0},{"Id":"999ABC4","rt":1.0},{"Id":"518ABC6","rt":0.92},{"Id":"364ABC4","rt":1.0},{"Id":"215ABC7","rt":0.99},{"Id":"41ABC01","rt":0.99},{"Id":"205ABC2","rt":0.99},{"Id":"271ABC9","rt":0.96},{"Id":"165ABC8","rt":0.92},{"Id":"456ABC7","rt":0.97},{"Id":"345ABC4","rt":0.93},{"Id":"056ABC5","rt":0.96},{"Id":"13ABC09","rt":0.96},{"Id":"46ABC06","rt":0.93},{"Id":"933ABC2","rt":0.96},{"Id":"339ABC5","rt":0.88},{"Id":"47ABC00","rt":0.74},{"Id":"004ABC0","rt":0.79},{"Id":"082ABC5","rt":0.95},{"Id":"894ABC2","rt":0.95},{"Id":"658ABC2","rt":0.93},{"Id":"644ABC4","rt":0.89},{"Id":"105ABC5","rt":0.95},{"Id":"704ABC9","rt":0.93},{"Id":"349ABC4","rt":0.93},{"Id":"647ABC6","rt":0.94},{"Id":"939ABC5","rt":0.93},{"Id":"196ABC3","rt":0.87},{"Id":"088ABC1","rt":0.93},{"Id":"569ABC4","rt":0.93},{"Id":"454ABC9","rt":0.93},{"Id":"871ABC6","rt":0.93},{"Id":"123ABC3","rt":0.92},{"Id":"888ABC0","rt":0.92},{"Id":"323ABC4","rt":0.89},{"Id":"09ABC03","rt":0.88},{"Id":"943ABC0","rt":0.91},{"Id":"866ABC5","rt":0.91},{"Id":"086ABC3","rt":0.91},{"Id":"52ABC01","rt":0.86},{"Id":"897ABC1","rt":0.81},{"Id":"451ABC2","rt":0.91},{"Id":"532ABC9","rt":0.89},{"Id":"849ABC6","rt":0.9},{"Id":"463ABC7","rt":0.91},{"Id":"648ABC8","rt":0.9},{"Id":"493ABC3","rt":0.79},{"Id":"542ABC0","rt":0.89},{"Id":"309ABC1","rt":0.89},{"Id":"66ABC01","rt":0.9},{"Id":"029ABC4","rt":0.86},{"Id":"409ABC7","rt":0.89},{"Id":"929ABC9","rt":0.85},{"Id":"162ABC3","rt":0.87},{"Id":"471ABC6","rt":0.89},{"Id":"184ABC7","rt":0.89},{"Id":"945ABC6","rt":0.88},{"Id":"286ABC2","rt":0.88},{"Id":"258ABC1","rt":0.88},{"Id":"685ABC3","rt":0.88},{"Id":"874ABC9","rt":0.88},{"Id":"084ABC4","rt":0.88},{"Id":"112ABC3","rt":0.88},{"Id":"882ABC4","rt":0.88},{"Id":"42ABC08","rt":0.88},{"Id":"022ABC4","rt":0.84},{"Id":"709ABC6","rt":0.79},{"Id":"093ABC0","rt":0.87},{"Id":"683ABC6","rt":0.87},{"Id":"059ABC3","rt":0.78},{"Id":"601ABC9","rt":0.86},{"Id":"026ABC4","rt":0.86},{"Id":"893ABC8","rt":0.86},{"Id":"041ABC8","rt":0.86},{"Id":"916ABC1","rt":0.82},{"Id":"394ABC7","rt":0.86},{"Id":"434ABC2","rt":0.86},{"Id":"505ABC9","rt":0.86},{"Id":"293ABC7","rt":0.85},{"Id":"217ABC6","rt":0.82},{"Id":"906ABC1","rt":0.7},{"Id":"385ABC6","rt":0.85},{"Id":"876ABC7","rt":0.81},{"Id":"753ABC4","rt":0.82},{"Id":"025ABC4","rt":0.84},{"Id":"701ABC1","rt":0.79},{"Id":"661ABC4","rt":0.84},{"Id":"37ABC09","rt":0.84},{"Id":"728ABC4","rt":0.84},{"Id":"141ABC7","rt":0.84},{"Id":"807ABC5","rt":0.84},{"Id":"329ABC0","rt":0.74},{"Id":"929ABC5","rt":0.83},{"Id":"914ABC5","rt":0.83},{"Id":"823ABC9","rt":0.83},{"Id":"834ABC5","rt":0.83},{"Id":"738ABC2","rt":0.76},{"Id":"941ABC0","rt":0.8},{"Id":"886ABC2","rt":0.74},{"Id":"387ABC7","rt":0.78},{"Id":"902ABC0","rt":0.8},{"Id":"877ABC4","rt":0.82},{"Id":"298ABC6","rt":0.82},{"Id":"928ABC0","rt":0.81},{"Id":"329ABC0","rt":0.8},{"Id":"899ABC2","rt":0.81},{"Id":"649ABC0","rt":0.81},{"Id":"882ABC6","rt":0.81},{"Id":"826ABC2","rt":0.81},{"Id":"162ABC4","rt":0.79},{"Id":"077ABC4","rt":0.68},{"Id":"626ABC9","rt":0.79},{"Id":"891ABC9","rt":0.78},{"Id":"192ABC7","rt":0.79},{"Id":"684ABC8","rt":0.8},{"Id":"599ABC0","rt":0.79},{"Id":"191ABC4","rt":0.65},{"Id":"629ABC6","rt":0.79},{"Id":"527ABC0","rt":0.79},{"Id":"098ABC8","rt":0.77},{"Id":"562ABC2","rt":0.79},{"Id":"152ABC5","rt":0.76},{"Id":"208ABC7","rt":0.78},{"Id":"51ABC06","rt":0.59},{"Id":"49ABC01","rt":0.78},{"Id":"88ABC07","rt":0.78},{"Id":"514ABC8","rt":0.78},{"Id":"32ABC06","rt":0.78},{"Id":"693ABC2","rt":0.72},{"Id":"823ABC4","rt":0.77},{"Id":"136ABC6","rt":0.78},{"Id":"95ABC00","rt":0.78},{"Id":"912ABC2","rt":0.77},{"Id":"369ABC1","rt":0.77},{"Id":"353ABC1","rt":0.77},{"Id":"923ABC8","rt":0.59},{"Id":"721ABC0","rt":0.76},{"Id":"364ABC1","rt":0.76},{"Id":"756ABC2","rt":0.76},{"Id":"588ABC8","rt":0.75},{"Id":"624ABC2","rt":0.76},{"Id":"019ABC8","rt":0.76},{"Id":"708ABC8","rt":0.76},{"Id":"322ABC0","rt":0.76},{"Id":"107ABC8","rt":0.75},{"Id":"738ABC7","rt":0.75},{"Id":"879ABC0","rt":0.74},{"Id":"597ABC1","rt":0.75},{"Id":"745ABC4","rt":0.75},{"Id":"758ABC8","rt":0.75},{"Id":"213ABC7","rt":0.74},{"Id":"671ABC0","rt":0.71},{"Id":"775ABC9","rt":0.69},{"Id":"782ABC4","rt":0.74},{"Id":"536ABC0","rt":0.72},{"Id":"482ABC5","rt":0.74},{"Id":"998ABC2","rt":0.71},{"Id":"389ABC0","rt":0.55},{"Id":"3ABC005","rt":0.73},{"Id":"244ABC8","rt":0.68},{"Id":"585ABC8","rt":0.73},{"Id":"924ABC4","rt":0.73},{"Id":"199ABC1","rt":0.73},{"Id":"917ABC0","rt":0.73},{"Id":"794ABC6","rt":0.72},{"Id":"421ABC3","rt":0.73},{"Id":"744ABC5","rt":0.63},{"Id":"121ABC2","rt":0.72},{"Id":"253ABC5","rt":0.72},{"Id":"375ABC8","rt":0.7},{"Id":"827ABC0","rt":0.72},{"Id":"508ABC6","rt":0.7},{"Id":"585ABC3","rt":0.71},{"Id":"385ABC3","rt":0.71},{"Id":"796ABC2","rt":0.71},{"Id":"682ABC2","rt":0.71},{"Id":"089ABC1","rt":0.7},{"Id":"081ABC1","rt":0.7},{"Id":"892ABC6","rt":0.7},{"Id":"324ABC0","rt":0.69},{"Id":"558ABC9","rt":0.69},{"Id":"487ABC0","rt":0.4},{"Id":"403ABC9","rt":0.64},{"Id":"28ABC05","rt":0.64},{"Id":"939ABC7","rt":0.67},{"Id":"021ABC7","rt":0.68},{"Id":"011ABC5","rt":0.68},{"Id":"32ABC04","rt":0.68},{"Id":"285ABC7","rt":0.61},{"Id":"993ABC4","rt":0.67},{"Id":"092ABC8","rt":0.67},{"Id":"216ABC9","rt":0.67},{"Id":"388ABC9","rt":0.67},{"Id":"296ABC5","rt":0.67},{"Id":"779ABC6","rt":0.66},{"Id":"895ABC0","rt":0.66},{"Id":"934ABC1","rt":0.64},{"Id":"438ABC6","rt":0.52},{"Id":"771ABC5","rt":0.61},{"Id":"596ABC4","rt":0.51},{"Id":"352ABC6","rt":0.64},{"Id":"64ABC09","rt":0.64},{"Id":"486ABC8","rt":0.64},{"Id":"693ABC9","rt":0.64},{"Id":"294ABC4","rt":0.64},{"Id":"052ABC3","rt":0.63},{"Id":"402ABC3","rt":0.63},{"Id":"102ABC5","rt":0.62},{"Id":"601ABC0","rt":0.62},{"Id":"896ABC6","rt":0.62},{"Id":"039ABC4","rt":0.62},{"Id":"577ABC8","rt":0.6},{"Id":"353ABC4","rt":0.61},{"Id":"01ABC06","rt":0.6},{"Id":"818ABC3","rt":0.59},{"Id":"455ABC5","rt":0.59},{"Id":"768ABC5","rt":0.59},{"Id":"184ABC3","rt":0.53},{"Id":"106ABC2","rt":0.58},{"Id":"401ABC4","rt":0.58},{"Id":"337ABC7","rt":0.58},{"Id":"37ABC02","rt":0.57},{"Id":"697ABC1","rt":0.48},{"Id":"384ABC3","rt":0.56},{"Id":"11ABC08","rt":0.55},{"Id":"735ABC2","rt":0.49},{"Id":"657ABC5","rt":0.46},{"Id":"074ABC5","rt":0.49},{"Id":"335ABC1","rt":0.54},{"Id":"032ABC9","rt":0.54},{"Id":"671ABC3","rt":0.54},{"Id":"148ABC0","rt":0.53},{"Id":"082ABC0","rt":0.52},{"Id":"748ABC3","rt":0.51},{"Id":"48ABC01","rt":0.51},{"Id":"749ABC9","rt":0.48},{"Id":"071ABC1","rt":0.5},{"Id":"679ABC6","rt":0.5},{"Id":"85ABC04","rt":0.49},{"Id":"663ABC5","rt":0.45},{"Id":"944ABC9","rt":0.36},{"Id":"111ABC5","rt":0.41},{"Id":"854ABC2","rt":0.48},{"Id":"885ABC2","rt":0.46},{"Id":"543ABC7","rt":0.45},{"Id":"681ABC1","rt":0.46},{"Id":"113ABC4","rt":0.44},
-   {"Id":"27ABC07","rt":0.37},{"Id":"666ABC5","rt":0.41},{"Id":"852ABC6","rt":0.39},{"Id":"911ABC8","rt":0.37},{"Id":"901ABC6","rt":0.35},{"Id":"279ABC4","rt":0.28},{"Id":"274ABC1","rt":0.29},{"Id":"113ABC5","rt":0.25},{"Id":"521ABC6","rt":0.25},{"Id":"084ABC0","rt":0.25},{"Id":"007ABC4","rt":0.22},{"Id":"724ABC9","rt":0.11},{"Id":"821ABC9","rt":0.0},{"Id":"05ABC01","rt":0.0},{"Id":"054ABC9","rt":0.0},{"Id":"695ABC2","rt":0.0},{"Id":"661ABC6","rt":0.0},{"Id":"713ABC9","rt":0.0},{"Id":"157ABC4","rt":0.0},{"Id":"332ABC7","rt":0.0},{"Id":"544ABC6","rt":0.0},{"Id":"924ABC5","rt":0.0},{"Id":"066ABC9","rt":0.0},{"Id":"482ABC0","rt":0.0},{"Id":"438ABC3","rt":0.0},{"Id":"482ABC6","rt":0.0},{"Id":"483ABC9","rt":0.0},{"Id":"617ABC4","rt":0.0},{"Id":"35ABC05","rt":0.0},{"Id":"447ABC2","rt":0.0},{"Id":"085ABC2","rt":0.0},{"Id":"886ABC8","rt":0.0},{"Id":"546ABC3","rt":0.0},{"Id":"813ABC1","rt":0.0},{"Id":"53ABC04","rt":0.0},{"Id":"922ABC9","rt":0.0},{"Id":"351ABC3","rt":0.0},{"Id":"208ABC4","rt":0.0},{"Id":"431ABC5","rt":0.0},{"Id":"113ABC6","rt":0.0},{"Id":"086ABC1","rt":0.0},{"Id":"067ABC3","rt":0.0},{"Id":"611ABC4","rt":0.0},{"Id":"192ABC7","rt":0.0},{"Id":"82ABC00","rt":0.0},{"Id":"865ABC9","rt":0.0},{"Id":"977ABC1","rt":0.0},{"Id":"23ABC05","rt":0.0},{"Id":"958ABC2","rt":0.0},{"Id":"197ABC4","rt":0.0},{"Id":"508ABC1","rt":0.0},{"Id":"398ABC5","rt":0.0},{"Id":"957ABC4","rt":0.0},{"Id":"719ABC7","rt":0.0},{"Id":"886ABC7","rt":0.0},{"Id":"715ABC0","rt":0.0},{"Id":"699ABC8","rt":0.0},{"Id":"229ABC7","rt":0.0},{"Id":"268ABC0","rt":0.0},{"Id":"341ABC4","rt":0.0},{"Id":"848ABC4","rt":0.0},{"Id":"ABCABC7","rt":0.0},{"Id":"673ABC5","rt":0.0},{"Id":"823ABC2","rt":0.0},{"Id":"567ABC6","rt":0.0},{"Id":"553ABC0","rt":0.0},{"Id":"27ABC00","rt":0.0},{"Id":"73ABC00","rt":0.0},{"Id":"656ABC9","rt":0.0},{"Id":"787ABC1","rt":0.0},{"Id":"511ABC7","rt":0.0},{"Id":"526ABC1","rt":0.0},{"Id":"357ABC0","rt":0.0},{"Id":"278ABC7","rt":0.0},{"Id":"729ABC0","rt":0.0},{"Id":"829ABC9","rt":0.0},{"Id":"227ABC6","rt":0.0},{"Id":"562ABC6","rt":0.0},{"Id":"502ABC1","rt":0.0},{"Id":"615ABC9","rt":0.0},{"Id":"688ABC5","rt":0.0},{"Id":"779ABC2","rt":0.0},{"Id":"ABCABC3","rt":0.0},
-]
+LLM_MODEL_ID = "amazon.nova-lite-v1:0"
+LLM_MAX_OUTPUT_TOKENS = 8192
 
+_llm = None
+_agent = None
+_init_lock = threading.RLock()
+
+
+def get_llm():
+    """Create the chat model on first use (thread-safe); calls go through the shared LLM gateway."""
+    global _llm
+    if _llm is None:
+        with _init_lock:
+            if _llm is None:
+                try:
+                    from .llm_gateway import get_llm_gateway
+                except ImportError:
+                    from llm_gateway import get_llm_gateway
+                _llm = get_llm_gateway().chat_model("gen_hedge_factor", LLM_MODEL_ID, LLM_MAX_OUTPUT_TOKENS)
+    return _llm
+
+
+# Step 2. Default seller data (data/mocked_sellers.csv unless HEDGE_FACTOR_SELLERS_PATH is set)
+def get_mocked_sellers() -> List[Dict[str, float]]:
+    """Default sellers as records; the report pipeline itself uses load_sellers() directly."""
+    return load_sellers().to_records()
 
 
 # Step 3. Define the state
@@ -91,14 +85,19 @@ class AgentState(TypedDict):
 
 
 # Step 4. Define graph nodes
-def generate_factors(state: AgentState) -> AgentState:
-    """Use the LLM to map seller rates to factors."""
-    print("Generating factors with LLM...")
+# Chunking: keep each chunk's expected JSON output well under the maxTokens ceiling
+CHUNK_TOKEN_BUDGET = int(os.getenv("HEDGE_FACTOR_CHUNK_TOKEN_BUDGET", "6000"))
+LLM_MAX_CONCURRENCY = int(os.getenv("HEDGE_FACTOR_LLM_CONCURRENCY", "4"))
+LLM_CHUNK_RETRIES = int(os.getenv("HEDGE_FACTOR_LLM_CHUNK_RETRIES", "2"))
+# Stream completions and validate each row as its object completes (false: wait for whole responses)
+LLM_STREAMING = os.getenv("HEDGE_FACTOR_LLM_STREAMING", "true").lower() in ("1", "true", "yes")
 
-    sellers = state.get("sellers", [])
+# Rows per progress update when results are not produced chunk by chunk (engine, cache hits)
+PROGRESS_CHUNK_SIZE = int(os.getenv("HEDGE_FACTOR_PROGRESS_CHUNK_SIZE", "500"))
+
+ProgressCallback = Callable[[List[Dict[str, float]]], None]
 
-    # Build prompt with anchor mapping instructions
-    prompt = f"""
+FACTOR_PROMPT_TEMPLATE = """
 You are given a list of records with IDs and rt (rate between 0 and 1).
 Map each rate to a factor using the following nonlinear anchor points:
 
@@ -119,81 +118,403 @@ Important:
 Here is the input list:
 {sellers}
 """
+# Derived from the prompt text so cached LLM results are invalidated whenever the prompt changes
+PROMPT_VERSION = hashlib.sha256(FACTOR_PROMPT_TEMPLATE.encode("utf-8")).hexdigest()[:12]
 
-    response = llm.invoke([HumanMessage(content=prompt)])
-    response_text = response.content.strip()
 
-    # Extract JSON if wrapped in code fences
-    if "```" in response_text:
-        json_match = re.search(r'```(?:json)?\s*(\{.*?\})\s*```', response_text, re.DOTALL)
-        if json_match:
-            response_text = json_match.group(1)
-    elif response_text.startswith("{") and response_text.endswith("}"):
-        pass
-    else:
-        json_match = re.search(r'\{[^{}]*"output"[^{}]*\}', response_text, re.DOTALL)
-        if json_match:
-            response_text = json_match.group(0)
+def _estimate_output_tokens(seller: Dict[str, float]) -> int:
+    """Rough output-token cost of one {"Id","rt","factor"} row (~3 chars per token)."""
+    return len(json.dumps(seller)) // 3 + 6
+
+
+def chunk_sellers(
+    sellers: List[Dict[str, float]],
+    token_budget: Optional[int] = None,
+) -> List[List[Dict[str, float]]]:
+    """Split sellers into chunks whose estimated JSON output fits within token_budget."""
+    token_budget = token_budget or CHUNK_TOKEN_BUDGET
+    chunks: List[List[Dict[str, float]]] = []
+    current: List[Dict[str, float]] = []
+    current_tokens = 0
+
+    for seller in sellers:
+        cost = _estimate_output_tokens(seller)
+        if current and current_tokens + cost > token_budget:
+            chunks.append(current)
+            current, current_tokens = [], 0
+        current.append(seller)
+        current_tokens += cost
+
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _build_factor_messages(sellers: List[Dict[str, float]]) -> list:
+    from langchain_core.messages import HumanMessage
+
+    return [HumanMessage(content=FACTOR_PROMPT_TEMPLATE.format(sellers=sellers))]
+
+
+def _new_collector(chunk: List[Dict[str, float]]) -> FactorRowCollector:
+    """Schema check for one chunk: every requested Id present, factors within the prompt's bounds."""
+    return FactorRowCollector(chunk, min_factor=MIN_FACTOR, max_factor=MAX_FACTOR)
+
+
+def _record_llm_call(started: float, response: Any) -> None:
+    """LLM latency (from when the call or batch started) and token usage for one chunk."""
+    telemetry.record_llm_call(
+        "gen_hedge_factor", LLM_MODEL_ID, time.perf_counter() - started,
+        response, error=isinstance(response, Exception),
+    )
+
+
+def _accept_response(collector: FactorRowCollector, response: Any, on_chunk: Optional[ProgressCallback]) -> None:
+    """Salvage valid rows from a response (even truncated or wrapped in prose) into the collector."""
+    accepted = collector.add_text(response.text)
+    if accepted and on_chunk:
+        on_chunk(accepted)
 
-    print(f"LLM response: {response_text}")
 
+class _StreamUsage:
+    """Token usage summed over streamed pieces (only some carry it), without merging the pieces themselves."""
+
+    def __init__(self):
+        self.usage_metadata: Dict[str, int] = {}
+
+    def add(self, piece: Any) -> None:
+        for key, value in (getattr(piece, "usage_metadata", None) or {}).items():
+            if isinstance(value, int):
+                self.usage_metadata[key] = self.usage_metadata.get(key, 0) + value
+
+
+def _stream_rows(collector: FactorRowCollector, sellers: List[Dict[str, float]], on_chunk: Optional[ProgressCallback]) -> None:
+    """
+    Stream one request and validate rows as their objects complete, so the first
+    rows reach on_chunk long before the completion ends. Rows accepted before a
+    stream fails are kept; only the rest is re-requested. Pieces are read through
+    .text because Converse streams content as a list of text blocks, not a str.
+    """
+    extractor = JSONObjectExtractor()
+    usage = _StreamUsage()
+    started = time.perf_counter()
+    try:
+        for piece in get_llm().stream(_build_factor_messages(sellers)):
+            usage.add(piece)
+            accepted = collector.add(extractor.feed(piece.text))
+            if accepted and on_chunk:
+                on_chunk(accepted)
+    except Exception as e:
+        _record_llm_call(started, e)
+        raise
+    _record_llm_call(started, usage)
+
+
+async def _astream_rows(collector: FactorRowCollector, sellers: List[Dict[str, float]], on_chunk: Optional[ProgressCallback]) -> None:
+    extractor = JSONObjectExtractor()
+    usage = _StreamUsage()
+    started = time.perf_counter()
+    try:
+        async for piece in get_llm().astream(_build_factor_messages(sellers)):
+            usage.add(piece)
+            accepted = collector.add(extractor.feed(piece.text))
+            if accepted and on_chunk:
+                on_chunk(accepted)
+    except Exception as e:
+        _record_llm_call(started, e)
+        raise
+    _record_llm_call(started, usage)
+
+
+def _request_missing(collector: FactorRowCollector, on_chunk: Optional[ProgressCallback]) -> None:
+    """One LLM request for the sellers the collector still lacks; raises if the call fails."""
+    if LLM_STREAMING:
+        _stream_rows(collector, collector.missing, on_chunk)
+        return
+    started = time.perf_counter()
+    try:
+        response = get_llm().invoke(_build_factor_messages(collector.missing))
+    except Exception as e:
+        _record_llm_call(started, e)
+        raise
+    _record_llm_call(started, response)
+    _accept_response(collector, response, on_chunk)
+
+
+async def _arequest_missing(collector: FactorRowCollector, on_chunk: Optional[ProgressCallback]) -> None:
+    if LLM_STREAMING:
+        await _astream_rows(collector, collector.missing, on_chunk)
+        return
+    started = time.perf_counter()
+    try:
+        response = await get_llm().ainvoke(_build_factor_messages(collector.missing))
+    except Exception as e:
+        _record_llm_call(started, e)
+        raise
+    _record_llm_call(started, response)
+    _accept_response(collector, response, on_chunk)
+
+
+def _log_retry(collector: FactorRowCollector, attempt: int, error: Optional[Exception]) -> None:
+    logger.warning(
+        "Re-requesting missing sellers",
+        extra={
+            "missing": len(collector.missing),
+            "received": len(collector.rows),
+            "rejected": collector.rejected,
+            "attempt": attempt,
+            "error": str(error) if error else None,
+        },
+    )
+
+
+def _finish_chunk(collector: FactorRowCollector, chunk_size: int, error: Optional[Exception]) -> None:
+    if collector.complete:
+        return
+    if not collector.rows:
+        raise RuntimeError(
+            f"Chunk of {chunk_size} sellers failed after {LLM_CHUNK_RETRIES} retries: {error or 'no valid rows'}"
+        )
+    # Sellers the LLM never returned a valid factor for are left out of the output
+    logger.warning("Sellers left without a factor", extra={"missing": len(collector.missing)})
+
+
+def _complete_chunk_with_retry(
+    collector: FactorRowCollector,
+    chunk_size: int,
+    error: Optional[Exception],
+    on_chunk: Optional[ProgressCallback],
+) -> None:
+    """Re-request only the Ids still missing from a chunk (all of them if the call itself failed)."""
+    for attempt in range(1, LLM_CHUNK_RETRIES + 1):
+        if collector.complete:
+            break
+        _log_retry(collector, attempt, error)
+        try:
+            _request_missing(collector, on_chunk)
+        except Exception as e:
+            error = e
+    _finish_chunk(collector, chunk_size, error)
+
+
+async def _acomplete_chunk_with_retry(
+    collector: FactorRowCollector,
+    chunk_size: int,
+    error: Optional[Exception],
+    on_chunk: Optional[ProgressCallback],
+) -> None:
+    for attempt in range(1, LLM_CHUNK_RETRIES + 1):
+        if collector.complete:
+            break
+        _log_retry(collector, attempt, error)
+        try:
+            await _arequest_missing(collector, on_chunk)
+        except Exception as e:
+            error = e
+    _finish_chunk(collector, chunk_size, error)
+
+
+def _stream_chunk(collector: FactorRowCollector, chunk_size: int, on_chunk: Optional[ProgressCallback]) -> None:
+    """Streaming mode: the chunk's first request, then re-requests for whatever is still missing."""
+    error = None
+    try:
+        _stream_rows(collector, collector.missing, on_chunk)
+    except Exception as e:
+        error = e
+    _complete_chunk_with_retry(collector, chunk_size, error, on_chunk)
+
+
+async def _astream_chunk(collector: FactorRowCollector, chunk_size: int, on_chunk: Optional[ProgressCallback]) -> None:
+    error = None
     try:
-        structured = json.loads(response_text)
-    except json.JSONDecodeError as e:
-        print(f"JSON decode error: {e}")
-        raise ValueError(f"Failed to parse LLM response as JSON: {response_text}")
+        await _astream_rows(collector, collector.missing, on_chunk)
+    except Exception as e:
+        error = e
+    await _acomplete_chunk_with_retry(collector, chunk_size, error, on_chunk)
+
+
+def _collected_output(chunks: List[List[Dict[str, float]]], collectors: List[FactorRowCollector]) -> List[Dict[str, float]]:
+    """Accepted rows in input order."""
+    output = []
+    for chunk, collector in zip(chunks, collectors):
+        for seller in chunk:
+            row = collector.rows.get(str(seller.get("Id")))
+            if row is not None:
+                output.append(row)
+    return output
+
+
+def _chunk_callback(config: Optional["RunnableConfig"]) -> Optional[ProgressCallback]:
+    """Per-chunk progress callback passed as configurable["on_chunk"] when invoking the graph."""
+    return ((config or {}).get("configurable") or {}).get("on_chunk")
+
+
+def generate_factors(state: AgentState, config: Optional["RunnableConfig"] = None) -> AgentState:
+    """Use the LLM to map seller rates to factors, fanning chunks out concurrently (streamed unless HEDGE_FACTOR_LLM_STREAMING=false)."""
+    on_chunk = _chunk_callback(config)
+    sellers = state.get("sellers", [])
+    chunks = chunk_sellers(sellers)
+    logger.info("Generating factors with LLM", extra={"sellers": len(sellers), "chunks": len(chunks)})
+
+    collectors = [_new_collector(chunk) for chunk in chunks]
+    if LLM_STREAMING:
+        # Rows are validated and handed to on_chunk while their chunk is still being generated
+        with ThreadPoolExecutor(max_workers=LLM_MAX_CONCURRENCY) as executor:
+            list(executor.map(_stream_chunk, collectors, [len(chunk) for chunk in chunks], repeat(on_chunk)))
+        return {**state, "output": _collected_output(chunks, collectors)}
+
+    failed: Dict[int, Exception] = {}
+    inputs = [_build_factor_messages(chunk) for chunk in chunks]
+    config = {"max_concurrency": LLM_MAX_CONCURRENCY}
+    started = time.perf_counter()
+    for index, response in get_llm().batch_as_completed(inputs, config=config, return_exceptions=True):
+        _record_llm_call(started, response)
+        if isinstance(response, Exception):
+            failed[index] = response
+            continue
+        _accept_response(collectors[index], response, on_chunk)
+
+    for index, collector in enumerate(collectors):
+        if not collector.complete:
+            _complete_chunk_with_retry(collector, len(chunks[index]), failed.get(index), on_chunk)
+
+    return {**state, "output": _collected_output(chunks, collectors)}
+
+
+async def agenerate_factors(state: AgentState, config: Optional["RunnableConfig"] = None) -> AgentState:
+    """Async variant of generate_factors built on llm.astream (or llm.abatch_as_completed when not streaming)."""
+    on_chunk = _chunk_callback(config)
+    sellers = state.get("sellers", [])
+    chunks = chunk_sellers(sellers)
+    logger.info("Generating factors with LLM", extra={"sellers": len(sellers), "chunks": len(chunks)})
+
+    collectors = [_new_collector(chunk) for chunk in chunks]
+    if LLM_STREAMING:
+        semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+
+        async def stream_chunk(collector: FactorRowCollector, chunk_size: int) -> None:
+            async with semaphore:
+                await _astream_chunk(collector, chunk_size, on_chunk)
+
+        await asyncio.gather(*(stream_chunk(collector, len(chunk)) for collector, chunk in zip(collectors, chunks)))
+        return {**state, "output": _collected_output(chunks, collectors)}
+
+    failed: Dict[int, Exception] = {}
+    inputs = [_build_factor_messages(chunk) for chunk in chunks]
+    config = {"max_concurrency": LLM_MAX_CONCURRENCY}
+    started = time.perf_counter()
+    async for index, response in get_llm().abatch_as_completed(inputs, config=config, return_exceptions=True):
+        _record_llm_call(started, response)
+        if isinstance(response, Exception):
+            failed[index] = response
+            continue
+        _accept_response(collectors[index], response, on_chunk)
+
+    await asyncio.gather(*(
+        _acomplete_chunk_with_retry(collector, len(chunks[index]), failed.get(index), on_chunk)
+        for index, collector in enumerate(collectors)
+        if not collector.complete
+    ))
+
+    return {**state, "output": _collected_output(chunks, collectors)}
+
+def _new_figure(figsize, show_plot: bool):
+    """
+    Create a figure. Off-screen figures use the object-oriented API on an Agg canvas,
+    which keeps no global state and is safe to render from concurrent threads.
+    """
+    if show_plot:
+        import matplotlib.pyplot as plt
+        return plt.figure(figsize=figsize)
+
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def _write_file_atomic(path: str, data: bytes) -> None:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as image_file:
+        image_file.write(data)
+    os.replace(tmp_path, path)
+
+
+def _render_figure(
+    fig,
+    save_path: Optional[str],
+    show_plot: bool,
+    image_format: str = "png",
+    dpi: int = 300,
+) -> bytes:
+    """Render a figure to image bytes in memory, optionally writing them to save_path."""
+    buffer = BytesIO()
+    fig.savefig(buffer, format=image_format, dpi=dpi, bbox_inches="tight")
+    image_bytes = buffer.getvalue()
+
+    if save_path:
+        _write_file_atomic(save_path, image_bytes)
+
+    if show_plot:
+        import matplotlib.pyplot as plt
+        plt.show()
+        plt.close(fig)
+    return image_bytes
 
-    return {**state, "output": structured.get("output", [])}
 
 def generate_distribution_chart(
-    output_data: List[Dict[str, float]],
-    save_path: str = "rate_factor_distribution.png",
+    output_data: Union[SellerBatch, List[Dict[str, float]]],
+    save_path: Optional[str] = "rate_factor_distribution.png",
     show_plot: bool = True,
-):
-    """Generate a distribution chart showing rate vs factor relationship."""
-    if not output_data:
-        print("No data available for chart generation")
+    image_format: str = "png",
+    dpi: int = 300,
+    figsize: Optional[Tuple[float, float]] = None,
+) -> Optional[bytes]:
+    """Generate a distribution chart showing rate vs factor relationship and return the image bytes."""
+    if not len(output_data):
+        logger.info("No data available for chart generation")
         return
 
-    # Extract rates and factors using correct keys
-    rates = [item.get("rt", 0) for item in output_data]
-    factors = [item.get("factor", 0) for item in output_data]
-    seller_ids = [item.get("Id", "") for item in output_data]
-
     # Filter out any zero or invalid data
-    valid_data = [(r, f, sid) for r, f, sid in zip(rates, factors, seller_ids) if f > 0]
-    if not valid_data:
-        print("No valid data points for chart generation")
+    valid = SellerBatch.coerce(output_data).positive()
+    if not len(valid):
+        logger.info("No valid data points for chart generation")
         return
 
-    rates, factors, seller_ids = zip(*valid_data)
+    rates, factors, seller_ids = valid.rt, valid.factor, valid.ids
 
     # Create the plot
-    plt.figure(figsize=(12, 8))
+    fig = _new_figure(figsize or (12, 8), show_plot)
+    ax = fig.subplots()
 
     # Create scatter plot - swapped axes: factors on X, rates on Y
-    plt.scatter(factors, rates, s=100, alpha=0.7, c='steelblue', edgecolors='black', linewidth=1)
-
-    # Add labels for each point (only show every 10th label to avoid overcrowding)
-    for i, seller_id in enumerate(seller_ids):
-        if i % 10 == 0 or len(seller_ids) < 20:  # Show fewer labels if many points
-            plt.annotate(f'ID: {seller_id}', 
-                        (factors[i], rates[i]), 
-                        xytext=(5, 5), 
-                        textcoords='offset points',
-                        fontsize=8,
-                        alpha=0.6)
+    ax.scatter(factors, rates, s=100, alpha=0.7, c='steelblue', edgecolors='black', linewidth=1)
+
+    # Add labels for each point (every 10th, and at most ~MAX_POINT_LABELS, to avoid overcrowding)
+    label_step = 1 if len(seller_ids) < 20 else max(10, -(-len(seller_ids) // MAX_POINT_LABELS))
+    for i in range(0, len(seller_ids), label_step):
+        ax.annotate(f'ID: {seller_ids[i]}', 
+                    (factors[i], rates[i]), 
+                    xytext=(5, 5), 
+                    textcoords='offset points',
+                    fontsize=8,
+                    alpha=0.6)
 
     # Customize the plot - swapped labels
-    plt.xlabel('Factor', fontsize=14, fontweight='bold')
-    plt.ylabel('Rate (rt)', fontsize=14, fontweight='bold')
-    plt.title('Seller Factor vs Rate Distribution', fontsize=16, fontweight='bold')
-    plt.grid(True, alpha=0.3)
+    ax.set_xlabel('Factor', fontsize=14, fontweight='bold')
+    ax.set_ylabel('Rate (rt)', fontsize=14, fontweight='bold')
+    ax.set_title('Seller Factor vs Rate Distribution', fontsize=16, fontweight='bold')
+    ax.grid(True, alpha=0.3)
 
     # Set axis limits with some padding, handle edge cases - swapped axes
-    if rates and factors:
-        rate_range = max(rates) - min(rates)
-        factor_range = max(factors) - min(factors)
+    if rates.size and factors.size:
+        rate_range = rates.max() - rates.min()
+        factor_range = factors.max() - factors.min()
 
         # Handle case where range is zero or very small
         if factor_range < 1e-10:
@@ -206,8 +527,8 @@ def generate_distribution_chart(
         else:
             rate_padding = 0.05 * rate_range
 
-        plt.xlim(min(factors) - factor_padding, max(factors) + factor_padding)
-        plt.ylim(min(rates) - rate_padding, max(rates) + rate_padding)
+        ax.set_xlim(factors.min() - factor_padding, factors.max() + factor_padding)
+        ax.set_ylim(rates.min() - rate_padding, rates.max() + rate_padding)
 
     # Add trend line if we have enough data points and variance - swapped for new axes
     if len(rates) > 1:
@@ -219,45 +540,43 @@ def generate_distribution_chart(
             if rate_std > 1e-10 and factor_std > 1e-10:
                 z = np.polyfit(factors, rates, 1)  # factors as X, rates as Y
                 p = np.poly1d(z)
-                x_trend = np.linspace(min(factors), max(factors), 100)
-                plt.plot(x_trend, p(x_trend), "r--", alpha=0.8, linewidth=2, 
+                x_trend = np.linspace(factors.min(), factors.max(), 100)
+                ax.plot(x_trend, p(x_trend), "r--", alpha=0.8, linewidth=2, 
                         label=f'Trend Line (slope: {z[0]:.3f})')
-                plt.legend()
+                ax.legend(loc='upper right')  # "best" placement scans every point
             else:
-                print("Data has insufficient variance for trend line calculation")
+                logger.debug("Data has insufficient variance for trend line calculation")
         except (np.linalg.LinAlgError, ValueError) as e:
-            print(f"Could not calculate trend line: {e}")
+            logger.warning("Could not calculate trend line", extra={"error": str(e)})
 
     # Add summary statistics
-    plt.figtext(0.02, 0.02, f"Data Points: {len(rates)}", fontsize=10, alpha=0.7)
-
-    # Adjust layout and save
-    plt.tight_layout()
-    plt.savefig(save_path, dpi=300, bbox_inches='tight')
-    print(f"Chart saved as: {save_path}")
+    fig.text(0.02, 0.02, f"Data Points: {len(rates)}", fontsize=10, alpha=0.7)
 
-    # Show or close the plot depending on context
-    if show_plot:
-        plt.show()
-    else:
-        plt.close()
+    # Adjust layout and render
+    fig.tight_layout()
+    image_bytes = _render_figure(fig, save_path, show_plot, image_format=image_format, dpi=dpi)
+    if save_path:
+        logger.info("Chart saved", extra={"chart": "distribution", "path": save_path})
+    return image_bytes
 
 
 def generate_standard_deviation_chart(
-    output_data: List[Dict[str, float]],
-    save_path: str = "standard_deviation_chart.png",
+    output_data: Union[SellerBatch, List[Dict[str, float]]],
+    save_path: Optional[str] = "standard_deviation_chart.png",
     show_plot: bool = True,
-):
-    """Generate a standard deviation chart showing the distribution of factors with std dev bands."""
-    if not output_data:
-        print("No data available for standard deviation chart generation")
+    image_format: str = "png",
+    dpi: int = 300,
+    figsize: Optional[Tuple[float, float]] = None,
+) -> Optional[bytes]:
+    """Generate a standard deviation chart showing the distribution of factors with std dev bands and return the image bytes."""
+    if not len(output_data):
+        logger.info("No data available for standard deviation chart generation")
         return
 
-    # Extract factors using correct keys
-    factors = [item.get("factor", 0) for item in output_data if item.get("factor", 0) > 0]
+    factors = SellerBatch.coerce(output_data).positive().factor
     
-    if not factors or len(factors) < 2:
-        print("Insufficient data for standard deviation chart generation")
+    if factors.size < 2:
+        logger.info("Insufficient data for standard deviation chart generation")
         return
 
     # Calculate statistics
@@ -267,15 +586,20 @@ def generate_standard_deviation_chart(
     min_factor = np.min(factors)
     max_factor = np.max(factors)
 
-    print(f"\nStandard Deviation Statistics:")
-    print(f"Mean: {mean_factor:.2f}")
-    print(f"Standard Deviation: {std_factor:.2f}")
-    print(f"Median: {median_factor:.2f}")
-    print(f"Min: {min_factor:.2f}")
-    print(f"Max: {max_factor:.2f}")
+    logger.debug(
+        "Standard deviation statistics",
+        extra={
+            "mean": round(float(mean_factor), 2),
+            "std": round(float(std_factor), 2),
+            "median": round(float(median_factor), 2),
+            "min": round(float(min_factor), 2),
+            "max": round(float(max_factor), 2),
+        },
+    )
 
     # Create figure with two subplots
-    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(14, 10))
+    fig = _new_figure(figsize or (14, 10), show_plot)
+    ax1, ax2 = fig.subplots(2, 1)
 
     # Subplot 1: Histogram with standard deviation bands
     n_bins = min(30, int(np.sqrt(len(factors))))  # Adaptive bin count
@@ -350,79 +674,288 @@ def generate_standard_deviation_chart(
     fig.text(0.02, 0.02, stats_text, fontsize=10, verticalalignment='bottom',
              bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.5))
 
-    # Adjust layout and save
-    plt.tight_layout()
-    plt.savefig(save_path, dpi=300, bbox_inches='tight')
-    print(f"Standard deviation chart saved as: {save_path}")
+    # Adjust layout and render
+    fig.tight_layout()
+    image_bytes = _render_figure(fig, save_path, show_plot, image_format=image_format, dpi=dpi)
+    if save_path:
+        logger.info("Chart saved", extra={"chart": "standard_deviation", "path": save_path})
+    return image_bytes
 
-    # Show or close the plot depending on context
-    if show_plot:
-        plt.show()
-    else:
-        plt.close()
+
+def _read_image_bytes(path: str) -> Optional[bytes]:
+    """Return raw image bytes if the file exists."""
+    if not os.path.exists(path):
+        return None
+
+    with open(path, "rb") as image_file:
+        return image_file.read()
 
 
 def _encode_image_base64(path: str) -> Optional[str]:
     """Return base64 string for an image if available."""
-    if not os.path.exists(path):
+    data = _read_image_bytes(path)
+    if data is None:
         return None
+    return base64.b64encode(data).decode("utf-8")
 
-    with open(path, "rb") as image_file:
-        return base64.b64encode(image_file.read()).decode("utf-8")
+
+def _method_version(method: str) -> str:
+    return ENGINE_VERSION if method == "engine" else f"{PROMPT_VERSION}:{LLM_MODEL_ID}"
+
+
+def _report_cache_key(sellers: SellerBatch, method: str, rebalance: bool, incremental: bool) -> str:
+    if method == "engine":
+        return make_cache_key(sellers.fingerprint(), method=method, rebalance=rebalance, version=ENGINE_VERSION, anchors=ANCHORS)
+    return make_cache_key(
+        sellers.fingerprint(),
+        method=method,
+        rebalance=rebalance,
+        incremental=incremental,
+        version=PROMPT_VERSION,
+        model_id=LLM_MODEL_ID,
+    )
+
+
+def _compute_seller_factors(sellers: SellerBatch, method: str) -> np.ndarray:
+    """Per-seller factors without portfolio-level rebalancing, aligned with sellers."""
+    if not len(sellers):
+        return np.array([], dtype=np.float64)
+    if method == "engine":
+        return interpolate_factors(sellers.rt)
+
+    output = get_agent().invoke({"sellers": sellers.to_records()}).get("output", [])
+    # Ids are unique (see require_unique_ids); sellers without a returned factor get NaN
+    by_id = {str(record.get("Id")): record.get("factor") for record in output}
+    return np.array([by_id.get(seller_id, np.nan) for seller_id in sellers.ids.tolist()], dtype=np.float64)
+
+
+def generate_factors_incremental(
+    sellers: SellerBatch,
+    method: str,
+    rebalance: bool = True,
+) -> SellerBatch:
+    """
+    Recompute only sellers whose rt changed (or that are new) against the factor store,
+    then re-apply the portfolio mean constraint as a vectorized correction.
+    """
+    store = get_factor_store()
+    version = _method_version(method)
+    stored = store.get_many(sellers.ids.tolist())
+
+    missing = {"rt": np.nan, "factor": np.nan, "method": None, "version": None}
+    stored_rows = [stored.get(seller_id, missing) for seller_id in sellers.ids.tolist()]
+    stored_rt = np.array([row["rt"] for row in stored_rows], dtype=np.float64)
+    stored_factor = np.array([row["factor"] for row in stored_rows], dtype=np.float64)
+    current = np.array([row["method"] == method and row["version"] == version for row in stored_rows], dtype=bool)
+    stale = ~(current & (stored_rt == sellers.rt))
+
+    logger.info("Incremental factor refresh", extra={"stale": int(stale.sum()), "sellers": len(sellers)})
+    factors = stored_factor.copy()
+    factors[stale] = _compute_seller_factors(sellers[stale], method)
+
+    # Sellers the LLM returned no factor for are left out, as in a full run
+    valid = ~np.isnan(factors)
+    fresh = stale & valid
+    if fresh.any():
+        store.upsert_many(sellers[fresh].with_factors(factors[fresh]).to_records(), method=method, version=version)
+
+    sellers, factors = sellers[valid], factors[valid]
+    if rebalance and factors.size:
+        factors = rebalance_to_target(factors)
+    return sellers.with_factors(np.round(factors, 2))
+
+
+def _build_report_result(
+    entry: Dict[str, Any],
+    include_base64: bool,
+    cache_key: str,
+    cache_hit: bool,
+    chart_format: str = "png",
+) -> Dict[str, Any]:
+    """Turn a cache entry ({"output", "charts": {name: {"path", "data"}}}) into the public result shape."""
+    charts: Dict[str, Dict[str, Optional[str]]] = {}
+    for name, chart in entry.get("charts", {}).items():
+        charts[name] = {"path": chart.get("path"), "media_type": CHART_MEDIA_TYPES.get(chart_format)}
+        if include_base64:
+            data = chart.get("data")
+            charts[name]["image_base64"] = base64.b64encode(data).decode("utf-8") if data else None
+
+    return {
+        "output": SellerBatch.coerce(entry.get("output", [])),
+        "charts": charts,
+        "chart_data": entry.get("chart_data"),
+        "cache_key": cache_key,
+        "cache_hit": cache_hit,
+    }
+
+
+def _emit_progress(progress_callback: Optional[ProgressCallback], output: SellerBatch) -> None:
+    if progress_callback is None:
+        return
+    for chunk in output.chunks(PROGRESS_CHUNK_SIZE):
+        progress_callback(chunk.to_records())
 
 
 def run_hedge_factor_analysis(
-    sellers: Optional[List[Dict[str, float]]] = None,
+    sellers: Optional[Union[SellerBatch, List[Dict[str, float]]]] = None,
     chart_dir: str = "charts",
     include_base64: bool = False,
     show_plots: bool = False,
+    method: Optional[str] = None,
+    rebalance: bool = True,
+    use_cache: bool = True,
+    incremental: bool = False,
+    progress_callback: Optional[ProgressCallback] = None,
+    write_charts: bool = False,
+    chart_format: str = "png",
+    chart_dpi: int = 300,
+    chart_size: Optional[Tuple[float, float]] = None,
 ) -> Dict[str, Any]:
     """
     Run the hedge factor pipeline, generate charts, and return structured data.
-    """
-    sellers_input = sellers if sellers is not None else mocked_sellers
 
-    if agent is None:
-        raise RuntimeError("LangGraph agent is not initialized")
-
-    result = agent.invoke({"sellers": sellers_input})
-    output_data = result.get("output", [])
-
-    charts: Dict[str, Dict[str, Optional[str]]] = {}
+    sellers is a columnar SellerBatch (see seller_source.load_sellers) or a list of
+    {"Id", "rt"} records; it defaults to the seller file at HEDGE_FACTOR_SELLERS_PATH.
+    The result's "output" is a SellerBatch with factors; call to_records() or
+    to_columns() for a JSON-ready form.
+
+    method selects how factors are produced: "engine" maps rates locally with the
+    anchor spline, "llm" sends the sellers through the Bedrock graph. Results
+    (factors and chart bytes) are cached by a hash of the input and method version.
+    With incremental=True only sellers whose rt changed since the last run are
+    recomputed; the rest come from the persistent factor store.
+    Seller Ids must be unique (ValueError otherwise). rebalance shifts the factors so the
+    portfolio mean hits the engine's target, the same way for every method and cache mode.
+    progress_callback, if given, receives factor rows in chunks as they are produced; on the
+    LLM path with rebalance they can only be final once every chunk is in, so they come at the end.
+    Charts are rendered in memory; write_charts=True also saves them under chart_dir/<report>/.
+    chart_format picks png/webp/svg images, or "data" to return chart_data (histogram bins,
+    sigma zones, quartiles, trend line) instead of rendering anything.
+    """
+    sellers_input = require_unique_ids(SellerBatch.coerce(sellers)) if sellers is not None else load_sellers()
+    method = (method or DEFAULT_FACTOR_METHOD).lower()
+    if method not in FACTOR_METHODS:
+        raise ValueError(f"Unknown factor method '{method}', expected one of {FACTOR_METHODS}")
+    if chart_format not in CHART_FORMATS:
+        raise ValueError(f"Unknown chart format '{chart_format}', expected one of {CHART_FORMATS}")
+
+    cache_key = make_cache_key(
+        _report_cache_key(sellers_input, method, rebalance, incremental),
+        chart_format=chart_format,
+        chart_dpi=chart_dpi,
+        chart_size=chart_size,
+    )
+    cache = get_report_cache() if use_cache and not show_plots else None
+    if cache is not None:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            _emit_progress(progress_callback, SellerBatch.coerce(cached.get("output", [])))
+            return _build_report_result(cached, include_base64, cache_key, cache_hit=True, chart_format=chart_format)
+
+    if incremental:
+        output_data = generate_factors_incremental(sellers_input, method, rebalance=rebalance)
+        _emit_progress(progress_callback, output_data)
+    elif method == "engine":
+        output_data = sellers_input.with_factors(np.round(compute_factors(sellers_input.rt, rebalance=rebalance), 2))
+        _emit_progress(progress_callback, output_data)
+    elif rebalance:
+        # The mean constraint needs the whole portfolio, so rows are emitted once it is applied
+        result = get_agent().invoke({"sellers": sellers_input.to_records()})
+        output_data = SellerBatch.from_records(result.get("output", []))
+        if len(output_data):
+            output_data = output_data.with_factors(np.round(rebalance_to_target(output_data.factor), 2))
+        _emit_progress(progress_callback, output_data)
+    else:
+        config = {"configurable": {"on_chunk": progress_callback}} if progress_callback else None
+        result = get_agent().invoke({"sellers": sellers_input.to_records()}, config=config)
+        output_data = SellerBatch.from_records(result.get("output", []))
+
+    chart_entries: Dict[str, Dict[str, Any]] = {}
+    chart_data: Optional[Dict[str, Any]] = None
+
+    if output_data and chart_format == "data":
+        with telemetry.CHART_RENDER_DURATION.labels("all", "data").time():
+            chart_data = compute_chart_data(output_data)
+    elif output_data:
+        # Per-report directory so concurrent reports never overwrite each other's files
+        report_dir = os.path.join(chart_dir, cache_key[:16])
+        renderers = {
+            "distribution": generate_distribution_chart,
+            "standard_deviation": generate_standard_deviation_chart,
+        }
+        for name, render in renderers.items():
+            path = os.path.join(report_dir, f"{CHART_FILE_NAMES[name]}.{chart_format}") if write_charts else None
+            with telemetry.CHART_RENDER_DURATION.labels(name, chart_format).time():
+                image_bytes = render(
+                    output_data,
+                    save_path=path,
+                    show_plot=show_plots,
+                    image_format=chart_format,
+                    dpi=chart_dpi,
+                    figsize=chart_size,
+                )
+            chart_entries[name] = {"path": path, "data": image_bytes}
+
+    entry = {"output": output_data, "charts": chart_entries, "chart_data": chart_data}
+    if cache is not None:
+        cache.set(cache_key, entry)
+
+    return _build_report_result(entry, include_base64, cache_key, cache_hit=False, chart_format=chart_format)
 
-    if output_data:
-        os.makedirs(chart_dir, exist_ok=True)
 
-        distribution_path = os.path.join(chart_dir, "rate_factor_distribution.png")
-        standard_dev_path = os.path.join(chart_dir, "standard_deviation_chart.png")
+# Step 5. Build graph
+def build_agent():
+    from langchain_core.runnables import RunnableLambda
+    from langgraph.graph import StateGraph, START, END
+
+    graph = StateGraph(AgentState)
+    graph.add_node(
+        "generate_factors",
+        RunnableLambda(
+            telemetry.traced_node("gen_hedge_factor", "generate_factors", generate_factors),
+            afunc=telemetry.traced_node("gen_hedge_factor", "generate_factors", agenerate_factors),
+        ),
+    )
+    graph.add_edge(START, "generate_factors")
+    graph.add_edge("generate_factors", END)
+    return graph.compile()
 
-        generate_distribution_chart(output_data, save_path=distribution_path, show_plot=show_plots)
-        generate_standard_deviation_chart(output_data, save_path=standard_dev_path, show_plot=show_plots)
 
-        charts["distribution"] = {"path": distribution_path}
-        charts["standard_deviation"] = {"path": standard_dev_path}
+# Step 6. Compile on first use (thread-safe)
+def get_agent():
+    global _agent
+    if _agent is None:
+        with _init_lock:
+            if _agent is None:
+                _agent = build_agent()
+    return _agent
 
-        if include_base64:
-            charts["distribution"]["image_base64"] = _encode_image_base64(distribution_path)
-            charts["standard_deviation"]["image_base64"] = _encode_image_base64(standard_dev_path)
 
-    return {"output": output_data, "charts": charts}
+def warm_up(include_llm: bool = True) -> None:
+    """Initialize the lazy pieces ahead of the first report (graph, plotting stack, optionally the LLM)."""
+    get_agent()
+    from matplotlib.backends.backend_agg import FigureCanvasAgg  # noqa: F401
+    from matplotlib.figure import Figure  # noqa: F401
+    if include_llm:
+        get_llm()
 
 
-# Step 5. Build graph
-graph = StateGraph(AgentState)
-graph.add_node("generate_factors", generate_factors)
-graph.add_edge(START, "generate_factors")
-graph.add_edge("generate_factors", END)
+def __getattr__(name: str):
+    # Backwards-compatible module attributes for the lazily created objects
+    if name == "llm":
+        return get_llm()
+    if name == "agent":
+        return get_agent()
+    if name == "mocked_sellers":
+        return get_mocked_sellers()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-# Step 6. Compile
-agent = graph.compile()
 
 # Step 7. Run example
 if __name__ == "__main__":
-    analysis_result = run_hedge_factor_analysis(include_base64=False, show_plots=True)
+    analysis_result = run_hedge_factor_analysis(include_base64=False, show_plots=True, write_charts=True)
     print("Final Output:")
-    print(json.dumps(analysis_result["output"], indent=2))
+    print(json.dumps(analysis_result["output"].to_records(), indent=2))
 
     if analysis_result["charts"]:
         print("\nCharts generated:")
@@ -0,0 +1,24 @@
+"""
+gunicorn settings for the multi-worker run mode (same setup as serve.py):
+
+    gunicorn -c gunicorn.conf.py
+"""
+import os
+
+import serve
+
+# Set the worker count with HEDGE_FACTOR_WORKERS rather than -w: it also sizes each worker's LLM quota share
+workers = serve.DEFAULT_WORKERS
+serve.configure_environment(workers)
+
+bind = os.getenv("HEDGE_FACTOR_BIND", "0.0.0.0:8000")
+worker_class = "uvicorn.workers.UvicornWorker"
+# The master loads the app once, through serve.preload, before forking the workers
+wsgi_app = "serve:preload()"
+preload_app = True
+graceful_timeout = serve.DEFAULT_GRACEFUL_TIMEOUT * 2  # in-flight requests, then running report jobs
+timeout = 120
+
+
+def post_fork(server, worker):
+    serve.after_fork()
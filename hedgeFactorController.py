@@ -1,15 +1,44 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, File, HTTPException, Query, Request, Response, UploadFile
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional, Union
+from datetime import datetime, timezone
+import asyncio
+import hashlib
+import json
+import os
 
 try:
-    from .gen_hedge_factor_for_sellers import run_hedge_factor_analysis
+    import orjson
+except ImportError:  # optional: faster JSON encoding for large reports
+    orjson = None
+
+try:
+    from . import hedge_factor_service
+    from .hedge_factor_repository import get_hedge_factor_repository
+    from .report_cache import get_report_cache
+    from .report_jobs import report_jobs
+    from .report_runner import run_report_async, run_report_in_pool
 except ImportError:
-    from gen_hedge_factor_for_sellers import run_hedge_factor_analysis
+    import hedge_factor_service
+    from hedge_factor_repository import get_hedge_factor_repository
+    from report_cache import get_report_cache
+    from report_jobs import report_jobs
+    from report_runner import run_report_async, run_report_in_pool
 
 # Create a router instead of a FastAPI app
 router = APIRouter(prefix="/api", tags=["hedge-factor"])
 
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Charts are content-addressed by report id, so clients may store them but should revalidate via ETag
+CHART_CACHE_CONTROL = os.getenv("HEDGE_FACTOR_CHART_CACHE_CONTROL", "public, no-cache")
+
+# Upper bound on one raster chart's canvas (width x height x dpi^2); the default 14x10 in at 300 dpi is 12.6M
+MAX_CHART_PIXELS = int(os.getenv("HEDGE_FACTOR_MAX_CHART_PIXELS", "16000000"))
+# Size of the larger default chart, used for the pixel check when width and height are not given
+DEFAULT_CHART_SIZE = (14.0, 10.0)
+
 # --- Step 1. Define request model ---
 class HedgeFactorRequest(BaseModel):
     sellerNumber: str = Field(..., description="Unique seller number")
@@ -22,52 +51,318 @@ class HedgeFactorResponse(BaseModel):
     data: HedgeFactorRequest
 
 
+class BulkRowResult(BaseModel):
+    index: int
+    sellerNumber: Optional[str] = None
+    hedgeFactor: Optional[float] = None
+    status: str
+    error: Optional[str] = None
+
+
+class BulkUpdateResponse(BaseModel):
+    status: str
+    total: int
+    updated: int
+    rejected: int
+    results: List[BulkRowResult]
+
+
+class HedgeFactorRecord(BaseModel):
+    sellerNumber: str
+    hedgeFactor: float
+    updated_at: float = Field(..., description="Unix time the factor was set")
+    source: str
+
+
+class HedgeFactorPage(BaseModel):
+    items: List[HedgeFactorRecord]
+    total: int
+    next_after: Optional[str] = Field(None, description="Pass as 'after' to fetch the next page")
+
+
+class HedgeFactorHistory(BaseModel):
+    sellerNumber: str
+    items: List[HedgeFactorRecord]
+
+
 class ChartData(BaseModel):
-    path: str
+    path: Optional[str] = None
+    media_type: Optional[str] = None
     image_base64: Optional[str] = None
 
 
 class HedgeFactorReportResponse(BaseModel):
     status: str
     message: str
-    data: List[Dict[str, float]]
+    report_id: Optional[str] = None
+    data: Union[List[Dict[str, Union[str, float]]], Dict[str, List[Union[str, float]]]]
     charts: Dict[str, ChartData]
+    chart_data: Optional[Dict[str, Any]] = None
+
+
+class HedgeFactorReportJobRequest(BaseModel):
+    method: Optional[str] = Field(None, pattern="^(engine|llm)$", description="Factor method: 'engine' (default) or 'llm'")
+    incremental: bool = Field(False, description="Recompute only sellers whose rt changed since the last run")
+    sellers: Optional[List[Dict[str, Union[str, float]]]] = Field(None, description="Seller records; defaults to the configured seller file")
+
+
+class HedgeFactorReportJobResponse(BaseModel):
+    job_id: str
+    status: str
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    rows_completed: int = 0
+    data: List[Dict[str, Union[str, float]]] = []
+    report: Optional[HedgeFactorReportResponse] = None
+    error: Optional[str] = None
 
 # --- Step 3. Define POST endpoint ---
 @router.post("/update-hedge-factor", response_model=HedgeFactorResponse)
 async def update_hedge_factor(request: HedgeFactorRequest):
     """
     Update hedge factor for a given seller.
-    This would normally write to a database or another system.
+    Delegates to hedge_factor_service, which the chat agent also calls in-process.
     """
+    try:
+        # SQLite write (may wait on other writers): keep it off the event loop
+        result = await asyncio.to_thread(hedge_factor_service.update_hedge_factor, request.sellerNumber, request.hedgeFactor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    # Example of input validation / business rule
-    if not request.sellerNumber.isdigit():
-        raise HTTPException(status_code=400, detail="Invalid seller number format")
+    # --- Step 4. Return JSON response ---
+    return HedgeFactorResponse(**result)
 
-    # --- TODO: Add your real DB or API call logic here ---
-    print(f"Updating hedge factor for seller {request.sellerNumber} to {request.hedgeFactor}")
 
-    # --- Step 4. Return JSON response ---
-    return HedgeFactorResponse(
-        status="success",
-        message=f"Hedge factor updated for seller {request.sellerNumber}",
-        data=request
+@router.post("/update-hedge-factors:bulk", response_model=BulkUpdateResponse)
+async def bulk_update_hedge_factors(
+    request: Request,
+    mode: str = Query("rows", pattern="^(rows|report)$", description="'rows' reads updates from the body; 'report' applies a freshly generated report"),
+    method: Optional[str] = Query(None, pattern="^(engine|llm)$", description="Factor method for mode=report"),
+    incremental: bool = Query(False, description="Incremental report refresh for mode=report"),
+):
+    """
+    Update many hedge factors in one request and one database transaction.
+    The body is a JSON array of {sellerNumber, hedgeFactor} objects, or NDJSON
+    (Content-Type: application/x-ndjson) with one object per line.
+    mode=report ignores the body and stores the factors of a generated report
+    (factors in bps are converted to decimal hedge factors).
+    Rows are validated together; each row gets its own result.
+    """
+    if mode == "report":
+        analysis = await run_report_async(
+            include_base64=False,
+            show_plots=False,
+            method=method,
+            incremental=incremental,
+            chart_format="data",
+        )
+        result = await asyncio.to_thread(hedge_factor_service.apply_report, analysis.get("output", []))
+        return BulkUpdateResponse(**result)
+
+    if "ndjson" in request.headers.get("content-type", ""):
+        rows = await _read_ndjson(request)
+    else:
+        try:
+            rows = json.loads(await request.body())
+        except json.JSONDecodeError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid JSON body: {e}")
+        if not isinstance(rows, list):
+            raise HTTPException(status_code=400, detail="Body must be a JSON array of updates")
+
+    result = await asyncio.to_thread(hedge_factor_service.bulk_update_hedge_factors, rows)
+    return BulkUpdateResponse(**result)
+
+
+async def _read_ndjson(request: Request) -> List[Any]:
+    """Parse an NDJSON body as it arrives; undecodable lines become rows that fail validation."""
+    rows: List[Any] = []
+    buffer = b""
+
+    def parse(line: bytes) -> None:
+        if line.strip():
+            try:
+                rows.append(json.loads(line))
+            except json.JSONDecodeError:
+                rows.append(None)
+
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            parse(line)
+    parse(buffer)
+    return rows
+
+
+@router.get("/hedge-factors", response_model=HedgeFactorPage)
+async def list_hedge_factors(
+    limit: int = Query(100, ge=1, le=1000),
+    after: Optional[str] = Query(None, description="Return sellers after this sellerNumber"),
+):
+    """Current hedge factors ordered by sellerNumber, paginated by key."""
+    repository = get_hedge_factor_repository()
+    items = await asyncio.to_thread(repository.list_page, limit=limit, after=after)
+    return HedgeFactorPage(
+        items=items,
+        total=await asyncio.to_thread(repository.count),
+        next_after=items[-1]["sellerNumber"] if len(items) == limit else None,
+    )
+
+
+@router.get("/hedge-factors/{sellerNumber}", response_model=HedgeFactorRecord)
+async def get_hedge_factor(
+    sellerNumber: str,
+    at: Optional[str] = Query(None, description="Unix time or ISO 8601 timestamp; returns the factor in effect then"),
+):
+    """Current hedge factor for one seller, or the factor at a past time."""
+    repository = get_hedge_factor_repository()
+    if at is None:
+        record = await asyncio.to_thread(repository.get, sellerNumber)
+    else:
+        entry = await asyncio.to_thread(repository.get_at, sellerNumber, _parse_timestamp(at))
+        record = entry and {**entry, "updated_at": entry["recorded_at"]}
+    if record is None:
+        raise HTTPException(status_code=404, detail=f"No hedge factor for seller {sellerNumber}")
+    return HedgeFactorRecord(**record)
+
+
+@router.get("/hedge-factors/{sellerNumber}/history", response_model=HedgeFactorHistory)
+async def get_hedge_factor_history(sellerNumber: str, limit: int = Query(100, ge=1, le=1000)):
+    """Changes to one seller's hedge factor, most recent first."""
+    entries = await asyncio.to_thread(get_hedge_factor_repository().history, sellerNumber, limit=limit)
+    return HedgeFactorHistory(
+        sellerNumber=sellerNumber,
+        items=[{**entry, "updated_at": entry["recorded_at"]} for entry in entries],
     )
 
 
+def _parse_timestamp(value: str) -> float:
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid timestamp: {value}")
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
 @router.get("/generate-hedge-factor-report", response_model=HedgeFactorReportResponse)
-async def generate_hedge_factor_report():
+async def generate_hedge_factor_report(
+    request: Request,
+    method: Optional[str] = Query(None, pattern="^(engine|llm)$", description="Factor method: 'engine' (default) or 'llm'"),
+    incremental: bool = Query(False, description="Recompute only sellers whose rt changed since the last run"),
+    chart_format: str = Query("png", alias="format", pattern="^(png|webp|svg|data)$", description="Chart image format, or 'data' for chart data only"),
+    dpi: int = Query(300, ge=36, le=600, description="Chart resolution for raster formats"),
+    width: Optional[float] = Query(None, gt=0, le=40, description="Chart width in inches"),
+    height: Optional[float] = Query(None, gt=0, le=40, description="Chart height in inches"),
+    inline: bool = Query(False, description="Embed chart images as base64 instead of returning chart URLs"),
+    layout: str = Query("records", pattern="^(records|columns)$", description="'records' (one object per seller) or 'columns' ({Id: [...], rt: [...], factor: [...]})"),
+):
     """
-    Generate hedge factor values using the LLM pipeline and return chart data.
+    Generate hedge factor values and return chart data.
+    Uses the local anchor engine unless method=llm is requested.
+    The X-Cache header reports whether the result came from the report cache.
+    Runs in the report worker pool so the event loop stays responsive.
+    format=data skips rendering and returns chart_data for client-side drawing.
+    Chart paths point at GET /api/charts/{report_id}/{name} unless inline=true.
+    layout=columns returns data as parallel arrays instead of one object per seller.
+    With Accept: application/x-ndjson the rows are streamed one JSON object per line
+    as they are produced, followed by a {"summary": ...} record.
     """
+    return await _generate_report(
+        None, method, incremental, chart_format, dpi, width, height, inline, layout, stream=_wants_ndjson(request)
+    )
+
+
+@router.post("/generate-hedge-factor-report", response_model=HedgeFactorReportResponse)
+async def generate_hedge_factor_report_from_file(
+    request: Request,
+    sellers_file: UploadFile = File(..., description="Seller file with Id and rt columns: CSV, JSONL or Parquet"),
+    method: Optional[str] = Query(None, pattern="^(engine|llm)$", description="Factor method: 'engine' (default) or 'llm'"),
+    incremental: bool = Query(False, description="Recompute only sellers whose rt changed since the last run"),
+    chart_format: str = Query("png", alias="format", pattern="^(png|webp|svg|data)$", description="Chart image format, or 'data' for chart data only"),
+    dpi: int = Query(300, ge=36, le=600, description="Chart resolution for raster formats"),
+    width: Optional[float] = Query(None, gt=0, le=40, description="Chart width in inches"),
+    height: Optional[float] = Query(None, gt=0, le=40, description="Chart height in inches"),
+    inline: bool = Query(False, description="Embed chart images as base64 instead of returning chart URLs"),
+    layout: str = Query("records", pattern="^(records|columns)$", description="'records' (one object per seller) or 'columns' ({Id: [...], rt: [...], factor: [...]})"),
+):
+    """
+    Same report as the GET endpoint, for sellers uploaded as a multipart file.
+    The file is streamed into columnar arrays; the format comes from the file
+    name or its content type.
+    """
+    # Imported here so NumPy stays out of app startup
+    try:
+        from .seller_source import detect_format, load_sellers
+    except ImportError:
+        from seller_source import detect_format, load_sellers
+
     try:
-        analysis = run_hedge_factor_analysis(include_base64=True, show_plots=False)
-        return HedgeFactorReportResponse(
-            status="success",
-            message="Hedge factor report generated",
-            data=analysis.get("output", []),
-            charts=analysis.get("charts", {}),
+        fmt = detect_format(name=sellers_file.filename, media_type=sellers_file.content_type)
+        sellers = await asyncio.to_thread(load_sellers, sellers_file.file, fmt)
+    except (ValueError, ImportError) as exc:
+        raise HTTPException(status_code=400, detail=f"Could not read seller file: {exc}")
+    finally:
+        await sellers_file.close()
+    if not len(sellers):
+        raise HTTPException(status_code=400, detail="Seller file contains no sellers")
+
+    return await _generate_report(
+        sellers, method, incremental, chart_format, dpi, width, height, inline, layout, stream=_wants_ndjson(request)
+    )
+
+
+async def _generate_report(
+    sellers: Any,
+    method: Optional[str],
+    incremental: bool,
+    chart_format: str,
+    dpi: int,
+    width: Optional[float],
+    height: Optional[float],
+    inline: bool,
+    layout: str = "records",
+    stream: bool = False,
+) -> Response:
+    if (width is None) != (height is None):
+        raise HTTPException(status_code=400, detail="width and height must be given together")
+    if chart_format in ("png", "webp"):
+        chart_width, chart_height = (width, height) if width is not None else DEFAULT_CHART_SIZE
+        pixels = chart_width * chart_height * dpi * dpi
+        if pixels > MAX_CHART_PIXELS:
+            raise HTTPException(
+                status_code=422,
+                detail=f"Chart of {chart_width:g}x{chart_height:g} in at {dpi} dpi is {pixels / 1e6:.1f}M pixels; "
+                f"the limit is {MAX_CHART_PIXELS / 1e6:.1f}M (lower dpi or size)",
+            )
+
+    # Chart URLs are served from the report cache; without one, fall back to inline images
+    inline = inline or get_report_cache() is None
+    params = dict(
+        sellers=sellers,
+        include_base64=inline,
+        show_plots=False,
+        method=method,
+        incremental=incremental,
+        chart_format=chart_format,
+        chart_dpi=dpi,
+        chart_size=(width, height) if width is not None else None,
+    )
+    if stream:
+        return StreamingResponse(_stream_report(params, inline), media_type=NDJSON_MEDIA_TYPE)
+
+    try:
+        analysis = await run_report_async(**params)
+        # Encoded straight from the columnar output, without a per-row Pydantic pass
+        return _json_response(
+            _report_payload(analysis, inline, layout),
+            headers={"X-Cache": "HIT" if analysis.get("cache_hit") else "MISS"},
         )
     except HTTPException:
         raise
@@ -75,4 +370,194 @@ async def generate_hedge_factor_report():
         raise HTTPException(status_code=500, detail=f"Failed to generate hedge factor report: {exc}")
 
 
+def _report_payload(analysis: Dict[str, Any], inline: bool, layout: str = "records") -> Dict[str, Any]:
+    report_id = analysis.get("cache_key")
+    charts = {}
+    for name, chart in analysis.get("charts", {}).items():
+        charts[name] = {
+            "path": chart.get("path") if inline else f"{router.prefix}/charts/{report_id}/{name}",
+            "media_type": chart.get("media_type"),
+            "image_base64": chart.get("image_base64") if inline else None,
+        }
+    output = analysis.get("output")
+    if output is None:
+        data = [] if layout == "records" else {}
+    else:
+        data = output.to_records() if layout == "records" else output.to_columns()
+    return {
+        "status": "success",
+        "message": "Hedge factor report generated",
+        "report_id": report_id,
+        "data": data,
+        "charts": charts,
+        "chart_data": analysis.get("chart_data"),
+    }
+
+
+def _wants_ndjson(request: Request) -> bool:
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def _ndjson_lines(records: List[Any]) -> bytes:
+    if orjson is not None:
+        return b"".join(orjson.dumps(record) + b"\n" for record in records)
+    return "".join(json.dumps(record, separators=(",", ":")) + "\n" for record in records).encode("utf-8")
+
+
+async def _stream_report(params: Dict[str, Any], inline: bool):
+    """
+    Yield factor rows as NDJSON while the report runs in the pool, then one
+    {"summary": {...}} line with statistics, charts and chart_data
+    (or {"error": ...} if the report fails part-way).
+    """
+    try:
+        from .chart_data import summary_statistics
+    except ImportError:
+        from chart_data import summary_statistics
+
+    loop = asyncio.get_running_loop()
+    queue: "asyncio.Queue[Optional[List[Dict[str, Any]]]]" = asyncio.Queue()
+
+    def on_rows(rows: List[Dict[str, Any]]) -> None:
+        # Called from the report pool thread
+        loop.call_soon_threadsafe(queue.put_nowait, rows)
+
+    task = asyncio.ensure_future(run_report_in_pool(progress_callback=on_rows, **params))
+    task.add_done_callback(lambda _: queue.put_nowait(None))
+
+    finished = False
+    while not finished:
+        rows = await queue.get()
+        # Coalesce whatever else is already queued into one write
+        while rows is not None and not queue.empty():
+            more = queue.get_nowait()
+            if more is None:
+                finished = True
+                break
+            rows = rows + more
+        if rows is None:
+            break
+        yield _ndjson_lines(rows)
+
+    try:
+        analysis = task.result()
+    except Exception as exc:
+        yield _ndjson_lines([{"error": f"Failed to generate hedge factor report: {exc}"}])
+        return
+
+    summary = _report_payload(analysis, inline)
+    del summary["data"]
+    summary["cache_hit"] = bool(analysis.get("cache_hit"))
+    summary["statistics"] = summary_statistics(analysis["output"])
+    yield _ndjson_lines([{"summary": summary}])
+
+
+def _report_response(analysis: Dict[str, Any], inline: bool) -> HedgeFactorReportResponse:
+    return HedgeFactorReportResponse(**_report_payload(analysis, inline))
+
+
+def _json_response(payload: Any, status_code: int = 200, headers: Optional[Dict[str, str]] = None) -> Response:
+    if orjson is not None:
+        body = orjson.dumps(payload)
+    else:
+        body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return Response(content=body, status_code=status_code, headers=headers, media_type="application/json")
+
+
+def _sniff_media_type(data: bytes) -> str:
+    if data.startswith(b"\x89PNG"):
+        return "image/png"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    if data.lstrip()[:5] in (b"<?xml", b"<svg "):
+        return "image/svg+xml"
+    return "application/octet-stream"
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+@router.get("/charts/{report_id}/{name}")
+async def get_chart(report_id: str, name: str, request: Request):
+    """
+    Serve a report chart as binary with a content-hash ETag.
+    Conditional requests with a matching If-None-Match get 304 Not Modified.
+    """
+    cache = get_report_cache()
+    # SQLite read with the SQLite backend: keep it off the event loop
+    data = await asyncio.to_thread(cache.get_chart, report_id, name) if cache is not None else None
+    if data is None:
+        raise HTTPException(status_code=404, detail=f"Chart {name} for report {report_id} not found")
+
+    etag = f'"{hashlib.sha256(data).hexdigest()[:32]}"'
+    headers = {"ETag": etag, "Cache-Control": CHART_CACHE_CONTROL}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=data, media_type=_sniff_media_type(data), headers=headers)
+
+
+def _job_response(job) -> HedgeFactorReportJobResponse:
+    report = None
+    if job.result is not None:
+        report = _report_response(job.result, inline=job.params.get("include_base64", False))
+    return HedgeFactorReportJobResponse(
+        job_id=job.job_id,
+        status=job.status,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+        rows_completed=len(job.rows),
+        data=job.rows,
+        report=report,
+        error=job.error,
+    )
+
+
+@router.post("/hedge-factor-reports", response_model=HedgeFactorReportJobResponse, status_code=202)
+async def create_hedge_factor_report_job(request: Optional[HedgeFactorReportJobRequest] = None):
+    """
+    Queue a hedge factor report and return its job id immediately.
+    Poll GET /api/hedge-factor-reports/{job_id} or stream .../events for progress.
+    """
+    request = request or HedgeFactorReportJobRequest()
+    job = await report_jobs.asubmit(
+        sellers=request.sellers,
+        method=request.method,
+        incremental=request.incremental,
+        include_base64=get_report_cache() is None,
+        show_plots=False,
+    )
+    return _job_response(job)
+
+
+@router.get("/hedge-factor-reports/{job_id}", response_model=HedgeFactorReportJobResponse)
+async def get_hedge_factor_report_job(job_id: str):
+    """Return job status, the factor rows produced so far and the final report once finished."""
+    job = await report_jobs.aget(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Report job {job_id} not found")
+    return _job_response(job)
+
+
+@router.get("/hedge-factor-reports/{job_id}/events")
+async def stream_hedge_factor_report_job(job_id: str):
+    """Server-sent events: "rows" per completed chunk, "status" on state changes."""
+    if await report_jobs.aget(job_id) is None:
+        raise HTTPException(status_code=404, detail=f"Report job {job_id} not found")
+
+    async def event_stream():
+        async for name, payload in report_jobs.stream(job_id):
+            yield f"event: {name}\ndata: {json.dumps(payload)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 # Note: Root endpoint moved to main.py
@@ -0,0 +1,137 @@
+import numpy as np
+from typing import Sequence, Tuple
+
+# Step 1. Define the anchor mapping (same points the LLM prompt uses)
+ANCHORS: Tuple[Tuple[float, float], ...] = (
+    (1.0, 15.0),
+    (0.88, 28.0),
+    (0.80, 35.0),
+    (0.74, 40.5),
+    (0.72, 42.0),
+    (0.0, 55.0),
+)
+# Rates outside the anchors' range have no defined factor
+MIN_RATE = min(rate for rate, _ in ANCHORS)
+MAX_RATE = max(rate for rate, _ in ANCHORS)
+MIN_FACTOR = 15.0
+MAX_FACTOR = 55.0
+TARGET_MEAN = 35.0
+
+# Bump whenever the anchors, bounds or rebalancing rule change so cached results are invalidated
+ENGINE_VERSION = "pchip-v1"
+
+_ANCHOR_X = np.array(sorted(rate for rate, _ in ANCHORS), dtype=np.float64)
+_ANCHOR_Y = np.array([factor for _, factor in sorted(ANCHORS)], dtype=np.float64)
+
+
+# Step 2. Monotone cubic (PCHIP) interpolation through the anchors
+def _pchip_slopes(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Fritsch-Carlson derivatives that keep the interpolant monotone between anchors."""
+    h = np.diff(x)
+    delta = np.diff(y) / h
+    slopes = np.zeros_like(y)
+
+    # Interior points: weighted harmonic mean, zero where the secant slopes change sign
+    w1 = 2 * h[1:] + h[:-1]
+    w2 = h[1:] + 2 * h[:-1]
+    same_sign = (delta[:-1] * delta[1:]) > 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        harmonic = (w1 + w2) / (w1 / delta[:-1] + w2 / delta[1:])
+    slopes[1:-1] = np.where(same_sign, harmonic, 0.0)
+
+    # End points: one-sided three-point estimate, clipped to preserve shape
+    slopes[0] = _pchip_end_slope(h[0], h[1], delta[0], delta[1])
+    slopes[-1] = _pchip_end_slope(h[-1], h[-2], delta[-1], delta[-2])
+    return slopes
+
+
+def _pchip_end_slope(h0: float, h1: float, d0: float, d1: float) -> float:
+    slope = ((2 * h0 + h1) * d0 - h0 * d1) / (h0 + h1)
+    if np.sign(slope) != np.sign(d0):
+        return 0.0
+    if np.sign(d0) != np.sign(d1) and abs(slope) > abs(3 * d0):
+        return 3 * d0
+    return slope
+
+
+_ANCHOR_SLOPES = _pchip_slopes(_ANCHOR_X, _ANCHOR_Y)
+
+
+def _require_finite(values: np.ndarray, name: str) -> None:
+    """One NaN or infinity would spread to every factor through the portfolio mean."""
+    if not np.isfinite(values).all():
+        bad = int(np.flatnonzero(~np.isfinite(values))[0])
+        raise ValueError(f"{name} must be finite; got {values.ravel()[bad]} at index {bad}")
+
+
+def interpolate_factors(rates: Sequence[float]) -> np.ndarray:
+    """Map rates to factors along the monotone spline, clamped to [MIN_FACTOR, MAX_FACTOR]."""
+    x = np.asarray(rates, dtype=np.float64)
+    _require_finite(x, "rates")
+    x = np.clip(x, _ANCHOR_X[0], _ANCHOR_X[-1])
+
+    idx = np.clip(np.searchsorted(_ANCHOR_X, x, side="right") - 1, 0, len(_ANCHOR_X) - 2)
+    x0 = _ANCHOR_X[idx]
+    h = _ANCHOR_X[idx + 1] - x0
+    t = (x - x0) / h
+
+    # Cubic Hermite basis
+    t2 = t * t
+    t3 = t2 * t
+    h00 = 2 * t3 - 3 * t2 + 1
+    h10 = t3 - 2 * t2 + t
+    h01 = -2 * t3 + 3 * t2
+    h11 = t3 - t2
+
+    factors = (
+        h00 * _ANCHOR_Y[idx]
+        + h10 * h * _ANCHOR_SLOPES[idx]
+        + h01 * _ANCHOR_Y[idx + 1]
+        + h11 * h * _ANCHOR_SLOPES[idx + 1]
+    )
+    return np.clip(factors, MIN_FACTOR, MAX_FACTOR)
+
+
+# Step 3. Portfolio-level rebalancing toward the target mean
+def rebalance_to_target(
+    factors: np.ndarray,
+    target_mean: float = TARGET_MEAN,
+    tolerance: float = 1e-6,
+    max_iterations: int = 60,
+) -> np.ndarray:
+    """
+    Shift all factors by one common offset so the clamped mean hits target_mean.
+
+    A uniform shift keeps the ordering of sellers intact; the offset is found by
+    bisection because clamping makes the mean piecewise linear in the offset.
+    """
+    factors = np.asarray(factors, dtype=np.float64)
+    if factors.size == 0:
+        return factors
+    _require_finite(factors, "factors")
+
+    low, high = MIN_FACTOR - factors.max(), MAX_FACTOR - factors.min()
+    offset = 0.0
+    for _ in range(max_iterations):
+        offset = (low + high) / 2
+        mean = np.clip(factors + offset, MIN_FACTOR, MAX_FACTOR).mean()
+        if abs(mean - target_mean) <= tolerance:
+            break
+        if mean < target_mean:
+            low = offset
+        else:
+            high = offset
+
+    return np.clip(factors + offset, MIN_FACTOR, MAX_FACTOR)
+
+
+def compute_factors(
+    rates: Sequence[float],
+    rebalance: bool = True,
+    target_mean: float = TARGET_MEAN,
+) -> np.ndarray:
+    """Vectorized rate -> factor mapping for a whole portfolio in one call."""
+    factors = interpolate_factors(rates)
+    if rebalance:
+        factors = rebalance_to_target(factors, target_mean=target_mean)
+    return factors
@@ -0,0 +1,205 @@
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+try:
+    from .sqlite_pool import SQLiteConnectionPool
+except ImportError:
+    from sqlite_pool import SQLiteConnectionPool
+
+DEFAULT_HEDGE_FACTOR_DB_PATH = os.getenv("HEDGE_FACTOR_DB_PATH", os.path.join("cache", "hedge_factors.sqlite3"))
+
+
+# Step 1. Repository interface
+class HedgeFactorRepository(ABC):
+    """
+    Storage for the current hedge factor of each seller, plus an append-only
+    history of every change so the factor at any past time can be read back.
+    """
+
+    @abstractmethod
+    def upsert_many(self, updates: List[Tuple[str, float]], source: str = "api") -> int:
+        """Write (sellerNumber, hedgeFactor) pairs in one transaction; returns the number of rows written."""
+        ...
+
+    @abstractmethod
+    def get(self, seller_number: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def get_many(self, seller_numbers: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def list_page(self, limit: int = 100, after: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Current factors ordered by sellerNumber, starting after the given sellerNumber (keyset pagination)."""
+        ...
+
+    @abstractmethod
+    def count(self) -> int:
+        ...
+
+    @abstractmethod
+    def get_at(self, seller_number: str, at: float) -> Optional[Dict[str, Any]]:
+        """The factor that was in effect at the given Unix time, or None if the seller had none yet."""
+        ...
+
+    @abstractmethod
+    def history(self, seller_number: str, limit: int = 100) -> List[Dict[str, Any]]:
+        """Most recent changes first."""
+        ...
+
+    @abstractmethod
+    def clear(self) -> None:
+        ...
+
+
+# Step 2. SQLite implementation (WAL, pooled connections)
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS hedge_factors (
+    sellerNumber TEXT PRIMARY KEY,
+    hedgeFactor REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    source TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS hedge_factor_history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    sellerNumber TEXT NOT NULL,
+    hedgeFactor REAL NOT NULL,
+    recorded_at REAL NOT NULL,
+    source TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_hedge_factor_history_seller_time
+    ON hedge_factor_history (sellerNumber, recorded_at);
+CREATE TRIGGER IF NOT EXISTS hedge_factor_history_no_update
+    BEFORE UPDATE ON hedge_factor_history
+    BEGIN SELECT RAISE(ABORT, 'hedge_factor_history is append-only'); END;
+CREATE TRIGGER IF NOT EXISTS hedge_factor_history_no_delete
+    BEFORE DELETE ON hedge_factor_history
+    BEGIN SELECT RAISE(ABORT, 'hedge_factor_history is append-only'); END;
+"""
+
+
+class SQLiteHedgeFactorRepository(HedgeFactorRepository):
+    def __init__(self, path: str = DEFAULT_HEDGE_FACTOR_DB_PATH):
+        self.path = path
+        self._pool = SQLiteConnectionPool(path, schema=_SCHEMA)
+
+    def upsert_many(self, updates: List[Tuple[str, float]], source: str = "api") -> int:
+        """
+        Rows whose factor is unchanged are skipped, so re-applying an
+        (incremental) report only touches sellers whose factor moved. A seller
+        repeated in one batch counts once, with its last factor: the history
+        check runs before the upsert, so intermediate values would otherwise
+        leave history disagreeing with the current table.
+        """
+        now = time.time()
+        latest = dict(updates)
+        params = [(seller_number, hedge_factor, now, source) for seller_number, hedge_factor in latest.items()]
+        with self._pool.write() as conn:
+            conn.executemany(
+                """
+                INSERT INTO hedge_factor_history (sellerNumber, hedgeFactor, recorded_at, source)
+                SELECT ?1, ?2, ?3, ?4
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM hedge_factors WHERE sellerNumber = ?1 AND hedgeFactor = ?2
+                )
+                """,
+                params,
+            )
+            conn.executemany(
+                """
+                INSERT INTO hedge_factors (sellerNumber, hedgeFactor, updated_at, source)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(sellerNumber) DO UPDATE SET
+                    hedgeFactor = excluded.hedgeFactor,
+                    updated_at = excluded.updated_at,
+                    source = excluded.source
+                WHERE hedgeFactor != excluded.hedgeFactor
+                """,
+                params,
+            )
+        return len(latest)
+
+    def get(self, seller_number: str) -> Optional[Dict[str, Any]]:
+        row = self._pool.read().execute(
+            "SELECT * FROM hedge_factors WHERE sellerNumber = ?", (seller_number,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def get_many(self, seller_numbers: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        seller_numbers = [str(seller_number) for seller_number in seller_numbers]
+        records: Dict[str, Dict[str, Any]] = {}
+        conn = self._pool.read()
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(seller_numbers), 900):
+            batch = seller_numbers[start:start + 900]
+            placeholders = ",".join("?" * len(batch))
+            for row in conn.execute(
+                f"SELECT * FROM hedge_factors WHERE sellerNumber IN ({placeholders})", batch
+            ):
+                records[row["sellerNumber"]] = dict(row)
+        return records
+
+    def list_page(self, limit: int = 100, after: Optional[str] = None) -> List[Dict[str, Any]]:
+        rows = self._pool.read().execute(
+            "SELECT * FROM hedge_factors WHERE sellerNumber > ? ORDER BY sellerNumber LIMIT ?",
+            (after or "", limit),
+        )
+        return [dict(row) for row in rows]
+
+    def count(self) -> int:
+        return self._pool.read().execute("SELECT COUNT(*) FROM hedge_factors").fetchone()[0]
+
+    def get_at(self, seller_number: str, at: float) -> Optional[Dict[str, Any]]:
+        row = self._pool.read().execute(
+            """
+            SELECT sellerNumber, hedgeFactor, recorded_at, source FROM hedge_factor_history
+            WHERE sellerNumber = ? AND recorded_at <= ?
+            ORDER BY recorded_at DESC, id DESC LIMIT 1
+            """,
+            (seller_number, at),
+        ).fetchone()
+        return dict(row) if row else None
+
+    def history(self, seller_number: str, limit: int = 100) -> List[Dict[str, Any]]:
+        rows = self._pool.read().execute(
+            """
+            SELECT sellerNumber, hedgeFactor, recorded_at, source FROM hedge_factor_history
+            WHERE sellerNumber = ? ORDER BY recorded_at DESC, id DESC LIMIT ?
+            """,
+            (seller_number, limit),
+        )
+        return [dict(row) for row in rows]
+
+    def clear(self) -> None:
+        """Drop current factors only; history is append-only and kept."""
+        with self._pool.write() as conn:
+            conn.execute("DELETE FROM hedge_factors")
+
+    def close(self) -> None:
+        self._pool.close()
+
+
+# Step 3. Process-wide repository
+_repository: Optional[HedgeFactorRepository] = None
+_repository_lock = threading.Lock()
+
+
+def get_hedge_factor_repository() -> HedgeFactorRepository:
+    """Return the process-wide hedge factor repository."""
+    global _repository
+    if _repository is None:
+        with _repository_lock:
+            if _repository is None:
+                _repository = SQLiteHedgeFactorRepository()
+    return _repository
+
+
+def set_hedge_factor_repository(repository: HedgeFactorRepository) -> None:
+    """Swap the process-wide repository (e.g. to plug in a different database)."""
+    global _repository
+    with _repository_lock:
+        _repository = repository
@@ -0,0 +1,274 @@
+import asyncio
+import numbers
+import os
+import threading
+from typing import Any, Dict, List, Optional
+from typing_extensions import TypedDict
+
+try:
+    from .hedge_factor_repository import get_hedge_factor_repository
+except ImportError:
+    from hedge_factor_repository import get_hedge_factor_repository
+
+# Step 1. Configuration
+# "local" calls update_hedge_factor in-process; "remote" posts to a hedge factor API over HTTP
+# (for when the agent runs outside the API server).
+API_MODE = os.getenv("HEDGE_FACTOR_API_MODE", "local").lower()
+API_BASE_URL = os.getenv("HEDGE_FACTOR_API_URL", f"http://localhost:{os.getenv('API_PORT', '8000')}")
+API_TIMEOUT_SECONDS = float(os.getenv("HEDGE_FACTOR_API_TIMEOUT", "10"))
+API_MAX_CONNECTIONS = int(os.getenv("HEDGE_FACTOR_API_MAX_CONNECTIONS", "20"))
+
+
+# Step 2. Types
+class InvalidSellerNumberError(ValueError):
+    """Raised when a seller number fails the format rule."""
+
+
+class InvalidHedgeFactorError(ValueError):
+    """Raised when a hedge factor is outside [0, 1]."""
+
+
+class HedgeFactorData(TypedDict):
+    sellerNumber: str
+    hedgeFactor: float
+
+
+class HedgeFactorUpdateResult(TypedDict):
+    status: str
+    message: str
+    data: HedgeFactorData
+
+
+class BulkRowResult(TypedDict):
+    index: int
+    sellerNumber: Optional[str]
+    hedgeFactor: Optional[float]
+    status: str  # "updated" or "rejected"
+    error: Optional[str]
+
+
+class BulkUpdateResult(TypedDict):
+    status: str
+    total: int
+    updated: int
+    rejected: int
+    results: List[BulkRowResult]
+
+
+# Step 3. In-process service
+def validate_hedge_factor_update(seller_number: str, hedge_factor: float) -> None:
+    """Business rules shared by the HTTP route and the chat agent."""
+    if not isinstance(seller_number, str) or not seller_number.isdigit():
+        raise InvalidSellerNumberError("Invalid seller number format")
+    if hedge_factor is None or not 0 <= float(hedge_factor) <= 1:
+        raise InvalidHedgeFactorError("Hedge factor must be between 0 and 1")
+
+
+def update_hedge_factor(seller_number: str, hedge_factor: float) -> HedgeFactorUpdateResult:
+    """Validate and store the hedge factor for one seller (recorded in the history table)."""
+    validate_hedge_factor_update(seller_number, hedge_factor)
+    get_hedge_factor_repository().upsert_many([(seller_number, float(hedge_factor))], source="api")
+
+    return {
+        "status": "success",
+        "message": f"Hedge factor updated for seller {seller_number}",
+        "data": {"sellerNumber": seller_number, "hedgeFactor": float(hedge_factor)},
+    }
+
+
+# Step 4. Bulk updates: one vectorized validation pass, one transaction
+def _to_float(value: Any) -> float:
+    """The value as a float if it is a real number, else NaN (bools and numeric strings included)."""
+    if isinstance(value, bool) or not isinstance(value, numbers.Real):
+        return float("nan")
+    return float(value)
+
+
+def validate_bulk_updates(rows: List[Any], alphanumeric_ids: bool = False) -> List[BulkRowResult]:
+    """
+    Apply the update rules to every row at once.
+
+    Rows are {"sellerNumber", "hedgeFactor"} dicts; anything else is rejected.
+    alphanumeric_ids relaxes the digits-only rule for report Ids such as "968ABC8".
+    """
+    import numpy as np
+
+    is_dict = np.array([isinstance(row, dict) for row in rows], dtype=bool)
+    raw_sellers = [row.get("sellerNumber") if isinstance(row, dict) else None for row in rows]
+    raw_factors = [row.get("hedgeFactor") if isinstance(row, dict) else None for row in rows]
+
+    sellers = np.array([seller if isinstance(seller, str) else "" for seller in raw_sellers], dtype=str)
+    # Per element, so true/false and "0.5" are rejected rather than coerced by NumPy
+    factors = np.fromiter((_to_float(factor) for factor in raw_factors), dtype=np.float64, count=len(raw_factors))
+
+    seller_ok = np.char.isalnum(sellers) if alphanumeric_ids else np.char.isdigit(sellers)
+    seller_ok &= is_dict & (np.char.str_len(sellers) > 0)
+    factor_ok = (factors >= 0) & (factors <= 1)  # NaN compares False
+
+    errors = np.where(
+        ~is_dict, "Row must be an object with sellerNumber and hedgeFactor",
+        np.where(
+            ~seller_ok, "Invalid seller number format",
+            np.where(~factor_ok, "Hedge factor must be between 0 and 1", ""),
+        ),
+    )
+
+    return [
+        {
+            "index": index,
+            "sellerNumber": raw_sellers[index] if isinstance(raw_sellers[index], str) else None,
+            "hedgeFactor": None if np.isnan(factors[index]) else float(factors[index]),
+            "status": "rejected" if error else "updated",
+            "error": error or None,
+        }
+        for index, error in enumerate(errors.tolist())
+    ]
+
+
+def bulk_update_hedge_factors(rows: List[Any], source: str = "api", alphanumeric_ids: bool = False) -> BulkUpdateResult:
+    """Validate all rows, then write the valid ones in a single transaction."""
+    results = validate_bulk_updates(rows, alphanumeric_ids=alphanumeric_ids)
+    updates = [
+        (result["sellerNumber"], result["hedgeFactor"])
+        for result in results
+        if result["status"] == "updated"
+    ]
+    if updates:
+        get_hedge_factor_repository().upsert_many(updates, source=source)
+
+    rejected = len(results) - len(updates)
+    return {
+        "status": "success" if not rejected else ("partial" if updates else "failed"),
+        "total": len(results),
+        "updated": len(updates),
+        "rejected": rejected,
+        "results": results,
+    }
+
+
+def report_rows_to_updates(output: Any) -> List[Dict[str, Any]]:
+    """Map report output (SellerBatch or {"Id", "rt", "factor" (bps)} records) to {"sellerNumber", "hedgeFactor" (decimal)} rows."""
+    if hasattr(output, "to_columns"):
+        columns = output.to_columns()
+        factors = columns.get("factor") or [float("nan")] * len(columns["Id"])
+        return [
+            {"sellerNumber": seller_id, "hedgeFactor": factor / 10000.0}
+            for seller_id, factor in zip(columns["Id"], factors)
+        ]
+    return [
+        {"sellerNumber": str(record.get("Id", "")), "hedgeFactor": _to_float(record.get("factor")) / 10000.0}
+        for record in output
+    ]
+
+
+def apply_report(output: Any) -> BulkUpdateResult:
+    """Store the factors of a run_hedge_factor_analysis result (report Ids are alphanumeric)."""
+    return bulk_update_hedge_factors(report_rows_to_updates(output), source="report", alphanumeric_ids=True)
+
+
+# Step 5. Remote mode: pooled HTTP clients with timeouts
+_sync_client = None
+_async_client = None
+_client_lock = threading.Lock()
+
+
+def _client_options() -> dict:
+    import httpx
+
+    return {
+        "base_url": API_BASE_URL,
+        "timeout": httpx.Timeout(API_TIMEOUT_SECONDS),
+        "limits": httpx.Limits(max_connections=API_MAX_CONNECTIONS, max_keepalive_connections=API_MAX_CONNECTIONS),
+    }
+
+
+def get_sync_client():
+    global _sync_client
+    if _sync_client is None:
+        with _client_lock:
+            if _sync_client is None:
+                import httpx
+
+                _sync_client = httpx.Client(**_client_options())
+    return _sync_client
+
+
+def get_async_client():
+    global _async_client
+    if _async_client is None:
+        with _client_lock:
+            if _async_client is None:
+                import httpx
+
+                _async_client = httpx.AsyncClient(**_client_options())
+    return _async_client
+
+
+def update_hedge_factor_remote(seller_number: str, hedge_factor: float) -> dict:
+    response = get_sync_client().post(
+        "/api/update-hedge-factor",
+        json={"sellerNumber": seller_number, "hedgeFactor": hedge_factor},
+    )
+    return response.json()
+
+
+async def aupdate_hedge_factor_remote(seller_number: str, hedge_factor: float) -> dict:
+    response = await get_async_client().post(
+        "/api/update-hedge-factor",
+        json={"sellerNumber": seller_number, "hedgeFactor": hedge_factor},
+    )
+    return response.json()
+
+
+def bulk_update_hedge_factors_remote(rows: List[Any]) -> dict:
+    response = get_sync_client().post("/api/update-hedge-factors:bulk", json=rows)
+    return response.json()
+
+
+async def abulk_update_hedge_factors_remote(rows: List[Any]) -> dict:
+    response = await get_async_client().post("/api/update-hedge-factors:bulk", json=rows)
+    return response.json()
+
+
+async def aclose_clients() -> None:
+    """Close pooled HTTP clients (call on application shutdown)."""
+    global _sync_client, _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+    if _sync_client is not None:
+        _sync_client.close()
+        _sync_client = None
+
+
+# Step 6. Entry points for callers that should not care about the mode
+def apply_hedge_factor_update(seller_number: str, hedge_factor: float, mode: Optional[str] = None) -> dict:
+    """Apply an update in-process or via the remote API; errors come back in the API's error shape."""
+    if (mode or API_MODE) == "remote":
+        return update_hedge_factor_remote(seller_number, hedge_factor)
+    try:
+        return dict(update_hedge_factor(seller_number, hedge_factor))
+    except ValueError as exc:
+        return {"detail": str(exc)}
+
+
+async def aapply_hedge_factor_update(seller_number: str, hedge_factor: float, mode: Optional[str] = None) -> dict:
+    if (mode or API_MODE) == "remote":
+        return await aupdate_hedge_factor_remote(seller_number, hedge_factor)
+    try:
+        return dict(await asyncio.to_thread(update_hedge_factor, seller_number, hedge_factor))
+    except ValueError as exc:
+        return {"detail": str(exc)}
+
+
+def apply_bulk_update(rows: List[Any], mode: Optional[str] = None) -> dict:
+    """Apply many updates in one write, in-process or via the remote bulk endpoint."""
+    if (mode or API_MODE) == "remote":
+        return bulk_update_hedge_factors_remote(rows)
+    return dict(bulk_update_hedge_factors(rows))
+
+
+async def aapply_bulk_update(rows: List[Any], mode: Optional[str] = None) -> dict:
+    if (mode or API_MODE) == "remote":
+        return await abulk_update_hedge_factors_remote(rows)
+    return dict(await asyncio.to_thread(bulk_update_hedge_factors, rows))
@@ -0,0 +1,142 @@
+import copy
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+try:
+    from .telemetry import CACHE_REQUESTS
+except ImportError:
+    from telemetry import CACHE_REQUESTS
+
+INTENT_CACHE_ENABLED = os.getenv("HEDGE_FACTOR_INTENT_CACHE", "true").lower() in ("1", "true", "yes")
+DEFAULT_INTENT_CACHE_TTL_SECONDS = float(os.getenv("HEDGE_FACTOR_INTENT_CACHE_TTL", "3600"))
+DEFAULT_INTENT_CACHE_MAX_ENTRIES = int(os.getenv("HEDGE_FACTOR_INTENT_CACHE_MAX_ENTRIES", "1024"))
+
+# Step 1. Normalization: commands that differ only in wording the parse ignores share a key
+_AMOUNT_WITH_UNIT = re.compile(
+    r"(?<![\w.])(?P<sign>[-+]\s*)?(?P<value>\d+(?:\.\d+)?|\.\d+)\s*(?P<unit>bps|bp|basis\s+points?|%|percent|pct)(?![a-z])",
+    re.IGNORECASE,
+)
+# Signs stay part of a number ("-25bps" and "25bps" are different commands)
+_TOKEN = re.compile(r"[-+]?\d*\.\d+|[-+]?\d[a-z0-9]*|[a-z0-9]+")
+# Words that never change which seller gets which factor (order of the rest is kept, so pairing survives)
+_FILLER_WORDS = frozenset({
+    "a", "an", "the", "please", "pls", "add", "set", "update", "change", "make", "put",
+    "hedge", "factor", "factors", "of", "for", "to", "at", "as", "is", "be", "and",
+    "number", "num", "id", "new", "value",
+})
+
+
+def _canonical_amount(match: "re.Match") -> str:
+    value = float(match.group("value"))
+    if not match.group("unit").lower().startswith("b"):
+        value *= 100  # percent -> bps
+    sign = (match.group("sign") or "").strip()
+    return f" {sign}{round(value, 6):g}bps "
+
+
+def normalize_command(text: str) -> str:
+    """
+    Canonical form of a chat command: lower case, single spaces, amounts in bps
+    ("0.25 %", "25 basis points" and "25bps" all become "25bps"), and filler words
+    dropped, so "25 bps seller 123450001" and "add hedge factor 25bps for seller
+    123450001" normalize to the same "25bps seller 123450001". Signs and relative
+    wording ("by", "increase", ...) are kept, so "-25bps" or "lower ... by 25bps"
+    never share a key with "25bps".
+    """
+    text = _AMOUNT_WITH_UNIT.sub(_canonical_amount, (text or "").lower().replace("\u2212", "-"))
+    tokens = ("seller" if token == "sellers" else token for token in _TOKEN.findall(text))
+    return " ".join(token for token in tokens if token not in _FILLER_WORDS)
+
+
+# Step 2. Bounded LRU/TTL cache of parsed instructions
+class IntentCache:
+    """
+    Normalized command -> parsed [{"sellerNumber", "hedgeFactor"}, ...].
+
+    Entries are tagged with the version they were parsed under (prompt hash and
+    model id); the first lookup under a different version drops them all.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = DEFAULT_INTENT_CACHE_TTL_SECONDS,
+        max_entries: int = DEFAULT_INTENT_CACHE_MAX_ENTRIES,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._version: Optional[str] = None
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _check_version(self, version: str) -> None:
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+
+    def get(self, text: str, version: str) -> Optional[List[Dict[str, Any]]]:
+        key = normalize_command(text)
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry[0] > self.ttl_seconds:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+        CACHE_REQUESTS.labels("intent", "miss" if entry is None else "hit").inc()
+        return copy.deepcopy(entry[1]) if entry is not None else None
+
+    def set(self, text: str, version: str, instructions: List[Dict[str, Any]]) -> None:
+        key = normalize_command(text)
+        if not key or not instructions:
+            return
+        with self._lock:
+            self._check_version(version)
+            self._entries[key] = (time.time(), copy.deepcopy(instructions))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total) if total else 0.0,
+        }
+
+
+_intent_cache: Optional[IntentCache] = None
+_intent_cache_lock = threading.Lock()
+
+
+def get_intent_cache() -> Optional[IntentCache]:
+    """Return the process-wide intent cache, or None when HEDGE_FACTOR_INTENT_CACHE is off."""
+    global _intent_cache
+    if not INTENT_CACHE_ENABLED:
+        return None
+    if _intent_cache is None:
+        with _intent_cache_lock:
+            if _intent_cache is None:
+                _intent_cache = IntentCache()
+    return _intent_cache
+
+
+def set_intent_cache(cache: Optional[IntentCache]) -> None:
+    global _intent_cache
+    with _intent_cache_lock:
+        _intent_cache = cache
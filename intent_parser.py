@@ -0,0 +1,161 @@
+import re
+from typing import Dict, List, Tuple
+
+# Regex/grammar fast path for hedge-factor chat commands such as
+#   "add a hedge factor of 25bps for seller number 123450001"
+#   "set seller #123450001 to 0.25%"
+#   "sellers 123450001 and 123450002 -> 30 bps"
+#   "25bps for seller 123450001 and 40 bps for seller 123450002"
+# Anything the grammar cannot resolve confidently goes to the LLM instead.
+
+_SELLER_KEYWORD = re.compile(
+    r"\bsellers?\b(?:\s*(?:number|num|no\.?|id|#)s?)?\s*[:#]?\s*(?P<first>\d{3,})"
+    r"(?P<rest>(?:\s*(?:,|\band\b|&|/)\s*#?\s*\d{3,})*)",
+    re.IGNORECASE,
+)
+_SELLER_HASH = re.compile(r"#\s*(\d{3,})")
+_SELLER_BARE = re.compile(r"(?<![\d.])(\d{6,})(?![\d.])")
+_LIST_NUMBER = re.compile(r"\d{3,}")
+_ANY_NUMBER = re.compile(r"(?<![\w.])\d+(?:\.\d+)?")
+# "-25bps" (the grammar only reads magnitudes) and changes relative to the current factor
+_SIGNED_NUMBER = re.compile(r"(?<![\w.])[-+\u2212]\s*\.?\d")
+_RELATIVE_WORDING = re.compile(
+    r"\b(?:by|increase[sd]?|decrease[sd]?|raise[sd]?|lower(?:ed|s)?|reduce[sd]?|plus|minus)\b",
+    re.IGNORECASE,
+)
+
+_AMOUNT_WITH_UNIT = re.compile(
+    r"(?<![\w.])(?P<value>\d+(?:\.\d+)?|\.\d+)\s*(?P<unit>bps|bp|basis\s+points?|%|percent|pct)(?![a-z])",
+    re.IGNORECASE,
+)
+_AMOUNT_DECIMAL = re.compile(r"(?<![\w.])(?P<value>0?\.\d+)(?![\d.])")
+_AMOUNT_BARE = re.compile(
+    r"\b(?:hedge\s*factor|factor|to|of|=)\s*(?:of|to|=)?\s*(?P<value>\d+(?:\.\d+)?)(?![\d.%])",
+    re.IGNORECASE,
+)
+
+# Bullets and numbering in pasted lists: "- ", "* ", "1. ", "2) "
+_LIST_MARKER = re.compile(r"^\s*(?:[-*\u2022]|\d{1,3}[.)])\s+")
+
+_UNIT_DIVISORS = {"bps": 10000.0, "bp": 10000.0, "basis": 10000.0, "%": 100.0, "percent": 100.0, "pct": 100.0}
+
+# Confidence levels for the different ways a value can be recognised
+CONFIDENCE_EXPLICIT = 1.0
+CONFIDENCE_DECIMAL = 0.9
+CONFIDENCE_BARE_SELLER = 0.75
+CONFIDENCE_AMBIGUOUS = 0.4
+# A bare decimal above this (100 bps) is more likely a misread bps or percent value than a factor
+MAX_PLAUSIBLE_DECIMAL = 0.01
+
+
+def _unit_divisor(unit: str) -> float:
+    return _UNIT_DIVISORS[unit.lower().split()[0]]
+
+
+def _find_sellers(text: str) -> Tuple[List[Tuple[int, str]], float, List[Tuple[int, int]]]:
+    """Return [(position, seller number)], confidence, and the spans consumed."""
+    sellers: List[Tuple[int, str]] = []
+    spans: List[Tuple[int, int]] = []
+
+    for match in _SELLER_KEYWORD.finditer(text):
+        spans.append(match.span())
+        sellers.append((match.start("first"), match.group("first")))
+        for extra in _LIST_NUMBER.finditer(match.group("rest") or ""):
+            sellers.append((match.start("rest") + extra.start(), extra.group(0)))
+    for match in _SELLER_HASH.finditer(text):
+        if not _inside(match.start(), spans):
+            spans.append(match.span())
+            sellers.append((match.start(), match.group(1)))
+    if sellers:
+        return sorted(sellers), CONFIDENCE_EXPLICIT, spans
+
+    # No "seller"/"#" marker: accept long bare numbers, with lower confidence
+    for match in _SELLER_BARE.finditer(text):
+        spans.append(match.span())
+        sellers.append((match.start(), match.group(1)))
+    return sellers, CONFIDENCE_BARE_SELLER, spans
+
+
+def _find_amounts(
+    text: str, seller_spans: List[Tuple[int, int]]
+) -> Tuple[List[Tuple[int, float]], float, List[Tuple[int, int]]]:
+    """Return [(position, hedge factor as decimal)], confidence, and the spans consumed."""
+    amounts: List[Tuple[int, float]] = []
+    spans: List[Tuple[int, int]] = []
+
+    for match in _AMOUNT_WITH_UNIT.finditer(text):
+        if _inside(match.start(), seller_spans + spans):
+            continue
+        spans.append(match.span())
+        amounts.append((match.start(), float(match.group("value")) / _unit_divisor(match.group("unit"))))
+    if amounts:
+        return amounts, CONFIDENCE_EXPLICIT, spans
+
+    for match in _AMOUNT_DECIMAL.finditer(text):
+        if not _inside(match.start(), seller_spans):
+            spans.append(match.span())
+            amounts.append((match.start(), float(match.group("value"))))
+    if amounts:
+        plausible = all(amount <= MAX_PLAUSIBLE_DECIMAL for _, amount in amounts)
+        return amounts, CONFIDENCE_DECIMAL if plausible else CONFIDENCE_AMBIGUOUS, spans
+
+    # A number with no unit ("hedge factor of 25"): most likely bps, but ambiguous
+    for match in _AMOUNT_BARE.finditer(text):
+        if not _inside(match.start("value"), seller_spans):
+            spans.append(match.span("value"))
+            amounts.append((match.start("value"), float(match.group("value")) / 10000.0))
+    return amounts, CONFIDENCE_AMBIGUOUS, spans
+
+
+def _inside(position: int, spans: List[Tuple[int, int]]) -> bool:
+    return any(start <= position < end for start, end in spans)
+
+
+def parse_hedge_factor_command(text: str) -> Tuple[List[Dict[str, object]], float]:
+    """
+    Extract [{"sellerNumber": str, "hedgeFactor": float}, ...] from a chat command.
+
+    Returns the instructions and a confidence in [0, 1]. Hedge factors are converted
+    to decimal form (25bps -> 0.0025, 0.25% -> 0.0025). Low confidence means the
+    caller should fall back to the LLM.
+    """
+    if not text or not text.strip():
+        return [], 0.0
+    # Signs and relative changes ("decrease ... by 10bps") are left to the LLM
+    if _SIGNED_NUMBER.search(text) or _RELATIVE_WORDING.search(text):
+        return [], 0.0
+
+    sellers, seller_confidence, seller_spans = _find_sellers(text)
+    amounts, amount_confidence, amount_spans = _find_amounts(text, seller_spans)
+    if not sellers or not amounts:
+        return [], 0.0
+
+    # A number that is neither a seller nor an amount ("seller 12345 0001 to 25bps") makes the pairing a guess
+    consumed = seller_spans + amount_spans
+    if any(not _inside(match.start(), consumed) for match in _ANY_NUMBER.finditer(text)):
+        return [], 0.0
+
+    if len(amounts) == 1:
+        # "set sellers A and B to 25bps": one value for every seller
+        pairs = [(seller, amounts[0][1]) for _, seller in sellers]
+    elif len(amounts) == len(sellers):
+        # "25bps for seller A and 40bps for seller B": pair in order of appearance
+        pairs = [(seller, amount) for (_, seller), (_, amount) in zip(sellers, amounts)]
+    else:
+        return [], 0.0
+
+    if any(not 0 <= amount <= 1 for _, amount in pairs):
+        return [], 0.0
+
+    instructions = [
+        {"sellerNumber": seller, "hedgeFactor": round(amount, 10)}
+        for seller, amount in pairs
+    ]
+    return instructions, min(seller_confidence, amount_confidence)
+
+
+
+def split_instructions(text: str) -> List[str]:
+    """Split a pasted multi-line message into one instruction per non-empty line, without list markers."""
+    lines = (_LIST_MARKER.sub("", line).strip() for line in (text or "").splitlines())
+    return [line for line in lines if line]
@@ -0,0 +1,377 @@
+import asyncio
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Callable, Iterator, Optional
+
+from langchain_core.runnables import Runnable
+
+try:
+    from . import telemetry
+except ImportError:
+    import telemetry
+
+logger = telemetry.get_logger(__name__)
+
+# HEDGE_FACTOR_FAKE_LLM=true swaps Bedrock for the local stand-in in fake_bedrock.py (benchmarks, load tests)
+USE_FAKE_LLM = os.getenv("HEDGE_FACTOR_FAKE_LLM", "false").lower() in ("1", "true", "yes")
+LLM_REGION = os.getenv("AWS_REGION", "us-east-1")
+
+# Transport: one pooled bedrock-runtime client; botocore's adaptive mode retries throttling and
+# transient errors with exponential backoff and jitter (and slows its own send rate when throttled)
+LLM_POOL_SIZE = int(os.getenv("HEDGE_FACTOR_LLM_POOL_SIZE", "32"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("HEDGE_FACTOR_LLM_CONNECT_TIMEOUT", "5"))
+LLM_READ_TIMEOUT = float(os.getenv("HEDGE_FACTOR_LLM_READ_TIMEOUT", "60"))
+LLM_MAX_ATTEMPTS = int(os.getenv("HEDGE_FACTOR_LLM_MAX_ATTEMPTS", "4"))
+
+# Per-call deadline in seconds, covering the wait for a rate limiter token and the call itself
+LLM_DEADLINE_SECONDS = float(os.getenv("HEDGE_FACTOR_LLM_DEADLINE", "120"))
+
+# Token bucket sized to the Bedrock requests-per-minute quota (0 = unlimited). The bucket is per
+# process, so with HEDGE_FACTOR_WORKERS server processes (serve.py sets it) each takes an equal share
+LLM_QUOTA_SHARES = max(1, int(os.getenv("HEDGE_FACTOR_WORKERS", "1")))
+LLM_REQUESTS_PER_MINUTE = float(os.getenv("HEDGE_FACTOR_LLM_RPM", "200")) / LLM_QUOTA_SHARES
+LLM_BURST = max(1, int(os.getenv("HEDGE_FACTOR_LLM_BURST", "10")) // LLM_QUOTA_SHARES)
+
+# Circuit breaker: fail fast after this many consecutive failures (0 = off), probe again after the cool-down
+LLM_BREAKER_THRESHOLD = int(os.getenv("HEDGE_FACTOR_LLM_BREAKER_THRESHOLD", "5"))
+LLM_BREAKER_RESET_SECONDS = float(os.getenv("HEDGE_FACTOR_LLM_BREAKER_RESET", "30"))
+
+
+class LLMUnavailableError(RuntimeError):
+    """Raised without calling Bedrock while the circuit breaker is open."""
+
+
+class LLMDeadlineExceeded(TimeoutError):
+    """The call could not finish (or get a rate limiter token) within its deadline."""
+
+
+# Step 1. Token bucket rate limiter
+class TokenBucket:
+    """
+    Requests-per-second limiter shared by threads and event loops.
+
+    Each caller reserves a token up front; the balance may go negative, and the
+    deficit is how long that caller sleeps. Reservations are therefore served in
+    arrival order without a condition variable, and the same bucket works for
+    blocking and async callers. clock is a monotonic time source (injectable for tests).
+    """
+
+    def __init__(self, rate_per_second: float, burst: int, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate_per_second
+        self.capacity = max(1, burst)
+        self._clock = clock
+        self._tokens = float(self.capacity)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self, max_wait: Optional[float] = None) -> float:
+        """Take a token and return the seconds to wait for it; raises LLMDeadlineExceeded past max_wait."""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = max(0.0, (1 - self._tokens) / self.rate)
+            if max_wait is not None and wait > max_wait:
+                raise LLMDeadlineExceeded(f"No rate limiter token within {max_wait:.1f}s")
+            self._tokens -= 1
+        return wait
+
+
+# Step 2. Circuit breaker
+class CircuitBreaker:
+    """
+    Closed: calls go through. After `threshold` consecutive failures it opens and
+    calls fail fast with LLMUnavailableError. After `reset_seconds` one probe call
+    is let through (half-open); its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, threshold: int, reset_seconds: float, clock: Callable[[], float] = time.monotonic):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self._clock = clock
+        self.state = "closed"
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self) -> None:
+        if self.threshold <= 0:
+            return
+        with self._lock:
+            if self.state == "closed":
+                return
+            if self.state == "open" and self._clock() - self._opened_at >= self.reset_seconds:
+                self.state = "half_open"
+                self._probe_in_flight = False
+            if self.state == "half_open" and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return
+            retry_in = max(0.0, self.reset_seconds - (self._clock() - self._opened_at))
+        raise LLMUnavailableError(f"LLM circuit breaker is open; retry in {retry_in:.1f}s")
+
+    def release(self) -> None:
+        """Give up an admitted call without an outcome (rejected by the limiter, cancelled)."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.state = "closed"
+            self._probe_in_flight = False
+        telemetry.LLM_CIRCUIT_OPEN.labels().set(0)
+
+    def record_failure(self) -> None:
+        if self.threshold <= 0:
+            return
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.threshold:
+                if self.state != "open":
+                    logger.warning("LLM circuit breaker opened", extra={"failures": self.failures})
+                self.state = "open"
+                self._opened_at = self._clock()
+                self._probe_in_flight = False
+        if self.state == "open":
+            telemetry.LLM_CIRCUIT_OPEN.labels().set(1)
+
+
+# Step 3. Gateway
+@contextmanager
+def _queued(graph: str) -> Iterator[None]:
+    """Count a caller in the limiter queue depth while it waits for its token."""
+    depth = telemetry.LLM_QUEUE_DEPTH.labels(graph)
+    depth.inc()
+    try:
+        yield
+    finally:
+        depth.dec()
+
+
+class LLMGateway:
+    """
+    The one way both graphs reach Bedrock: a shared, pooled client plus the rate
+    limiter, circuit breaker and deadline around every call. Set
+    HEDGE_FACTOR_FAKE_LLM=true to get the local stand-in instead of ChatBedrock.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float = LLM_REQUESTS_PER_MINUTE,
+        burst: int = LLM_BURST,
+        breaker_threshold: int = LLM_BREAKER_THRESHOLD,
+        breaker_reset_seconds: float = LLM_BREAKER_RESET_SECONDS,
+        deadline_seconds: float = LLM_DEADLINE_SECONDS,
+        use_fake: bool = USE_FAKE_LLM,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.limiter = TokenBucket(requests_per_minute / 60, burst, clock=clock)
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_reset_seconds, clock=clock)
+        self._clock = clock
+        self.deadline_seconds = deadline_seconds
+        self.use_fake = use_fake
+        self._clients = None
+        self._lock = threading.Lock()
+
+    def _bedrock_clients(self):
+        """(bedrock-runtime, bedrock) clients sharing one botocore configuration, created once."""
+        if self._clients is None:
+            with self._lock:
+                if self._clients is None:
+                    import boto3
+                    from botocore.config import Config
+
+                    config = Config(
+                        region_name=LLM_REGION,
+                        max_pool_connections=LLM_POOL_SIZE,
+                        connect_timeout=LLM_CONNECT_TIMEOUT,
+                        read_timeout=LLM_READ_TIMEOUT,
+                        retries={"mode": "adaptive", "total_max_attempts": LLM_MAX_ATTEMPTS},
+                    )
+                    session = boto3.session.Session()
+                    self._clients = (
+                        session.client("bedrock-runtime", config=config),
+                        session.client("bedrock", config=config),
+                    )
+        return self._clients
+
+    def chat_model(self, graph: str, model_id: str, max_tokens: int, temperature: float = 0.7) -> "GatedChatModel":
+        """A chat model for one graph; its calls go through this gateway."""
+        if self.use_fake:
+            try:
+                from .fake_bedrock import FakeChatBedrock
+            except ImportError:
+                from fake_bedrock import FakeChatBedrock
+            return GatedChatModel(self, graph, FakeChatBedrock.from_env())
+
+        from langchain_aws import ChatBedrock
+
+        logger.info("Initializing ChatBedrock LLM", extra={"model": model_id, "graph": graph})
+        runtime_client, control_client = self._bedrock_clients()
+        try:
+            model = ChatBedrock(
+                model_id=model_id,
+                client=runtime_client,
+                bedrock_client=control_client,
+                region_name=LLM_REGION,
+                max_tokens=max_tokens,
+                model_kwargs={"temperature": temperature, "maxTokens": max_tokens},
+            )
+        except Exception:
+            logger.exception("Error initializing ChatBedrock")
+            raise
+        return GatedChatModel(self, graph, model)
+
+    def _admit(self, graph: str) -> float:
+        """Check the breaker and reserve a token; returns the seconds still to wait for it."""
+        try:
+            self.breaker.before_call()
+        except LLMUnavailableError:
+            telemetry.LLM_REJECTED.labels(graph, "circuit_open").inc()
+            raise
+        try:
+            return self.limiter.reserve(max_wait=self.deadline_seconds)
+        except LLMDeadlineExceeded:
+            self.breaker.release()
+            telemetry.LLM_REJECTED.labels(graph, "deadline").inc()
+            raise
+
+    def call(self, graph: str, func, *args: Any, **kwargs: Any) -> Any:
+        """Run a blocking model call under the limiter and breaker. The call itself is bounded by the botocore timeouts."""
+        wait = self._admit(graph)
+        try:
+            if wait:
+                with _queued(graph):
+                    time.sleep(wait)
+            result = func(*args, **kwargs)
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            self.breaker.release()
+            raise
+        self.breaker.record_success()
+        return result
+
+    async def acall(self, graph: str, func, *args: Any, **kwargs: Any) -> Any:
+        """Async variant of call; the whole call (token wait included) is cancelled at the deadline."""
+        started = self._clock()
+        wait = self._admit(graph)
+        try:
+            if wait:
+                with _queued(graph):
+                    await asyncio.sleep(wait)
+            remaining = self.deadline_seconds - (self._clock() - started)
+            result = await asyncio.wait_for(func(*args, **kwargs), timeout=remaining)
+        except asyncio.TimeoutError:
+            self.breaker.record_failure()
+            telemetry.LLM_REJECTED.labels(graph, "deadline").inc()
+            raise LLMDeadlineExceeded(f"LLM call exceeded its {self.deadline_seconds:g}s deadline") from None
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            self.breaker.release()
+            raise
+        self.breaker.record_success()
+        return result
+
+    def stream(self, graph: str, func, *args: Any, **kwargs: Any) -> Iterator[Any]:
+        """Like call, for a streaming model call: yields its chunks; the outcome is recorded when it ends."""
+        wait = self._admit(graph)
+        try:
+            if wait:
+                with _queued(graph):
+                    time.sleep(wait)
+            yield from func(*args, **kwargs)
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        except BaseException:  # includes the consumer closing the stream early
+            self.breaker.release()
+            raise
+        self.breaker.record_success()
+
+    async def astream(self, graph: str, func, *args: Any, **kwargs: Any) -> AsyncIterator[Any]:
+        """Async variant of stream; the deadline applies to the whole stream."""
+        started = self._clock()
+        wait = self._admit(graph)
+        try:
+            if wait:
+                with _queued(graph):
+                    await asyncio.sleep(wait)
+            chunks = func(*args, **kwargs).__aiter__()
+            while True:
+                remaining = self.deadline_seconds - (self._clock() - started)
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), timeout=remaining)
+                except StopAsyncIteration:
+                    break
+                yield chunk
+        except asyncio.TimeoutError:
+            self.breaker.record_failure()
+            telemetry.LLM_REJECTED.labels(graph, "deadline").inc()
+            raise LLMDeadlineExceeded(f"LLM stream exceeded its {self.deadline_seconds:g}s deadline") from None
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            self.breaker.release()
+            raise
+        self.breaker.record_success()
+
+
+class GatedChatModel(Runnable):
+    """
+    Runnable wrapper that sends a chat model's calls through an LLMGateway.
+
+    Being a Runnable, it keeps batch_as_completed/abatch_as_completed (each item
+    goes through invoke/ainvoke, so every request is limited individually);
+    stream/astream take one token per streamed completion.
+    """
+
+    def __init__(self, gateway: LLMGateway, graph: str, model: Any):
+        self.gateway = gateway
+        self.graph = graph
+        self.model = model
+
+    @property
+    def model_id(self) -> str:
+        return getattr(self.model, "model_id", "")
+
+    def invoke(self, input: Any, config: Optional[dict] = None, **kwargs: Any) -> Any:
+        return self.gateway.call(self.graph, self.model.invoke, input, config, **kwargs)
+
+    async def ainvoke(self, input: Any, config: Optional[dict] = None, **kwargs: Any) -> Any:
+        return await self.gateway.acall(self.graph, self.model.ainvoke, input, config, **kwargs)
+
+    def stream(self, input: Any, config: Optional[dict] = None, **kwargs: Any) -> Iterator[Any]:
+        return self.gateway.stream(self.graph, self.model.stream, input, config, **kwargs)
+
+    def astream(self, input: Any, config: Optional[dict] = None, **kwargs: Any) -> AsyncIterator[Any]:
+        return self.gateway.astream(self.graph, self.model.astream, input, config, **kwargs)
+
+
+_gateway: Optional[LLMGateway] = None
+_gateway_lock = threading.Lock()
+
+
+def get_llm_gateway() -> LLMGateway:
+    """Return the process-wide gateway shared by both graphs."""
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                _gateway = LLMGateway()
+    return _gateway
+
+
+def set_llm_gateway(gateway: Optional[LLMGateway]) -> None:
+    global _gateway
+    with _gateway_lock:
+        _gateway = gateway
@@ -0,0 +1,192 @@
+import json
+import math
+import re
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+try:
+    import orjson
+
+    _json_loads = orjson.loads
+    _JSON_ERRORS = (orjson.JSONDecodeError, ValueError)
+except ImportError:  # optional speed-up
+    _json_loads = json.loads
+    _JSON_ERRORS = (ValueError,)
+
+# Characters that change the scanner state outside strings, and inside them
+_STRUCTURE = re.compile(r'[{}"]')
+_STRING_END = re.compile(r'["\\]')
+# A complete object with no nested objects (strings may contain braces and escaped quotes)
+_LEAF_OBJECT = re.compile(r'\{[^{}"]*(?:"(?:[^"\\]|\\.)*"[^{}"]*)*\}', re.DOTALL)
+_CODE_FENCE = re.compile(r"```(?:json)?\s*(.*?)\s*```", re.DOTALL)
+
+
+# Step 1. Tolerant, incremental extraction of JSON objects from model text
+class JSONObjectExtractor:
+    """
+    Pull complete JSON objects out of free-form model text, fed in any number of pieces.
+
+    Only innermost objects (no nested objects) are returned: for
+    {"output": [{"Id": ...}, ...]} that is each row, which is what survives when
+    the model adds prose, wraps the JSON in code fences, or is cut off at the
+    token limit. Text is scanned once; only the unfinished tail is buffered.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._scan = 0  # next buffer offset to scan
+        self._open: List[List[Any]] = []  # [start offset, has nested object] per open brace
+        self._in_string = False
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        """Add text and return the objects it completed, in order."""
+        buffer = self._buffer + text
+        position = self._scan
+        found: List[Dict[str, Any]] = []
+
+        while True:
+            if self._in_string:
+                match = _STRING_END.search(buffer, position)
+                if match is None:
+                    position = len(buffer)
+                    break
+                if match.group() == "\\":
+                    if match.end() >= len(buffer):
+                        position = match.start()  # escape split across pieces; rescan it next time
+                        break
+                    position = match.end() + 1
+                    continue
+                self._in_string = False
+                position = match.end()
+                continue
+
+            match = _STRUCTURE.search(buffer, position)
+            if match is None:
+                position = len(buffer)
+                break
+            char, position = match.group(), match.end()
+            if char == "{":
+                if self._open:
+                    self._open[-1][1] = True
+                leaf = _LEAF_OBJECT.match(buffer, match.start())
+                if leaf is not None:
+                    # Fast path: a whole row in one regex match instead of brace-by-brace scanning
+                    obj = _loads_object(leaf.group())
+                    if obj is not None:
+                        found.append(obj)
+                    position = leaf.end()
+                    continue
+                self._open.append([match.start(), False])
+            elif char == "}":
+                if self._open:
+                    start, has_nested = self._open.pop()
+                    if not has_nested:
+                        obj = _loads_object(buffer[start:position])
+                        if obj is not None:
+                            found.append(obj)
+            elif self._open:
+                # Quotes only matter inside an object; prose outside may have unbalanced ones
+                self._in_string = True
+
+        # Keep only what an unfinished object still needs
+        keep = self._open[0][0] if self._open else position
+        for entry in self._open:
+            entry[0] -= keep
+        self._buffer = buffer[keep:]
+        self._scan = position - keep
+        return found
+
+
+def _loads_object(text: str) -> Optional[Dict[str, Any]]:
+    try:
+        value = _json_loads(text)
+    except _JSON_ERRORS:
+        return None
+    return value if isinstance(value, dict) else None
+
+
+def extract_objects(text: str) -> List[Dict[str, Any]]:
+    """All innermost JSON objects in a complete response."""
+    return JSONObjectExtractor().feed(text)
+
+
+def extract_rows(text: str, key: str = "output") -> List[Dict[str, Any]]:
+    """
+    Rows of {key: [...]} from a complete response. Well-formed JSON (optionally in
+    a code fence) is decoded in one call; anything else falls back to salvaging
+    the individual row objects.
+    """
+    text = text.strip()
+    fenced = _CODE_FENCE.search(text)
+    candidate = fenced.group(1) if fenced else text
+    document = _loads_object(candidate) if candidate.startswith("{") else None
+    if document is not None and isinstance(document.get(key), list):
+        return [row for row in document[key] if isinstance(row, dict)]
+    return extract_objects(text)
+
+
+# Step 2. Schema validation
+def _number(value: Any) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
+
+
+class FactorRowCollector:
+    """
+    Validates {"Id", "rt", "factor"} rows against the sellers that were asked for,
+    as they arrive: the Id must be one of the requested sellers and the factor a
+    number within [min_factor, max_factor]. Accepted rows carry the requested rt.
+    Whatever is still missing afterwards is exactly what needs re-requesting.
+    """
+
+    def __init__(self, sellers: Sequence[Dict[str, Any]], min_factor: float, max_factor: float):
+        self._sellers = list(sellers)
+        self._rates = {str(seller["Id"]): seller["rt"] for seller in self._sellers}
+        self.min_factor = min_factor
+        self.max_factor = max_factor
+        self.rows: Dict[str, Dict[str, Any]] = {}
+        self.rejected = 0
+
+    def add(self, rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Validate rows; returns the newly accepted ones."""
+        accepted = []
+        for row in rows:
+            seller_id = str(row.get("Id"))
+            factor = _number(row.get("factor"))
+            if (
+                seller_id not in self._rates
+                or factor is None
+                or not self.min_factor <= factor <= self.max_factor
+            ):
+                self.rejected += 1
+                continue
+            if seller_id in self.rows:
+                continue
+            record = {"Id": seller_id, "rt": self._rates[seller_id], "factor": factor}
+            self.rows[seller_id] = record
+            accepted.append(record)
+        return accepted
+
+    def add_text(self, text: str) -> List[Dict[str, Any]]:
+        return self.add(extract_rows(text))
+
+    @property
+    def missing(self) -> List[Dict[str, Any]]:
+        """Requested sellers without an accepted row, in input order."""
+        return [seller for seller in self._sellers if str(seller["Id"]) not in self.rows]
+
+    @property
+    def complete(self) -> bool:
+        return len(self.rows) == len(self._rates)
+
+
+def find_object(text: str, required: Sequence[str]) -> Optional[Dict[str, Any]]:
+    """First JSON object in the text that has all the required keys."""
+    for obj in extract_objects(text):
+        if all(key in obj for key in required):
+            return obj
+    return None
@@ -0,0 +1,189 @@
+"""
+HTTP load scenario for the API.
+
+Drives /api/chat, /api/update-hedge-factor and /api/generate-hedge-factor-report
+from concurrent asyncio workers for a fixed duration, then reports per-endpoint
+throughput, errors and p50/p99 latency. With --spawn it starts its own uvicorn
+server with the Bedrock stand-in (HEDGE_FACTOR_FAKE_LLM=true) and throwaway
+databases, so no AWS access is needed. Exits non-zero if any endpoint's p99 is
+over --max-p99-ms or its error rate is over --max-error-rate.
+
+Usage: python load_test.py [--url http://localhost:8000 | --spawn]
+                           [--concurrency 16] [--duration 10]
+                           [--mix chat=2,update=6,report=2] [--report-format data]
+                           [--max-p99-ms 2000] [--max-error-rate 0.01] [--save load.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+DEFAULT_URL = os.getenv("LOAD_TEST_URL", "http://localhost:8000")
+DEFAULT_MIX = "chat=2,update=6,report=2"
+SPAWN_PORT = int(os.getenv("LOAD_TEST_PORT", "8765"))
+
+# Chat inputs: the first three parse locally; the last two name the seller without the word
+# "seller", which the local parser scores below HEDGE_FACTOR_LOCAL_PARSE_CONFIDENCE, so they go
+# to the LLM (or the intent cache, for a repeated seller and amount)
+CHAT_INPUTS = (
+    "set seller {seller} to {bps}bps",
+    "update hedge factor for seller {seller} to {bps} bps",
+    "seller {seller} hedge factor {bps}bps",
+    "hmm, could {seller} get something like {bps} bps please",
+    "I think {seller} deserves about {bps} basis points now",
+)
+
+
+def _request(kind: str, rng: random.Random, report_format: str) -> Tuple[str, str, Optional[dict], Optional[dict]]:
+    """(method, path, json body, query params) for one request of the given kind."""
+    seller = str(123450000 + rng.randrange(1000))
+    bps = rng.choice((10, 25, 40, 55, 75))
+    if kind == "chat":
+        text = rng.choice(CHAT_INPUTS).format(seller=seller, bps=bps)
+        return "POST", "/api/chat", {"input": text}, None
+    if kind == "update":
+        return "POST", "/api/update-hedge-factor", {"sellerNumber": seller, "hedgeFactor": bps / 10000}, None
+    return "GET", "/api/generate-hedge-factor-report", None, {"format": report_format, "dpi": 100}
+
+
+def _percentile(samples: List[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def _worker(client, kinds, weights, deadline, rng, report_format, latencies, errors):
+    while time.perf_counter() < deadline:
+        kind = rng.choices(kinds, weights)[0]
+        method, path, body, params = _request(kind, rng, report_format)
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, path, json=body, params=params)
+            failed = response.status_code >= 400 or (kind == "chat" and "error" in response.json())
+        except (httpx.HTTPError, ValueError):
+            failed = True
+        latencies[kind].append(time.perf_counter() - started)
+        if failed:
+            errors[kind] += 1
+
+
+async def run_load(url: str, concurrency: int, duration: float, mix: Dict[str, float], report_format: str, seed: int):
+    kinds, weights = list(mix), list(mix.values())
+    latencies: Dict[str, List[float]] = {kind: [] for kind in kinds}
+    errors: Dict[str, int] = {kind: 0 for kind in kinds}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=120) as client:
+        started = time.perf_counter()
+        deadline = started + duration
+        await asyncio.gather(*(
+            _worker(client, kinds, weights, deadline, random.Random(seed + index), report_format, latencies, errors)
+            for index in range(concurrency)
+        ))
+        elapsed = time.perf_counter() - started
+
+    results = {}
+    for kind in kinds:
+        samples = latencies[kind]
+        if not samples:
+            continue
+        results[kind] = {
+            "requests": len(samples),
+            "errors": errors[kind],
+            "error_rate": errors[kind] / len(samples),
+            "throughput_rps": len(samples) / elapsed,
+            "p50_ms": _percentile(samples, 0.50) * 1000,
+            "p99_ms": _percentile(samples, 0.99) * 1000,
+        }
+    return results
+
+
+def spawn_server(port: int) -> subprocess.Popen:
+    """Start uvicorn with the Bedrock stand-in and temporary databases; wait until /health answers."""
+    workdir = tempfile.mkdtemp(prefix="hedge-load-")
+    env = {
+        **os.environ,
+        "HEDGE_FACTOR_FAKE_LLM": "true",
+        "HEDGE_FACTOR_DB_PATH": os.path.join(workdir, "hedge_factors.sqlite3"),
+        "HEDGE_FACTOR_STORE_PATH": os.path.join(workdir, "factor_store.sqlite3"),
+        "HEDGE_FACTOR_CACHE_PATH": os.path.join(workdir, "report_cache.sqlite3"),
+        "HEDGE_FACTOR_LOG_LEVEL": os.getenv("HEDGE_FACTOR_LOG_LEVEL", "WARNING"),
+        # The stand-in has no Bedrock quota; set HEDGE_FACTOR_LLM_RPM to load-test the gateway's limiter
+        "HEDGE_FACTOR_LLM_RPM": os.getenv("HEDGE_FACTOR_LLM_RPM", "0"),
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env,
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1).status_code == 200:
+                return server
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("Spawned server did not become healthy within 60s")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=DEFAULT_URL)
+    parser.add_argument("--spawn", action="store_true", help="start a local server with the Bedrock stand-in")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="relative weights per endpoint")
+    parser.add_argument("--report-format", default="data", help="report chart format (data, png, webp, svg)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--max-p99-ms", type=float)
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--save", help="write results as JSON")
+    args = parser.parse_args()
+
+    mix = {kind: float(weight) for kind, weight in (part.split("=") for part in args.mix.split(","))}
+    unknown = set(mix) - {"chat", "update", "report"}
+    if unknown:
+        parser.error(f"unknown endpoints in --mix: {', '.join(sorted(unknown))}")
+
+    server = spawn_server(SPAWN_PORT) if args.spawn else None
+    url = f"http://127.0.0.1:{SPAWN_PORT}" if server else args.url
+    try:
+        results = asyncio.run(run_load(url, args.concurrency, args.duration, mix, args.report_format, args.seed))
+    finally:
+        if server:
+            server.terminate()
+            server.wait(timeout=30)
+
+    print(f"{'endpoint':<10}{'requests':>10}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    failures = []
+    for kind, stats in results.items():
+        print(f"{kind:<10}{stats['requests']:>10}{stats['errors']:>8}{stats['throughput_rps']:>10.1f}"
+              f"{stats['p50_ms']:>10.1f}{stats['p99_ms']:>10.1f}")
+        if args.max_p99_ms is not None and stats["p99_ms"] > args.max_p99_ms:
+            failures.append(f"{kind}: p99 {stats['p99_ms']:.1f} ms over {args.max_p99_ms:.0f} ms")
+        if stats["error_rate"] > args.max_error_rate:
+            failures.append(f"{kind}: error rate {stats['error_rate']:.1%} over {args.max_error_rate:.1%}")
+
+    if args.save:
+        with open(args.save, "w") as handle:
+            json.dump(results, handle, indent=2)
+
+    if failures:
+        print("FAIL")
+        for line in failures:
+            print(f"  {line}")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,68 +1,66 @@
 # main.py
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request as StarletteRequest
-import sys
+import asyncio
+import os
 import time
 
-print("Starting main.py import...")
-
-# Add request logging middleware
-class LoggingMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: StarletteRequest, call_next):
-        start_time = time.time()
-        print(f"→ Incoming request: {request.method} {request.url.path}")
-        try:
-            response = await call_next(request)
-            process_time = time.time() - start_time
-            print(f"← Response sent: {response.status_code} (took {process_time:.3f}s)")
-            return response
-        except Exception as e:
-            process_time = time.time() - start_time
-            print(f"✗ Request failed after {process_time:.3f}s: {e}")
-            raise
-
-# Lazy import to avoid blocking on startup
 try:
-    print("Importing add_hedge_factor...")
-    from .add_hedge_factor import agent
-    print("Successfully imported agent")
+    from . import telemetry
+except ImportError:
+    import telemetry
+
+telemetry.configure_logging()
+logger = telemetry.get_logger(__name__)
+
+# Lazy import to avoid blocking on startup: the LLM client and graph are built on first use
+try:
+    from . import add_hedge_factor as chat_agent
 except ImportError:
     try:
-        from add_hedge_factor import agent
-        print("Successfully imported agent (absolute)")
-    except Exception as e:
-        print(f"Error importing agent: {e}", file=sys.stderr)
-        agent = None
-except Exception as e:
-    print(f"Error importing agent: {e}", file=sys.stderr)
-    agent = None
+        import add_hedge_factor as chat_agent
+    except Exception:
+        logger.exception("Error importing agent")
+        chat_agent = None
+except Exception:
+    logger.exception("Error importing agent")
+    chat_agent = None
+
+# Set WARMUP_ON_STARTUP=true to build LLM clients, graphs and the plotting stack right after startup
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "false").lower() in ("1", "true", "yes")
 
 try:
-    print("Importing hedgeFactorController...")
     from .hedgeFactorController import router
-    print("Successfully imported router")
 except ImportError:
     try:
         from hedgeFactorController import router
-        print("Successfully imported router (absolute)")
-    except Exception as e:
-        print(f"Error importing router: {e}", file=sys.stderr)
+    except Exception:
+        logger.exception("Error importing router")
         router = None
-except Exception as e:
-    print(f"Error importing router: {e}", file=sys.stderr)
+except Exception:
+    logger.exception("Error importing router")
     router = None
 
-app = FastAPI(title="Hedge Factor API", version="1.0")
+try:
+    from .report_jobs import report_jobs
+    from .report_runner import shutdown_report_pool
+    from .hedge_factor_service import aclose_clients
+except ImportError:
+    try:
+        from report_jobs import report_jobs
+        from report_runner import shutdown_report_pool
+        from hedge_factor_service import aclose_clients
+    except Exception:
+        logger.exception("Error importing report runner")
+        report_jobs = None
+        shutdown_report_pool = None
+        aclose_clients = None
 
-# Add logging middleware FIRST (before CORS)
-app.add_middleware(LoggingMiddleware)
+app = FastAPI(title="Hedge Factor API", version="1.0")
 
 # Include the hedge factor router
 if router:
     app.include_router(router)
-    print("Router included successfully")
 
 # Allow your frontend to call the API
 app.add_middleware(
@@ -73,10 +71,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Added last so it wraps CORS too: request metrics and one structured log line per request
+app.add_middleware(telemetry.MetricsMiddleware)
+
 @app.post("/api/chat")
 async def chat(request: Request):
-    print("Chat request received")
-    if agent is None:
+    if chat_agent is None:
         return {"error": "Agent not initialized. Check server logs."}
     
     body = await request.json()
@@ -85,7 +85,14 @@ async def chat(request: Request):
         return {"error": "Missing 'input' field"}
 
     try:
-        result = agent.invoke({"input": user_input})
+        agent = chat_agent.get_agent()
+    except Exception:
+        logger.exception("Error initializing agent")
+        return {"error": "Agent not initialized. Check server logs."}
+
+    try:
+        # Async graph nodes: the hedge factor update runs in-process without blocking the event loop
+        result = await agent.ainvoke({"input": user_input})
         # The hedge factor agent returns api_response instead of output
         if "api_response" in result:
             return {"response": result["api_response"]}
@@ -94,41 +101,103 @@ async def chat(request: Request):
         else:
             return {"response": result}
     except Exception as e:
-        print(f"Error in chat endpoint: {e}", file=sys.stderr)
+        logger.exception("Error in chat endpoint")
+        return {"error": f"Agent execution failed: {str(e)}"}
+
+@app.post("/api/chat/batch")
+async def chat_batch(request: Request):
+    """
+    Parse and apply many hedge factor instructions in one call: {"inputs": [...]} or a
+    multi-line {"input": "..."}. Lines the local parser cannot resolve share one LLM
+    request, all updates are written in one bulk write, and each instruction gets a result.
+    """
+    if chat_agent is None:
+        return {"error": "Agent not initialized. Check server logs."}
+
+    body = await request.json()
+    inputs = body.get("inputs")
+    if inputs is None:
+        inputs = chat_agent.split_instructions(body.get("input", ""))
+    if not isinstance(inputs, list) or not all(isinstance(line, str) for line in inputs):
+        return {"error": "'inputs' must be a list of strings"}
+    inputs = [line.strip() for line in inputs if line.strip()]
+    if not inputs:
+        return {"error": "Missing 'inputs' or 'input' field"}
+    if len(inputs) > chat_agent.CHAT_BATCH_MAX_LINES:
+        return {"error": f"At most {chat_agent.CHAT_BATCH_MAX_LINES} instructions per batch"}
+
+    try:
+        agent = chat_agent.get_agent()
+    except Exception:
+        logger.exception("Error initializing agent")
+        return {"error": "Agent not initialized. Check server logs."}
+
+    try:
+        result = await agent.ainvoke({"input": "\n".join(inputs), "inputs": inputs})
+        return {"response": result["api_response"]}
+    except Exception as e:
+        logger.exception("Error in chat batch endpoint")
         return {"error": f"Agent execution failed: {str(e)}"}
 
 @app.get("/")
 async def root():
-    print("Root endpoint called!")
     try:
-        response = {
+        return {
             "message": "Hedge Factor API is running!",
             "status": "ok",
-            "agent_loaded": agent is not None
+            "agent_loaded": chat_agent is not None and chat_agent.agent_initialized()
         }
-        print(f"Returning response: {response}")
-        return response
     except Exception as e:
-        print(f"Error in root endpoint: {e}", file=sys.stderr)
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error in root endpoint")
         return {"error": str(e)}
 
 @app.get("/health")
 async def health():
     """Simple health check endpoint"""
-    print("Health endpoint called!")
     return {"status": "healthy", "message": "Server is running"}
 
 @app.get("/test")
 async def test():
     """Ultra simple test endpoint"""
-    print("Test endpoint called!")
     return {"test": "ok"}
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics (text exposition format)"""
+    return Response(telemetry.render_metrics(), media_type=telemetry.PROMETHEUS_CONTENT_TYPE)
+
+def warm_up():
+    """Initialize lazily created clients, graphs and the plotting stack ahead of the first request."""
+    started = time.time()
+    if chat_agent is not None:
+        chat_agent.warm_up()
+    try:
+        from .gen_hedge_factor_for_sellers import warm_up as warm_up_reports
+    except ImportError:
+        from gen_hedge_factor_for_sellers import warm_up as warm_up_reports
+    warm_up_reports()
+    logger.info("Warm-up finished", extra={"duration_s": round(time.time() - started, 3)})
+
+async def _warm_up_in_background():
+    try:
+        await asyncio.to_thread(warm_up)
+    except Exception:
+        logger.exception("Warm-up failed")
+
 @app.on_event("startup")
 async def startup_event():
-    print("FastAPI app started successfully!")
-    print(f"Agent loaded: {agent is not None}")
-    print(f"Router loaded: {router is not None}")
+    logger.info("FastAPI app started", extra={"agent_loaded": chat_agent is not None, "router_loaded": router is not None})
+    if WARMUP_ON_STARTUP:
+        # Runs off the event loop so the server accepts requests while warming up
+        asyncio.create_task(_warm_up_in_background())
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    if report_jobs:
+        await report_jobs.shutdown()
+    if shutdown_report_pool:
+        shutdown_report_pool(wait=True)
+    if aclose_clients:
+        await aclose_clients()
+    logger.info("FastAPI app shut down")
+    telemetry.shutdown_logging()
@@ -0,0 +1,265 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+try:
+    from .telemetry import CACHE_REQUESTS
+except ImportError:
+    from telemetry import CACHE_REQUESTS
+
+DEFAULT_CACHE_BACKEND = os.getenv("HEDGE_FACTOR_CACHE_BACKEND", "memory").lower()
+DEFAULT_CACHE_TTL_SECONDS = float(os.getenv("HEDGE_FACTOR_CACHE_TTL", "3600"))
+DEFAULT_CACHE_MAX_ENTRIES = int(os.getenv("HEDGE_FACTOR_CACHE_MAX_ENTRIES", "32"))
+DEFAULT_CACHE_PATH = os.getenv("HEDGE_FACTOR_CACHE_PATH", os.path.join("cache", "report_cache.sqlite3"))
+
+
+def make_cache_key(sellers: Any, **versions: Any) -> str:
+    """Content hash of the seller input plus everything that changes the output (versions, model id, options)."""
+    if hasattr(sellers, "fingerprint"):
+        sellers = sellers.fingerprint()  # columnar SellerBatch
+    digest = hashlib.sha256()
+    digest.update(json.dumps(sellers, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8"))
+    for name in sorted(versions):
+        digest.update(f"|{name}={versions[name]}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _encode_default(value: Any) -> Any:
+    # Columnar SellerBatch outputs are stored as column lists and restored with SellerBatch.coerce()
+    if hasattr(value, "to_columns"):
+        return value.to_columns()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+# Step 1. Backend interface
+class CacheBackend(ABC):
+    """
+    Stores report entries shaped like:
+    {"output": SellerBatch, "charts": {name: {"path": str, "data": bytes}}}
+    """
+
+    def __init__(self, ttl_seconds: float = DEFAULT_CACHE_TTL_SECONDS, max_entries: int = DEFAULT_CACHE_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        ...
+
+    @abstractmethod
+    def get_chart(self, key: str, name: str) -> Optional[bytes]:
+        """Chart bytes for one entry, without counting as a hit or refreshing LRU order."""
+        ...
+
+    @abstractmethod
+    def clear(self) -> None:
+        ...
+
+    def _record(self, value: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        CACHE_REQUESTS.labels("report", "miss" if value is None else "hit").inc()
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "backend": type(self).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total) if total else 0.0,
+        }
+
+
+# Step 2. In-process LRU backend
+class MemoryCacheBackend(CacheBackend):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry[0] > self.ttl_seconds:
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return self._record(entry[1] if entry else None)
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_chart(self, key: str, name: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None or time.time() - entry[0] > self.ttl_seconds:
+            return None
+        return entry[1].get("charts", {}).get(name, {}).get("data")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+# Step 3. On-disk SQLite backend (survives restarts, shareable between processes)
+class SQLiteCacheBackend(CacheBackend):
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5.0)
+        # WAL: server worker processes sharing the file read while another one writes
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS report_entries (
+                key TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS report_charts (
+                key TEXT NOT NULL,
+                name TEXT NOT NULL,
+                path TEXT,
+                data BLOB,
+                PRIMARY KEY (key, name)
+            );
+            CREATE INDEX IF NOT EXISTS idx_report_entries_accessed ON report_entries (accessed_at);
+            """
+        )
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, created_at FROM report_entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return self._record(None)
+            if now - row[1] > self.ttl_seconds:
+                self._delete(key)
+                self._conn.commit()
+                return self._record(None)
+
+            self._conn.execute("UPDATE report_entries SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            charts = {
+                name: {"path": path, "data": data}
+                for name, path, data in self._conn.execute(
+                    "SELECT name, path, data FROM report_charts WHERE key = ?", (key,)
+                )
+            }
+
+        value = json.loads(row[0])
+        value["charts"] = charts
+        return self._record(value)
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        now = time.time()
+        payload = json.dumps({k: v for k, v in value.items() if k != "charts"}, default=_encode_default)
+        charts = value.get("charts", {})
+        with self._lock, self._conn:
+            self._delete(key)
+            self._conn.execute(
+                "INSERT INTO report_entries (key, payload, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, payload, now, now),
+            )
+            self._conn.executemany(
+                "INSERT INTO report_charts (key, name, path, data) VALUES (?, ?, ?, ?)",
+                [(key, name, chart.get("path"), chart.get("data")) for name, chart in charts.items()],
+            )
+            # Evict expired entries, then least recently used beyond max_entries
+            stale = [
+                stale_key
+                for (stale_key,) in self._conn.execute(
+                    """
+                    SELECT key FROM report_entries WHERE created_at < ?
+                    UNION
+                    SELECT key FROM (
+                        SELECT key FROM report_entries ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                    )
+                    """,
+                    (now - self.ttl_seconds, self.max_entries),
+                )
+            ]
+            for stale_key in stale:
+                self._delete(stale_key)
+
+    def get_chart(self, key: str, name: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._conn.execute(
+                """
+                SELECT c.data FROM report_charts c
+                JOIN report_entries e ON e.key = c.key
+                WHERE c.key = ? AND c.name = ? AND e.created_at >= ?
+                """,
+                (key, name, time.time() - self.ttl_seconds),
+            ).fetchone()
+        return row[0] if row else None
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM report_entries")
+            self._conn.execute("DELETE FROM report_charts")
+
+    def _delete(self, key: str) -> None:
+        self._conn.execute("DELETE FROM report_entries WHERE key = ?", (key,))
+        self._conn.execute("DELETE FROM report_charts WHERE key = ?", (key,))
+
+
+# Step 4. Backend selection
+_report_cache: Optional[CacheBackend] = None
+_report_cache_lock = threading.Lock()
+
+
+def create_cache_backend(backend: str = DEFAULT_CACHE_BACKEND) -> Optional[CacheBackend]:
+    """Build a cache backend by name: "memory", "sqlite" or "none"."""
+    if backend == "memory":
+        return MemoryCacheBackend()
+    if backend == "sqlite":
+        return SQLiteCacheBackend()
+    if backend in ("none", "off", ""):
+        return None
+    raise ValueError(f"Unknown cache backend '{backend}', expected memory, sqlite or none")
+
+
+def get_report_cache() -> Optional[CacheBackend]:
+    """Return the process-wide report cache (None when caching is disabled)."""
+    global _report_cache
+    if _report_cache is None:
+        with _report_cache_lock:
+            if _report_cache is None:
+                _report_cache = create_cache_backend()
+    return _report_cache
+
+
+def set_report_cache(cache: Optional[CacheBackend]) -> None:
+    """Swap the process-wide cache backend (e.g. to plug in a custom implementation)."""
+    global _report_cache
+    with _report_cache_lock:
+        _report_cache = cache
@@ -0,0 +1,451 @@
+import asyncio
+import json
+import os
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+try:
+    from .report_runner import run_report_in_pool
+    from .sqlite_pool import SQLiteConnectionPool
+    from .telemetry import get_logger
+except ImportError:
+    from report_runner import run_report_in_pool
+    from sqlite_pool import SQLiteConnectionPool
+    from telemetry import get_logger
+
+logger = get_logger(__name__)
+
+JOB_CONCURRENCY = int(os.getenv("HEDGE_FACTOR_JOB_CONCURRENCY", "2"))
+JOB_RETENTION_SECONDS = float(os.getenv("HEDGE_FACTOR_JOB_RETENTION", "3600"))
+# "memory" keeps jobs in this process; "sqlite" shares them with the other server workers
+JOB_STORE_BACKEND = os.getenv("HEDGE_FACTOR_JOB_STORE", "memory").lower()
+JOB_STORE_PATH = os.getenv("HEDGE_FACTOR_JOB_STORE_PATH", os.path.join("cache", "report_jobs.sqlite3"))
+# How often a worker streaming another worker's job checks the store for new events
+JOB_POLL_SECONDS = float(os.getenv("HEDGE_FACTOR_JOB_POLL", "0.25"))
+# On shutdown, running jobs get this long to finish before they are marked failed
+JOB_SHUTDOWN_GRACE_SECONDS = float(os.getenv("HEDGE_FACTOR_JOB_SHUTDOWN_GRACE", "30"))
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+FINISHED_STATUSES = (JOB_SUCCEEDED, JOB_FAILED)
+# Streamed (never stored) for a job that does not exist or was pruned
+JOB_NOT_FOUND = "not_found"
+
+
+@dataclass
+class ReportJob:
+    """One report generation request and everything produced for it so far."""
+
+    job_id: str
+    params: Dict[str, Any]
+    status: str = JOB_QUEUED
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    rows: List[Dict[str, Any]] = field(default_factory=list)
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    # (event name, payload) pairs replayed to every streaming client
+    events: List[Tuple[str, Any]] = field(default_factory=list)
+    _changed: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+    # Called with (job, event name, payload) after each event, e.g. to persist it
+    _on_event: Optional[Callable[["ReportJob", str, Any], None]] = field(default=None, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    def add_event(self, name: str, payload: Any) -> None:
+        self.events.append((name, payload))
+        # Wake current waiters, then arm a fresh event for the next change
+        self._changed.set()
+        self._changed = asyncio.Event()
+        if self._on_event is not None:
+            self._on_event(self, name, payload)
+
+    def add_rows(self, rows: List[Dict[str, Any]]) -> None:
+        self.rows.extend(rows)
+        self.add_event("rows", rows)
+
+    def set_status(self, status: str, **payload: Any) -> None:
+        self.status = status
+        self.add_event("status", {"status": status, **payload})
+
+    async def wait_for_change(self, timeout: Optional[float] = None) -> None:
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+_JOB_SCHEMA = """
+CREATE TABLE IF NOT EXISTS report_jobs (
+    job_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    params TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    error TEXT,
+    result TEXT,
+    owner_pid INTEGER
+);
+CREATE TABLE IF NOT EXISTS report_job_events (
+    job_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (job_id, seq)
+);
+CREATE INDEX IF NOT EXISTS idx_report_jobs_finished ON report_jobs (finished_at);
+"""
+
+
+def _not_found(job_id: str) -> Tuple[str, Any]:
+    return ("status", {"status": JOB_NOT_FOUND, "error": f"Report job {job_id} not found"})
+
+
+def _json_default(value: Any) -> Any:
+    # Report outputs are SellerBatch objects; stored as columns and restored with SellerBatch.coerce()
+    if hasattr(value, "to_columns"):
+        return value.to_columns()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _log_write_error(future: Future) -> None:
+    if not future.cancelled() and future.exception() is not None:
+        logger.error("Report job store write failed", exc_info=future.exception())
+
+
+class SQLiteJobStore:
+    """
+    Job records and their event logs in one SQLite file (WAL), so any server
+    worker can report on, or stream, a job that another worker is running. The
+    owning worker writes; everyone else only reads.
+    """
+
+    def __init__(self, path: str = JOB_STORE_PATH):
+        self._pool = SQLiteConnectionPool(path, schema=_JOB_SCHEMA)
+
+    @staticmethod
+    def snapshot(job: ReportJob) -> Tuple[Any, ...]:
+        """
+        The job row as of now. Cheap (values are referenced, not serialized), so it
+        can be taken on the event loop and written later from another thread.
+        """
+        params = {key: value for key, value in job.params.items() if key != "sellers"}  # inputs can be large
+        return (job.job_id, job.status, params, job.created_at, job.started_at,
+                job.finished_at, job.error, job.result, os.getpid())
+
+    def save(self, snapshot: Tuple[Any, ...], event: Optional[Tuple[int, str, Any]] = None) -> None:
+        """Write a job row from snapshot(), plus its newest (seq, name, payload) event, in one transaction."""
+        job_id, status, params, created_at, started_at, finished_at, error, result, owner_pid = snapshot
+        result = json.dumps(result, default=_json_default) if result is not None else None
+        with self._pool.write() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO report_jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, status, json.dumps(params), created_at, started_at, finished_at, error, result, owner_pid),
+            )
+            if event is not None:
+                self._insert_event(conn, job_id, event)
+
+    def append(self, job_id: str, event: Tuple[int, str, Any]) -> None:
+        with self._pool.write() as conn:
+            self._insert_event(conn, job_id, event)
+
+    @staticmethod
+    def _insert_event(conn, job_id: str, event: Tuple[int, str, Any]) -> None:
+        seq, name, payload = event
+        conn.execute(
+            "INSERT OR REPLACE INTO report_job_events VALUES (?, ?, ?, ?)",
+            (job_id, seq, name, json.dumps(payload, default=_json_default)),
+        )
+
+    def status(self, job_id: str) -> Optional[str]:
+        row = self._pool.read().execute("SELECT status FROM report_jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return row["status"] if row else None
+
+    def poll(self, job_id: str, start: int = 0) -> Tuple[Optional[str], List[Tuple[str, Any]]]:
+        """Status, then the events from position start; a finished status means its final event is included."""
+        return self.status(job_id), self.events(job_id, start)
+
+    def events(self, job_id: str, start: int = 0) -> List[Tuple[str, Any]]:
+        """Events from position start onwards, in order."""
+        rows = self._pool.read().execute(
+            "SELECT name, payload FROM report_job_events WHERE job_id = ? AND seq >= ? ORDER BY seq",
+            (job_id, start),
+        )
+        return [(row["name"], json.loads(row["payload"])) for row in rows]
+
+    def load(self, job_id: str) -> Optional[ReportJob]:
+        """A read-only snapshot of a job, as last written by its owner."""
+        row = self._pool.read().execute("SELECT * FROM report_jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        result = json.loads(row["result"]) if row["result"] else None
+        if result is not None:
+            try:
+                from .seller_batch import SellerBatch
+            except ImportError:
+                from seller_batch import SellerBatch
+            result["output"] = SellerBatch.coerce(result.get("output") or [])
+        job = ReportJob(
+            job_id=row["job_id"],
+            params=json.loads(row["params"]),
+            status=row["status"],
+            created_at=row["created_at"],
+            started_at=row["started_at"],
+            finished_at=row["finished_at"],
+            result=result,
+            error=row["error"],
+        )
+        job.events = self.events(job_id)
+        job.rows = [record for name, payload in job.events if name == "rows" for record in payload]
+        return job
+
+    def close(self) -> None:
+        self._pool.close()
+
+    def prune(self, cutoff: float) -> None:
+        """Drop jobs that finished before cutoff."""
+        with self._pool.write() as conn:
+            conn.execute(
+                "DELETE FROM report_job_events WHERE job_id IN "
+                "(SELECT job_id FROM report_jobs WHERE finished_at IS NOT NULL AND finished_at < ?)",
+                (cutoff,),
+            )
+            conn.execute("DELETE FROM report_jobs WHERE finished_at IS NOT NULL AND finished_at < ?", (cutoff,))
+
+
+def create_job_store(backend: str = JOB_STORE_BACKEND) -> Optional[SQLiteJobStore]:
+    """Build a job store by name: "memory" (no store, jobs stay in the process) or "sqlite"."""
+    if backend == "sqlite":
+        return SQLiteJobStore()
+    if backend == "memory":
+        return None
+    raise ValueError(f"Unknown job store '{backend}', expected memory or sqlite")
+
+
+class ReportJobQueue:
+    """
+    Local job queue with a fixed number of async workers feeding the report pool.
+
+    Jobs run in the worker that accepted them. With a shared store, their state
+    and events are also written there, so the other workers can serve status
+    requests and event streams for them. Store writes go through one writer
+    thread (in event order) and reads through asyncio.to_thread, so waiting on
+    another worker's write lock never blocks the event loop.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = JOB_CONCURRENCY,
+        retention_seconds: float = JOB_RETENTION_SECONDS,
+        store_backend: str = JOB_STORE_BACKEND,
+    ):
+        self.concurrency = concurrency
+        self.retention_seconds = retention_seconds
+        self.store_backend = store_backend
+        self._store: Optional[SQLiteJobStore] = None
+        self._writer: Optional[ThreadPoolExecutor] = None
+        self._jobs: Dict[str, ReportJob] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+
+    @property
+    def store(self) -> Optional[SQLiteJobStore]:
+        """The shared store, opened on first use (in the server worker, never before a fork)."""
+        if self._store is None and self.store_backend != "memory":
+            self._store = create_job_store(self.store_backend)
+        return self._store
+
+    def _write(self, method: Callable[..., None], *args: Any) -> Future:
+        """Queue a store write on the writer thread; writes run one at a time, in order."""
+        if self._writer is None:
+            self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="hedge-report-job-store")
+        future = self._writer.submit(method, *args)
+        future.add_done_callback(_log_write_error)
+        return future
+
+    def _persist(self, job: ReportJob, name: str, payload: Any) -> None:
+        event = (len(job.events) - 1, name, payload)
+        if name == "rows":
+            self._write(self.store.append, job.job_id, event)
+        else:
+            self._write(self.store.save, self.store.snapshot(job), event)
+
+    def _ensure_started(self) -> None:
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            self._workers = [
+                asyncio.create_task(self._worker(), name=f"hedge-report-job-{i}") for i in range(self.concurrency)
+            ]
+
+    def _enqueue(self, params: Dict[str, Any]) -> Tuple[ReportJob, Optional[Future]]:
+        self._ensure_started()
+        self._prune()
+        job = ReportJob(job_id=uuid.uuid4().hex, params=params)
+        saved = None
+        if self.store is not None:
+            saved = self._write(self.store.save, self.store.snapshot(job))
+            job._on_event = self._persist
+        self._jobs[job.job_id] = job
+        self._queue.put_nowait(job)
+        return job, saved
+
+    def submit(self, **params: Any) -> ReportJob:
+        """Queue a report; params are passed through to run_hedge_factor_analysis."""
+        return self._enqueue(params)[0]
+
+    async def asubmit(self, **params: Any) -> ReportJob:
+        """submit(), returning once the job is in the shared store (so any worker can answer for it)."""
+        job, saved = self._enqueue(params)
+        if saved is not None:
+            await asyncio.wrap_future(saved)
+        return job
+
+    def get(self, job_id: str) -> Optional[ReportJob]:
+        """A job from this worker, or else (with a shared store) a snapshot of another worker's job."""
+        job = self._jobs.get(job_id)
+        if job is None and self.store is not None:
+            job = self.store.load(job_id)
+        return job
+
+    async def aget(self, job_id: str) -> Optional[ReportJob]:
+        job = self._jobs.get(job_id)
+        if job is None and self.store is not None:
+            job = await asyncio.to_thread(self.store.load, job_id)
+        return job
+
+    async def stream(self, job_id: str, heartbeat_seconds: float = 15.0) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Yield (event, payload) pairs for a job from the beginning until it finishes.
+        A job that is unknown (or pruned before the stream starts) gets one
+        terminal "not_found" status event.
+        """
+        job = self._jobs.get(job_id)
+        if job is None and self.store is not None:
+            async for event in self._stream_shared(job_id, heartbeat_seconds):
+                yield event
+            return
+        if job is None:
+            yield _not_found(job_id)
+            return
+
+        index = 0
+        while True:
+            while index < len(job.events):
+                yield job.events[index]
+                index += 1
+            if job.finished:
+                return
+            await job.wait_for_change(timeout=heartbeat_seconds)
+            if index == len(job.events) and not job.finished:
+                yield ("heartbeat", {"status": job.status})
+
+    async def _stream_shared(self, job_id: str, heartbeat_seconds: float) -> AsyncIterator[Tuple[str, Any]]:
+        """Events of a job another worker runs, polled from the shared store."""
+        index = 0
+        quiet_since = time.monotonic()
+        while True:
+            status, events = await asyncio.to_thread(self.store.poll, job_id, index)
+            if status is None:
+                yield _not_found(job_id)
+                return
+            for event in events:
+                yield event
+            index += len(events)
+            if status in FINISHED_STATUSES:
+                return
+            if events:
+                quiet_since = time.monotonic()
+            elif time.monotonic() - quiet_since >= heartbeat_seconds:
+                yield ("heartbeat", {"status": status})
+                quiet_since = time.monotonic()
+            await asyncio.sleep(JOB_POLL_SECONDS)
+
+    async def shutdown(self, grace_seconds: float = JOB_SHUTDOWN_GRACE_SECONDS) -> None:
+        """
+        Stop taking jobs: queued ones fail right away, running ones get grace_seconds
+        to finish, and any still running after that are marked failed, so nobody
+        polling them (here or from another worker) waits forever.
+        """
+        if self._queue is not None:
+            while not self._queue.empty():
+                self._fail(self._queue.get_nowait(), "Server shut down before the job started")
+                self._queue.task_done()
+
+        running = [job for job in self._jobs.values() if job.status == JOB_RUNNING]
+        deadline = time.monotonic() + grace_seconds
+        for job in running:
+            while not job.finished and time.monotonic() < deadline:
+                await job.wait_for_change(timeout=deadline - time.monotonic())
+
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+        for job in running:
+            if not job.finished:
+                self._fail(job, "Server shut down before the job finished")
+
+        # Let the final status writes reach the shared store before the process exits
+        if self._writer is not None:
+            await asyncio.to_thread(self._writer.shutdown, True)
+            self._writer = None
+
+    @staticmethod
+    def _fail(job: ReportJob, error: str) -> None:
+        job.error = error
+        job.finished_at = time.time()
+        job.set_status(JOB_FAILED, error=error)
+
+    async def _worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job, loop)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: ReportJob, loop: asyncio.AbstractEventLoop) -> None:
+        job.started_at = time.time()
+        job.set_status(JOB_RUNNING)
+
+        def on_rows(rows: List[Dict[str, Any]]) -> None:
+            # Called from the report pool thread; hand the rows back to the event loop
+            loop.call_soon_threadsafe(job.add_rows, list(rows))
+
+        try:
+            result = await run_report_in_pool(progress_callback=on_rows, **job.params)
+        except Exception as exc:
+            self._fail(job, str(exc))
+            return
+
+        # Let queued row callbacks land before the final status event
+        await asyncio.sleep(0)
+        job.result = result
+        job.finished_at = time.time()
+        charts = {name: {"path": chart.get("path")} for name, chart in result.get("charts", {}).items()}
+        job.set_status(JOB_SUCCEEDED, rows=len(result.get("output", [])), charts=charts)
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self.retention_seconds
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished and job.finished_at is not None and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+        if self.store is not None:
+            self._write(self.store.prune, cutoff)
+
+
+report_jobs = ReportJobQueue()
@@ -0,0 +1,76 @@
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+try:
+    from .report_cache import make_cache_key
+except ImportError:
+    from report_cache import make_cache_key
+
+REPORT_MAX_WORKERS = int(os.getenv("HEDGE_FACTOR_REPORT_WORKERS", "2"))
+
+# Bounded pool so report generation (LLM calls, matplotlib) never runs on the event loop.
+# Created on first use in the process that runs reports, so each server worker gets its own.
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_pid: Optional[int] = None
+_executor_lock = threading.Lock()
+
+
+def get_report_pool() -> ThreadPoolExecutor:
+    """This process's report pool (a fresh one after a fork; pools do not survive fork)."""
+    global _executor, _executor_pid
+    if _executor is None or _executor_pid != os.getpid():
+        with _executor_lock:
+            if _executor is None or _executor_pid != os.getpid():
+                _executor = ThreadPoolExecutor(max_workers=REPORT_MAX_WORKERS, thread_name_prefix="hedge-report")
+                _executor_pid = os.getpid()
+    return _executor
+
+
+def run_hedge_factor_analysis(**kwargs: Any) -> Dict[str, Any]:
+    """Import the report pipeline (NumPy, matplotlib, LangChain) on first use rather than at app startup."""
+    try:
+        from .gen_hedge_factor_for_sellers import run_hedge_factor_analysis as run_analysis
+    except ImportError:
+        from gen_hedge_factor_for_sellers import run_hedge_factor_analysis as run_analysis
+    return run_analysis(**kwargs)
+
+
+# Single-flight: identical concurrent requests share one in-flight computation
+_in_flight: Dict[str, "asyncio.Future[Dict[str, Any]]"] = {}
+
+
+async def run_report_async(**kwargs: Any) -> Dict[str, Any]:
+    """
+    Run run_hedge_factor_analysis(**kwargs) in the report pool without blocking the event loop.
+    Concurrent calls with the same arguments await the same computation.
+    """
+    key = make_cache_key(kwargs.get("sellers"), **{k: v for k, v in kwargs.items() if k != "sellers"})
+
+    future = _in_flight.get(key)
+    if future is None:
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(get_report_pool(), functools.partial(run_hedge_factor_analysis, **kwargs))
+        _in_flight[key] = future
+        future.add_done_callback(lambda done: _in_flight.pop(key, None) if _in_flight.get(key) is done else None)
+
+    # shield: one caller disconnecting must not cancel the computation others are waiting on
+    return await asyncio.shield(future)
+
+
+async def run_report_in_pool(**kwargs: Any) -> Dict[str, Any]:
+    """Run run_hedge_factor_analysis(**kwargs) in the report pool without single-flight coalescing."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_report_pool(), functools.partial(run_hedge_factor_analysis, **kwargs))
+
+
+def shutdown_report_pool(wait: bool = True) -> None:
+    """Stop accepting report work and optionally wait for running reports to finish."""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None and _executor_pid == os.getpid():
+        executor.shutdown(wait=wait, cancel_futures=not wait)
@@ -0,0 +1,124 @@
+import hashlib
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+
+
+class SellerBatch:
+    """
+    Columnar seller records: parallel NumPy arrays of Ids (unicode), rates and,
+    once computed, factors (float64).
+
+    Batches flow from loading through factor generation, filtering, statistics
+    and charting without one dict per seller; rows are only materialized at the
+    edges that need them (LLM prompts, JSON responses).
+    """
+
+    __slots__ = ("ids", "rt", "factor")
+
+    def __init__(
+        self,
+        ids: Union[np.ndarray, Sequence[str]],
+        rt: Union[np.ndarray, Sequence[float]],
+        factor: Optional[Union[np.ndarray, Sequence[float]]] = None,
+    ):
+        self.ids = np.asarray(ids, dtype=str)
+        self.rt = np.asarray(rt, dtype=np.float64)
+        self.factor = None if factor is None else np.asarray(factor, dtype=np.float64)
+        if self.ids.shape != self.rt.shape or self.ids.ndim != 1:
+            raise ValueError(f"ids and rt must be 1-D arrays of equal length, got {self.ids.shape} and {self.rt.shape}")
+        if self.factor is not None and self.factor.shape != self.rt.shape:
+            raise ValueError(f"factor must match rt, got {self.factor.shape} and {self.rt.shape}")
+
+    def __len__(self) -> int:
+        return int(self.ids.size)
+
+    def __getitem__(self, index: Any) -> "SellerBatch":
+        """Slice or mask the batch (always returns a SellerBatch)."""
+        return SellerBatch(self.ids[index], self.rt[index], None if self.factor is None else self.factor[index])
+
+    def __repr__(self) -> str:
+        return f"SellerBatch({len(self)} sellers)"
+
+    @classmethod
+    def empty(cls) -> "SellerBatch":
+        return cls(np.array([], dtype=str), np.array([], dtype=np.float64), np.array([], dtype=np.float64))
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]]) -> "SellerBatch":
+        records = list(records)
+        factor = None
+        if any("factor" in record for record in records):
+            factor = np.fromiter((record.get("factor", 0.0) for record in records), dtype=np.float64, count=len(records))
+        return cls(
+            [str(record.get("Id", "")) for record in records],
+            np.fromiter((record.get("rt", 0.0) for record in records), dtype=np.float64, count=len(records)),
+            factor,
+        )
+
+    @classmethod
+    def from_columns(cls, columns: Dict[str, Any]) -> "SellerBatch":
+        return cls(columns["Id"], columns["rt"], columns.get("factor"))
+
+    @classmethod
+    def coerce(cls, sellers: Union["SellerBatch", Dict[str, Any], Iterable[Dict[str, Any]]]) -> "SellerBatch":
+        """Accept a batch, a to_columns() dict, or a list of {"Id", "rt"[, "factor"]} records."""
+        if isinstance(sellers, SellerBatch):
+            return sellers
+        if isinstance(sellers, dict):
+            return cls.from_columns(sellers)
+        return cls.from_records(sellers)
+
+    @classmethod
+    def concat(cls, batches: Iterable["SellerBatch"]) -> "SellerBatch":
+        batches = list(batches)
+        if not batches:
+            return cls.empty()
+        factor = None
+        if all(batch.factor is not None for batch in batches):
+            factor = np.concatenate([batch.factor for batch in batches])
+        return cls(
+            np.concatenate([batch.ids for batch in batches]),
+            np.concatenate([batch.rt for batch in batches]),
+            factor,
+        )
+
+    def with_factors(self, factor: Union[np.ndarray, Sequence[float]]) -> "SellerBatch":
+        return SellerBatch(self.ids, self.rt, factor)
+
+    def positive(self) -> "SellerBatch":
+        """Rows with a factor above zero (the charts and statistics ignore the rest)."""
+        if self.factor is None:
+            return SellerBatch.empty()
+        return self[self.factor > 0]
+
+    def chunks(self, size: int) -> Iterator["SellerBatch"]:
+        for start in range(0, len(self), size):
+            yield self[start:start + size]
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        """Row form, only for consumers that need it (LLM prompts, row-shaped JSON)."""
+        if self.factor is None:
+            return [{"Id": seller_id, "rt": rate} for seller_id, rate in zip(self.ids.tolist(), self.rt.tolist())]
+        return [
+            {"Id": seller_id, "rt": rate, "factor": factor}
+            for seller_id, rate, factor in zip(self.ids.tolist(), self.rt.tolist(), self.factor.tolist())
+        ]
+
+    def to_columns(self) -> Dict[str, List[Any]]:
+        """JSON-friendly column lists; SellerBatch.coerce() turns them back into a batch."""
+        columns: Dict[str, List[Any]] = {"Id": self.ids.tolist(), "rt": self.rt.tolist()}
+        if self.factor is not None:
+            columns["factor"] = self.factor.tolist()
+        return columns
+
+    def fingerprint(self) -> str:
+        """Content hash of Ids, rates and factors (if set), used in report cache keys."""
+        digest = hashlib.sha256()
+        digest.update(np.ascontiguousarray(self.ids).tobytes())
+        digest.update(b"|")
+        digest.update(np.ascontiguousarray(self.rt).tobytes())
+        if self.factor is not None:
+            digest.update(b"|")
+            digest.update(np.ascontiguousarray(self.factor).tobytes())
+        return digest.hexdigest()
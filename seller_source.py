@@ -0,0 +1,218 @@
+import csv
+import io
+import json
+import os
+import threading
+from typing import IO, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+try:
+    import orjson
+
+    _json_loads = orjson.loads
+except ImportError:  # optional speed-up
+    _json_loads = json.loads
+
+try:
+    from .hedge_factor_engine import MAX_RATE, MIN_RATE
+    from .seller_batch import SellerBatch
+except ImportError:
+    from hedge_factor_engine import MAX_RATE, MIN_RATE
+    from seller_batch import SellerBatch
+
+# Default seller input when a report is requested without sellers or an upload
+DEFAULT_SELLERS_PATH = os.getenv(
+    "HEDGE_FACTOR_SELLERS_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "mocked_sellers.csv"),
+)
+DEFAULT_CHUNK_SIZE = int(os.getenv("HEDGE_FACTOR_LOAD_CHUNK_SIZE", "65536"))
+
+SELLER_FORMATS = ("csv", "jsonl", "parquet")
+_EXTENSIONS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl", ".parquet": "parquet", ".pq": "parquet"}
+_MEDIA_TYPES = {
+    "text/csv": "csv",
+    "application/csv": "csv",
+    "application/x-ndjson": "jsonl",
+    "application/jsonl": "jsonl",
+    "application/vnd.apache.parquet": "parquet",
+    "application/x-parquet": "parquet",
+}
+
+Source = Union[str, os.PathLike, IO[bytes]]
+
+
+def detect_format(name: Optional[str] = None, media_type: Optional[str] = None) -> str:
+    """Seller file format from a file name or media type ("csv", "jsonl" or "parquet")."""
+    if name:
+        fmt = _EXTENSIONS.get(os.path.splitext(str(name))[1].lower())
+        if fmt:
+            return fmt
+    if media_type:
+        fmt = _MEDIA_TYPES.get(media_type.split(";")[0].strip().lower())
+        if fmt:
+            return fmt
+    raise ValueError(f"Cannot tell the seller file format from {name or media_type!r}; expected one of {SELLER_FORMATS}")
+
+
+def _open_binary(source: Source):
+    if isinstance(source, (str, os.PathLike)):
+        return open(source, "rb"), True
+    return source, False
+
+
+def _rate(value) -> float:
+    """Parse one rt value; NaN, infinities and rates outside the engine's range raise ValueError."""
+    rate = float(value)
+    if not MIN_RATE <= rate <= MAX_RATE:  # also False for NaN
+        raise ValueError(f"rt must be a number in [{MIN_RATE}, {MAX_RATE}], got {value!r}")
+    return rate
+
+
+def require_unique_ids(batch: SellerBatch) -> SellerBatch:
+    """Raise ValueError if any seller Id appears more than once (factors and the factor store are keyed by Id)."""
+    ids, counts = np.unique(batch.ids, return_counts=True)
+    duplicates = ids[counts > 1]
+    if duplicates.size:
+        shown = ", ".join(repr(str(seller_id)) for seller_id in duplicates[:10])
+        more = f" and {duplicates.size - 10} more" if duplicates.size > 10 else ""
+        raise ValueError(f"Duplicate seller Ids: {shown}{more}")
+    return batch
+
+
+def _to_batch(ids: List[str], rates: List[float]) -> SellerBatch:
+    return SellerBatch(np.array(ids, dtype=str), np.array(rates, dtype=np.float64))
+
+
+def _iter_csv(stream: IO[bytes], chunk_size: int) -> Iterator[SellerBatch]:
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    try:
+        yield from _iter_csv_rows(csv.reader(text), chunk_size)
+    finally:
+        text.detach()  # leave closing the underlying stream to its owner
+
+
+def _iter_csv_rows(reader, chunk_size: int) -> Iterator[SellerBatch]:
+    header = [column.strip() for column in next(reader, [])]
+    try:
+        id_col, rt_col = header.index("Id"), header.index("rt")
+    except ValueError:
+        raise ValueError(f"CSV needs 'Id' and 'rt' columns, got {header}")
+
+    ids: List[str] = []
+    rates: List[float] = []
+    for line_number, row in enumerate(reader, start=2):
+        if not row:
+            continue
+        try:
+            ids.append(row[id_col].strip())
+            rates.append(_rate(row[rt_col]))
+        except (IndexError, ValueError):
+            raise ValueError(f"Invalid seller row on line {line_number}: {row}")
+        if len(ids) >= chunk_size:
+            yield _to_batch(ids, rates)
+            ids, rates = [], []
+    if ids:
+        yield _to_batch(ids, rates)
+
+
+def _iter_jsonl(stream: IO[bytes], chunk_size: int) -> Iterator[SellerBatch]:
+    ids: List[str] = []
+    rates: List[float] = []
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = _json_loads(line)
+            ids.append(str(record["Id"]))
+            rates.append(_rate(record["rt"]))
+        except (ValueError, KeyError, TypeError):
+            raise ValueError(f"Invalid seller record on line {line_number}: {line[:200]!r}")
+        if len(ids) >= chunk_size:
+            yield _to_batch(ids, rates)
+            ids, rates = [], []
+    if ids:
+        yield _to_batch(ids, rates)
+
+
+def _iter_parquet(source: Source, chunk_size: int) -> Iterator[SellerBatch]:
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Reading Parquet seller files requires pyarrow (pip install pyarrow)")
+
+    # Files on disk are memory-mapped; only the Id and rt columns are decoded
+    memory_map = isinstance(source, (str, os.PathLike))
+    parquet_file = pq.ParquetFile(source, memory_map=memory_map)
+    first_row = 0
+    for record_batch in parquet_file.iter_batches(batch_size=chunk_size, columns=["Id", "rt"]):
+        ids = record_batch.column("Id").cast("string").to_numpy(zero_copy_only=False)
+        rates = record_batch.column("rt").cast("double").to_numpy(zero_copy_only=False)
+        invalid = np.flatnonzero(~((rates >= MIN_RATE) & (rates <= MAX_RATE)))  # NaN compares False
+        if invalid.size:
+            row = first_row + int(invalid[0])
+            raise ValueError(f"Invalid seller rate in row {row}: rt must be a number in [{MIN_RATE}, {MAX_RATE}], got {rates[invalid[0]]}")
+        first_row += len(rates)
+        yield SellerBatch(ids.astype(str), rates)
+
+
+def iter_seller_chunks(
+    source: Source,
+    fmt: Optional[str] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[SellerBatch]:
+    """
+    Stream sellers from a CSV, JSONL or Parquet path or binary file object in SellerBatch chunks.
+    The format is taken from the file extension unless fmt is given.
+    """
+    fmt = fmt or detect_format(name=getattr(source, "name", source))
+    if fmt not in SELLER_FORMATS:
+        raise ValueError(f"Unknown seller format '{fmt}', expected one of {SELLER_FORMATS}")
+    if fmt == "parquet":
+        yield from _iter_parquet(source, chunk_size)
+        return
+
+    stream, owned = _open_binary(source)
+    try:
+        if fmt == "csv":
+            yield from _iter_csv(stream, chunk_size)
+        else:
+            yield from _iter_jsonl(stream, chunk_size)
+    finally:
+        if owned:
+            stream.close()
+
+
+# The default seller file, parsed once per (mtime, size) and shared read-only by every report
+_default_sellers: Optional[Tuple[Tuple[int, int], SellerBatch]] = None
+_default_sellers_lock = threading.Lock()
+
+
+def load_sellers(
+    source: Optional[Source] = None,
+    fmt: Optional[str] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> SellerBatch:
+    """
+    Load a whole seller file into one SellerBatch (defaults to HEDGE_FACTOR_SELLERS_PATH).
+    The default file is parsed once and reused until it changes on disk; that batch is
+    shared, so its arrays are read-only. Duplicate seller Ids raise ValueError.
+    """
+    if source:
+        return require_unique_ids(SellerBatch.concat(iter_seller_chunks(source, fmt=fmt, chunk_size=chunk_size)))
+
+    global _default_sellers
+    stat = os.stat(DEFAULT_SELLERS_PATH)
+    version = (stat.st_mtime_ns, stat.st_size)
+    cached = _default_sellers
+    if cached is None or cached[0] != version:
+        with _default_sellers_lock:
+            cached = _default_sellers
+            if cached is None or cached[0] != version:
+                batch = require_unique_ids(SellerBatch.concat(iter_seller_chunks(DEFAULT_SELLERS_PATH, fmt=fmt, chunk_size=chunk_size)))
+                for column in (batch.ids, batch.rt, batch.factor):
+                    if column is not None:
+                        column.setflags(write=False)
+                cached = (version, batch)
+                _default_sellers = cached
+    return cached[1]
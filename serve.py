@@ -0,0 +1,178 @@
+"""
+Production entry point: several uvicorn worker processes behind one port.
+
+The parent imports the app and preloads what workers only read (compiled
+graphs, the anchor spline, the default seller file, the plotting stack), then
+forks, so every worker starts warm and shares those pages copy-on-write. State
+that must agree across workers lives in SQLite, and both default to it here:
+the report cache (HEDGE_FACTOR_CACHE_BACKEND=sqlite) and report jobs
+(HEDGE_FACTOR_JOB_STORE=sqlite). Everything else is created per worker after the
+fork: the report pool that renders charts (HEDGE_FACTOR_REPORT_WORKERS threads),
+LLM and HTTP clients, and database connections. Each worker's LLM rate limiter
+gets an equal share of HEDGE_FACTOR_LLM_RPM and HEDGE_FACTOR_LLM_BURST, so all
+workers together stay within the Bedrock quota.
+
+SIGTERM or SIGINT shuts down gracefully. Workers stop accepting connections,
+finish in-flight requests and running report jobs (up to --graceful-timeout
+each), then run the app's shutdown hooks. A worker that dies is restarted.
+
+With gunicorn installed, `gunicorn -c gunicorn.conf.py` runs the same
+setup under gunicorn's arbiter.
+
+Usage: python serve.py [--host 0.0.0.0] [--port 8000] [--workers N]
+                       [--graceful-timeout 30] [--log-level info]
+"""
+import argparse
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Dict
+
+import telemetry
+
+logger = telemetry.get_logger("serve")
+
+DEFAULT_WORKERS = int(os.getenv("HEDGE_FACTOR_WORKERS", str(os.cpu_count() or 1)))
+DEFAULT_GRACEFUL_TIMEOUT = float(os.getenv("HEDGE_FACTOR_GRACEFUL_TIMEOUT", "30"))
+# Shared state for multi-worker runs; explicit environment settings win
+MULTI_WORKER_DEFAULTS = {
+    "HEDGE_FACTOR_CACHE_BACKEND": "sqlite",
+    "HEDGE_FACTOR_JOB_STORE": "sqlite",
+}
+# A worker that dies sooner than this after starting is restarted only after this delay
+MIN_WORKER_UPTIME_SECONDS = 1.0
+
+
+def configure_environment(workers: int = DEFAULT_WORKERS, graceful_timeout: float = DEFAULT_GRACEFUL_TIMEOUT) -> None:
+    """Multi-worker defaults; must run before the app modules are imported (they read settings at import)."""
+    for name, value in MULTI_WORKER_DEFAULTS.items():
+        os.environ.setdefault(name, value)
+    # The LLM gateway splits the Bedrock request quota evenly across this many processes
+    os.environ["HEDGE_FACTOR_WORKERS"] = str(workers)
+    os.environ.setdefault("HEDGE_FACTOR_JOB_SHUTDOWN_GRACE", str(graceful_timeout))
+
+
+def preload():
+    """Import the app and build the read-only structures in the parent, before forking."""
+    started = time.perf_counter()
+    import main
+    from gen_hedge_factor_for_sellers import warm_up as warm_up_reports
+    from seller_source import load_sellers
+
+    load_sellers()  # default seller file, parsed once and shared by every worker
+    if main.chat_agent is not None:
+        main.chat_agent.warm_up(include_llm=False)
+    warm_up_reports(include_llm=False)  # report graph, anchors, plotting stack
+    logger.info("Preloaded app", extra={"duration_s": round(time.perf_counter() - started, 3)})
+    return main.app
+
+
+def after_fork() -> None:
+    """Per-worker setup in a freshly forked process (threads do not survive fork)."""
+    telemetry.restart_logging_after_fork()
+
+
+def _serve_worker(app, sock: socket.socket, graceful_timeout: float, log_level: str) -> None:
+    import uvicorn
+
+    config = uvicorn.Config(
+        app,
+        log_level=log_level,
+        access_log=False,  # MetricsMiddleware already logs every request
+        timeout_graceful_shutdown=graceful_timeout,
+    )
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def run(host: str, port: int, workers: int, graceful_timeout: float, log_level: str) -> int:
+    configure_environment(workers, graceful_timeout)
+    app = preload()
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    children: Dict[int, float] = {}  # pid -> start time
+    stopping = False
+
+    def spawn() -> None:
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                # uvicorn installs its own graceful-shutdown handlers
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                signal.signal(signal.SIGINT, signal.SIG_DFL)
+                after_fork()
+                _serve_worker(app, sock, graceful_timeout, log_level)
+            except BaseException:
+                logger.exception("Worker failed")
+                code = 1
+            finally:
+                telemetry.shutdown_logging()
+                os._exit(code)
+        children[pid] = time.monotonic()
+
+    def stop(signum, frame) -> None:
+        nonlocal stopping
+        if not stopping:
+            logger.info("Shutting down workers", extra={"signal": signal.Signals(signum).name, "workers": len(children)})
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for _ in range(workers):
+        spawn()
+    logger.info("Serving", extra={"host": host, "port": port, "workers": workers, "pid": os.getpid()})
+
+    # Requests drain first, then running jobs get their own grace period in the app's shutdown hook
+    kill_after = 2 * graceful_timeout + 5
+    stop_started = None
+    while children:
+        pid, status = os.waitpid(-1, os.WNOHANG)
+        if pid == 0:
+            if stopping:
+                stop_started = stop_started or time.monotonic()
+                if time.monotonic() - stop_started > kill_after:
+                    logger.warning("Killing workers after the graceful timeout", extra={"workers": len(children)})
+                    for child in list(children):
+                        os.kill(child, signal.SIGKILL)
+            time.sleep(0.2)
+            continue
+        started = children.pop(pid)
+        if not stopping:
+            logger.warning("Worker exited, restarting", extra={"pid": pid, "status": os.waitstatus_to_exitcode(status)})
+            if time.monotonic() - started < MIN_WORKER_UPTIME_SECONDS:
+                time.sleep(MIN_WORKER_UPTIME_SECONDS)
+            spawn()
+
+    sock.close()
+    logger.info("All workers stopped")
+    telemetry.shutdown_logging()
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=os.getenv("HEDGE_FACTOR_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("HEDGE_FACTOR_PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="worker processes (default: CPU count)")
+    parser.add_argument("--graceful-timeout", type=float, default=DEFAULT_GRACEFUL_TIMEOUT, help="seconds")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    return run(args.host, args.port, args.workers, args.graceful_timeout, args.log_level)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
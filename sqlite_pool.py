@@ -0,0 +1,64 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+
+class SQLiteConnectionPool:
+    """
+    SQLite connections for one database file in WAL mode.
+
+    Writes share a single connection behind a lock (SQLite allows one writer
+    at a time anyway). Reads use one connection per thread, so with WAL they
+    neither wait for the writer lock nor block writes.
+    """
+
+    def __init__(self, path: str, schema: Optional[str] = None, busy_timeout_ms: int = 5000):
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._write_lock = threading.Lock()
+        self._local = threading.local()
+        self._readers: List[sqlite3.Connection] = []
+        self._readers_lock = threading.Lock()
+
+        self._writer = self._connect()
+        self._writer.execute("PRAGMA journal_mode=WAL")
+        if schema:
+            self._writer.executescript(schema)
+            self._writer.commit()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Each reader stays on its own thread; check_same_thread=False only lets close() run from any thread
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @contextmanager
+    def write(self) -> Iterator[sqlite3.Connection]:
+        """Writer connection inside a transaction (committed on exit, rolled back on error)."""
+        with self._write_lock, self._writer:
+            yield self._writer
+
+    def read(self) -> sqlite3.Connection:
+        """This thread's reader connection."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            with self._readers_lock:
+                self._readers.append(conn)
+        return conn
+
+    def close(self) -> None:
+        with self._readers_lock:
+            for conn in self._readers:
+                conn.close()
+            self._readers.clear()
+        with self._write_lock:
+            self._writer.close()
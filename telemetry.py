@@ -0,0 +1,365 @@
+import asyncio
+import functools
+import json
+import logging
+import logging.handlers
+import math
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+LOG_LEVEL = os.getenv("HEDGE_FACTOR_LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("HEDGE_FACTOR_LOG_FORMAT", "json").lower()  # "json" or "text"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+# Step 1. Metrics (Prometheus text exposition format, no client library needed)
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: Dict[Tuple[str, ...], Any] = {}
+
+    def labels(self, *values: Any, **kwargs: Any):
+        key = tuple(str(kwargs[name]) for name in self.labelnames) if kwargs else tuple(str(v) for v in values)
+        if len(key) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in sorted(self._children.items()):
+            lines.extend(child.render(self.name, self.labelnames, key))
+        return lines
+
+
+class _Value:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float) -> None:
+        with self._lock:
+            self.value = float(value)
+
+    def render(self, name: str, labelnames, key) -> List[str]:
+        return [f"{name}{_format_labels(labelnames, key)} {_format_value(self.value)}"]
+
+
+class _HistogramValue:
+    def __init__(self, buckets: Sequence[float]):
+        self._lock = threading.Lock()
+        self.buckets = tuple(buckets) + (math.inf,)
+        self.counts = [0] * len(self.buckets)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self.sum += value
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[index] += 1
+                    break
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def render(self, name: str, labelnames, key) -> List[str]:
+        with self._lock:
+            counts, total = list(self.counts), self.sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, counts):
+            cumulative += count
+            labels = _format_labels(labelnames, key, f'le="{_format_value(bound)}"')
+            lines.append(f"{name}_bucket{labels} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(labelnames, key)} {_format_value(total)}")
+        lines.append(f"{name}_count{_format_labels(labelnames, key)} {cumulative}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _Value()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "hedge_factor_http_requests_total", "HTTP requests by route and status.", ("method", "route", "status")))
+HTTP_REQUEST_DURATION = REGISTRY.register(Histogram(
+    "hedge_factor_http_request_duration_seconds", "HTTP request latency by route.", ("method", "route")))
+HTTP_IN_FLIGHT = REGISTRY.register(Gauge(
+    "hedge_factor_http_requests_in_flight", "HTTP requests currently being served.", ("method",)))
+LLM_CALL_DURATION = REGISTRY.register(Histogram(
+    "hedge_factor_llm_call_duration_seconds", "LLM call latency.", ("graph", "model", "outcome")))
+LLM_TOKENS = REGISTRY.register(Counter(
+    "hedge_factor_llm_tokens_total", "LLM tokens by direction.", ("graph", "model", "direction")))
+CHART_RENDER_DURATION = REGISTRY.register(Histogram(
+    "hedge_factor_chart_render_duration_seconds", "Chart rendering time.", ("chart", "format")))
+CACHE_REQUESTS = REGISTRY.register(Counter(
+    "hedge_factor_cache_requests_total", "Cache lookups by cache and result (hit/miss).", ("cache", "result")))
+LLM_QUEUE_DEPTH = REGISTRY.register(Gauge(
+    "hedge_factor_llm_queue_depth", "LLM calls waiting for a rate limiter token.", ("graph",)))
+LLM_REJECTED = REGISTRY.register(Counter(
+    "hedge_factor_llm_rejected_total", "LLM calls refused by the gateway (circuit_open, deadline).", ("graph", "reason")))
+LLM_CIRCUIT_OPEN = REGISTRY.register(Gauge(
+    "hedge_factor_llm_circuit_open", "1 while the LLM circuit breaker is open or half-open.", ()))
+NODE_DURATION = REGISTRY.register(Histogram(
+    "hedge_factor_graph_node_duration_seconds", "LangGraph node run time.", ("graph", "node", "outcome")))
+
+
+def render_metrics() -> str:
+    return REGISTRY.render()
+
+
+def record_llm_call(graph: str, model: str, duration: float, response: Any = None, error: bool = False) -> None:
+    """Record LLM latency and, when the response carries usage metadata, token counts."""
+    LLM_CALL_DURATION.labels(graph, model, "error" if error else "ok").observe(duration)
+    usage = getattr(response, "usage_metadata", None) or {}
+    for direction in ("input", "output"):
+        tokens = usage.get(f"{direction}_tokens")
+        if tokens:
+            LLM_TOKENS.labels(graph, model, direction).inc(tokens)
+
+
+# Step 2. Spans
+try:
+    from opentelemetry import trace as _otel_trace
+
+    _tracer = _otel_trace.get_tracer("hedge_factor")
+except ImportError:  # optional: export spans when OpenTelemetry is installed
+    _tracer = None
+
+logger = logging.getLogger("hedge_factor.telemetry")
+
+
+@contextmanager
+def span(graph: str, node: str) -> Iterator[None]:
+    """Time one LangGraph node run (histogram + debug log, and an OpenTelemetry span if available)."""
+    started = time.perf_counter()
+    outcome = "ok"
+    otel_span = _tracer.start_as_current_span(f"{graph}.{node}") if _tracer is not None else None
+    try:
+        if otel_span is not None:
+            with otel_span:
+                yield
+        else:
+            yield
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        duration = time.perf_counter() - started
+        NODE_DURATION.labels(graph, node, outcome).observe(duration)
+        logger.debug("graph node finished", extra={"graph": graph, "node": node, "outcome": outcome, "duration_s": round(duration, 6)})
+
+
+def traced_node(graph: str, node: str, func: Callable) -> Callable:
+    """Wrap a sync or async graph node so each run is recorded as a span."""
+    if asyncio.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            with span(graph, node):
+                return await func(*args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with span(graph, node):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+# Step 3. Structured, non-blocking logging
+_STANDARD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in _STANDARD_ATTRS})
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def configure_logging(level: str = LOG_LEVEL, fmt: str = LOG_FORMAT) -> None:
+    """
+    Route the hedge_factor loggers through a queue so request handlers never
+    block on stdout; a background thread does the formatting and writing.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(
+        JsonFormatter() if fmt == "json" else logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+    )
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+
+    root = logging.getLogger("hedge_factor")
+    root.handlers[:] = [logging.handlers.QueueHandler(log_queue)]
+    root.setLevel(level)
+    root.propagate = False
+
+
+def restart_logging_after_fork() -> None:
+    """
+    Start a fresh log queue and writer thread in a forked server worker (threads do
+    not survive fork, so records queued to the parent's writer would be lost).
+    """
+    global _listener
+    _listener = None
+    configure_logging()
+
+
+def shutdown_logging() -> None:
+    """Flush queued log records (call on application shutdown)."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger under the hedge_factor namespace (module names become hedge_factor.<module>)."""
+    return logging.getLogger(f"hedge_factor.{name.rsplit('.', 1)[-1]}")
+
+
+# Step 4. Pure ASGI middleware
+class MetricsMiddleware:
+    """Per-route latency histogram, request counter and in-flight gauge, plus one structured log line per request."""
+
+    def __init__(self, app):
+        self.app = app
+        self.logger = get_logger("http")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = {"code": 500}
+        # The route template is only known after routing, so in-flight is tracked per method
+        in_flight = HTTP_IN_FLIGHT.labels(scope["method"])
+        in_flight.inc()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_flight.dec()
+            duration = time.perf_counter() - started
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            HTTP_REQUEST_DURATION.labels(scope["method"], route).observe(duration)
+            HTTP_REQUESTS.labels(scope["method"], route, status["code"]).inc()
+            if self.logger.isEnabledFor(logging.INFO):
+                self.logger.info(
+                    "request",
+                    extra={
+                        "method": scope["method"],
+                        "path": scope["path"],
+                        "route": route,
+                        "status": status["code"],
+                        "duration_ms": round(duration * 1000, 3),
+                    },
+                )
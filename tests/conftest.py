@@ -0,0 +1,7 @@
+import os
+
+# Modules read their settings at import: keep the suite offline and free of shared state
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ.setdefault("HEDGE_FACTOR_FAKE_LLM", "true")
+os.environ.setdefault("HEDGE_FACTOR_LLM_RPM", "0")
+os.environ.setdefault("HEDGE_FACTOR_CACHE_BACKEND", "none")
@@ -0,0 +1,90 @@
+import asyncio
+import json
+
+import pytest
+from langchain_core.messages import AIMessageChunk
+
+import gen_hedge_factor_for_sellers as gen
+from fake_bedrock import FakeChatBedrock
+from hedge_factor_engine import TARGET_MEAN
+
+SELLERS = [{"Id": f"S{i}", "rt": round(0.1 + 0.2 * i, 2)} for i in range(5)]  # rates within the engine's [0, 1]
+
+
+def _converse_pieces(text: str, size: int = 7):
+    """Chunks shaped like ChatBedrock's Converse stream: content is a list of text blocks."""
+    for start in range(0, len(text), size):
+        yield AIMessageChunk(content=[{"type": "text", "text": text[start:start + size], "index": 0}])
+
+
+class _ConverseStub:
+    def __init__(self, text: str):
+        self.text = text
+
+    def stream(self, messages):
+        return _converse_pieces(self.text)
+
+    async def astream(self, messages):
+        for piece in _converse_pieces(self.text):
+            yield piece
+
+
+@pytest.fixture
+def converse_llm(monkeypatch):
+    rows = [{"Id": seller["Id"], "rt": seller["rt"], "factor": 30.0 + i} for i, seller in enumerate(SELLERS)]
+    stub = _ConverseStub(json.dumps({"output": rows}))
+    monkeypatch.setattr(gen, "get_llm", lambda: stub)
+    return stub
+
+
+def test_stream_rows_accepts_list_content(converse_llm):
+    collector = gen._new_collector(SELLERS)
+    seen = []
+    gen._stream_rows(collector, SELLERS, seen.extend)
+    assert collector.complete
+    assert [row["Id"] for row in seen] == [seller["Id"] for seller in SELLERS]
+
+
+def test_astream_rows_accepts_list_content(converse_llm):
+    collector = gen._new_collector(SELLERS)
+    asyncio.run(gen._astream_rows(collector, SELLERS, None))
+    assert collector.complete
+    assert collector.rows["S4"]["factor"] == 34.0
+
+
+def test_fake_bedrock_streams_content_blocks(monkeypatch):
+    fake = FakeChatBedrock()
+    pieces = list(fake.stream(gen._build_factor_messages(SELLERS)))
+    assert all(isinstance(piece.content, list) for piece in pieces)
+    monkeypatch.setattr(gen, "get_llm", lambda: fake)
+    collector = gen._new_collector(SELLERS)
+    gen._stream_rows(collector, SELLERS, None)
+    assert collector.complete
+
+
+def test_duplicate_seller_ids_are_rejected():
+    sellers = SELLERS + [{"Id": "S1", "rt": 0.5}]
+    with pytest.raises(ValueError, match="Duplicate seller Ids: 'S1'"):
+        gen.run_hedge_factor_analysis(sellers=sellers, method="llm", use_cache=False, chart_format="data")
+
+
+def test_llm_rebalance_does_not_depend_on_incremental(converse_llm, monkeypatch, tmp_path):
+    from factor_store import FactorStore
+
+    monkeypatch.setattr(gen, "get_factor_store", lambda: FactorStore(str(tmp_path / "factors.sqlite3")))
+    seen = []
+    reports = {
+        incremental: gen.run_hedge_factor_analysis(
+            sellers=SELLERS,
+            method="llm",
+            use_cache=False,
+            incremental=incremental,
+            chart_format="data",
+            progress_callback=seen.extend if not incremental else None,
+        )
+        for incremental in (False, True)
+    }
+    full, incremental = reports[False]["output"], reports[True]["output"]
+    assert full.factor.tolist() == incremental.factor.tolist()
+    assert full.factor.mean() == pytest.approx(TARGET_MEAN, abs=0.01)
+    assert [row["factor"] for row in seen] == full.factor.tolist()
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from hedge_factor_engine import (
+    ANCHORS,
+    MAX_FACTOR,
+    MIN_FACTOR,
+    TARGET_MEAN,
+    compute_factors,
+    interpolate_factors,
+    rebalance_to_target,
+)
+
+
+def test_interpolation_passes_through_anchors():
+    rates = [rate for rate, _ in ANCHORS]
+    expected = [factor for _, factor in ANCHORS]
+    np.testing.assert_allclose(interpolate_factors(rates), expected)
+
+
+def test_interpolation_is_monotone_decreasing():
+    factors = interpolate_factors(np.linspace(0.0, 1.0, 2001))
+    assert np.all(np.diff(factors) <= 1e-12)
+
+
+def test_interpolation_clamps_outside_anchor_range():
+    factors = interpolate_factors([-0.5, 0.0, 1.0, 3.0])
+    assert factors.tolist() == [MAX_FACTOR, MAX_FACTOR, MIN_FACTOR, MIN_FACTOR]
+
+
+def test_rebalance_hits_target_mean_and_keeps_order():
+    rates = np.random.default_rng(7).uniform(0.6, 1.0, 500)
+    raw = interpolate_factors(rates)
+    factors = rebalance_to_target(raw)
+    assert factors.mean() == pytest.approx(TARGET_MEAN, abs=1e-5)
+    assert factors.min() >= MIN_FACTOR and factors.max() <= MAX_FACTOR
+    np.testing.assert_array_equal(np.argsort(raw, kind="stable"), np.argsort(factors, kind="stable"))
+
+
+def test_rebalance_of_empty_input():
+    assert rebalance_to_target(np.array([])).size == 0
+
+
+def test_rebalance_without_iterations_returns_clamped_input():
+    np.testing.assert_array_equal(rebalance_to_target(np.array([10.0, 30.0, 60.0]), max_iterations=0), [15.0, 30.0, 55.0])
+
+
+@pytest.mark.parametrize("bad", [np.nan, np.inf, -np.inf])
+def test_non_finite_values_raise(bad):
+    with pytest.raises(ValueError, match="finite"):
+        rebalance_to_target(np.array([30.0, bad, 40.0]))
+    with pytest.raises(ValueError, match="finite"):
+        compute_factors([0.8, bad])
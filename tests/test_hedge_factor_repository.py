@@ -0,0 +1,35 @@
+import time
+
+import pytest
+
+from hedge_factor_repository import SQLiteHedgeFactorRepository
+
+
+@pytest.fixture
+def repository(tmp_path):
+    repository = SQLiteHedgeFactorRepository(str(tmp_path / "hedge_factors.sqlite3"))
+    yield repository
+    repository.close()
+
+
+def test_unchanged_factor_adds_no_history(repository):
+    repository.upsert_many([("1", 0.1)])
+    repository.upsert_many([("1", 0.1)])
+    assert len(repository.history("1")) == 1
+
+
+def test_repeated_seller_in_batch_keeps_history_consistent(repository):
+    repository.upsert_many([("1", 0.1)])
+    assert repository.upsert_many([("1", 0.1), ("1", 0.2), ("1", 0.1), ("2", 0.3)]) == 2
+
+    assert repository.get("1")["hedgeFactor"] == 0.1
+    assert repository.get_at("1", time.time())["hedgeFactor"] == 0.1
+    assert [entry["hedgeFactor"] for entry in repository.history("1")] == [0.1]
+    assert repository.get_at("2", time.time())["hedgeFactor"] == 0.3
+
+
+def test_repeated_seller_in_batch_records_last_value(repository):
+    repository.upsert_many([("1", 0.1)])
+    repository.upsert_many([("1", 0.2), ("1", 0.3)])
+    assert repository.get("1")["hedgeFactor"] == 0.3
+    assert [entry["hedgeFactor"] for entry in repository.history("1")] == [0.3, 0.1]
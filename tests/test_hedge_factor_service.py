@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+
+from hedge_factor_service import validate_bulk_updates
+
+
+def test_bulk_accepts_numbers_in_range():
+    results = validate_bulk_updates([
+        {"sellerNumber": "1", "hedgeFactor": 0.5},
+        {"sellerNumber": "2", "hedgeFactor": 1},
+        {"sellerNumber": "3", "hedgeFactor": np.float32(0.25)},
+    ])
+    assert [result["status"] for result in results] == ["updated"] * 3
+    assert [result["hedgeFactor"] for result in results] == [0.5, 1.0, 0.25]
+
+
+@pytest.mark.parametrize("factor", [True, False, "0.5", None, [0.5], 1.5, float("nan")])
+def test_bulk_rejects_non_numeric_or_out_of_range_factor(factor):
+    results = validate_bulk_updates([
+        {"sellerNumber": "1", "hedgeFactor": 0.5},
+        {"sellerNumber": "2", "hedgeFactor": factor},
+    ])
+    assert results[0]["status"] == "updated"
+    assert results[1]["status"] == "rejected"
+    assert results[1]["error"] == "Hedge factor must be between 0 and 1"
@@ -0,0 +1,8 @@
+from check_import_time import DEFAULT_BUDGET_MS, DEFERRED_MODULES, measure_import
+
+
+def test_import_main_stays_lazy_and_within_budget():
+    cumulative_us, imported = measure_import("main")
+    assert cumulative_us is not None
+    assert cumulative_us / 1000 <= DEFAULT_BUDGET_MS
+    assert [name for name in DEFERRED_MODULES if name in imported] == []
@@ -0,0 +1,43 @@
+import pytest
+
+from intent_cache import IntentCache, normalize_command
+
+
+@pytest.mark.parametrize(
+    "first, second",
+    [
+        ("add hedge factor 25bps for seller 123450001", "25 bps seller 123450001"),
+        ("set seller 123450001 to 0.25%", "set seller 123450001 to 25 basis points"),
+        ("set seller 123450001 to -25bps", "Set seller 123450001 to −0.25 %"),
+    ],
+)
+def test_equivalent_commands_share_a_key(first, second):
+    assert normalize_command(first) == normalize_command(second)
+
+
+@pytest.mark.parametrize(
+    "other",
+    [
+        "set seller 123450001 to -25bps",
+        "set seller 123450001 to +25bps",
+        "decrease seller 123450001 by 25bps",
+        "increase seller 123450001 25bps",
+        "set seller 123450002 to 25bps",
+    ],
+)
+def test_different_commands_get_different_keys(other):
+    assert normalize_command("set seller 123450001 to 25bps") != normalize_command(other)
+
+
+def test_negative_command_does_not_hit_positive_entry():
+    cache = IntentCache()
+    cache.set("set seller 123450001 to 25bps", "v1", [{"sellerNumber": "123450001", "hedgeFactor": 0.0025}])
+    assert cache.get("set seller 123450001 to -25bps", "v1") is None
+    assert cache.get("seller 123450001 25 bps", "v1") == [{"sellerNumber": "123450001", "hedgeFactor": 0.0025}]
+
+
+def test_version_change_drops_entries():
+    cache = IntentCache()
+    cache.set("set seller 1 to 25bps", "v1", [{"sellerNumber": "1", "hedgeFactor": 0.0025}])
+    assert cache.get("set seller 1 to 25bps", "v2") is None
+    assert cache.get("set seller 1 to 25bps", "v1") is None
@@ -0,0 +1,84 @@
+import pytest
+
+from intent_parser import (
+    CONFIDENCE_AMBIGUOUS,
+    CONFIDENCE_BARE_SELLER,
+    CONFIDENCE_DECIMAL,
+    CONFIDENCE_EXPLICIT,
+    parse_hedge_factor_command,
+    split_instructions,
+)
+
+
+def _pairs(text):
+    instructions, confidence = parse_hedge_factor_command(text)
+    return [(item["sellerNumber"], item["hedgeFactor"]) for item in instructions], confidence
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("add a hedge factor of 25bps for seller number 123450001", [("123450001", 0.0025)]),
+        ("set seller #123450001 to 0.25%", [("123450001", 0.0025)]),
+        ("seller 123450001: 25 basis points", [("123450001", 0.0025)]),
+        ("seller 123450001 to .5 percent", [("123450001", 0.005)]),
+        ("sellers 123450001 and 123450002 -> 30 bps", [("123450001", 0.003), ("123450002", 0.003)]),
+        (
+            "25bps for seller 123450001 and 40 bps for seller 123450002",
+            [("123450001", 0.0025), ("123450002", 0.004)],
+        ),
+    ],
+)
+def test_explicit_commands(text, expected):
+    assert _pairs(text) == (expected, CONFIDENCE_EXPLICIT)
+
+
+def test_decimal_factor_without_unit():
+    assert _pairs("set seller 123450001 to 0.0025") == ([("123450001", 0.0025)], CONFIDENCE_DECIMAL)
+
+
+def test_implausible_bare_decimal_is_ambiguous():
+    # 0.25 as a decimal factor is 2500 bps; more likely someone meant 0.25%
+    assert _pairs("set seller 123450001 to 0.25") == ([("123450001", 0.25)], CONFIDENCE_AMBIGUOUS)
+
+
+def test_bare_amount_is_ambiguous():
+    assert _pairs("hedge factor of 25 for seller 123450001") == ([("123450001", 0.0025)], CONFIDENCE_AMBIGUOUS)
+
+
+def test_seller_without_keyword_has_lower_confidence():
+    assert _pairs("could 123450001 get 25 bps") == ([("123450001", 0.0025)], CONFIDENCE_BARE_SELLER)
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "",
+        "   ",
+        "what is the hedge factor for seller 123450001?",
+        "set it to 25bps",
+        # A stray number could belong to the seller number
+        "seller 12345 0001 to 25bps",
+        "seller 123450001 to 25bps, ticket 4411",
+        # Two amounts for three sellers cannot be paired
+        "sellers 123450001, 123450002 and 123450003 to 25bps and 30bps",
+        # Above 100%
+        "seller 123450001 to 150%",
+        # Signs are not part of the grammar
+        "set seller 123450001 to -25bps",
+        "set seller 123450001 to \u22120.25%",
+        "set seller 123450001 to +25bps",
+        # Relative changes are not absolute factors
+        "decrease seller 123450001 by 10bps",
+        "increase seller 123450001 by 0.1%",
+        "raise seller 123450001 to 25bps",
+        "lower seller 123450001 25bps",
+    ],
+)
+def test_unresolved_commands_go_to_the_llm(text):
+    assert parse_hedge_factor_command(text) == ([], 0.0)
+
+
+def test_split_instructions_strips_list_markers():
+    text = "- seller 1 to 25bps\n\n2) seller 2 to 30bps\n* seller 3 to 0.1%\n  \n"
+    assert split_instructions(text) == ["seller 1 to 25bps", "seller 2 to 30bps", "seller 3 to 0.1%"]
@@ -0,0 +1,174 @@
+import asyncio
+
+import pytest
+
+from llm_gateway import CircuitBreaker, LLMDeadlineExceeded, LLMGateway, LLMUnavailableError, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+class StubModel:
+    """Counts calls; raises `error` when set."""
+
+    def __init__(self):
+        self.calls = 0
+        self.error = None
+
+    def invoke(self, prompt):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        return f"reply to {prompt}"
+
+    async def ainvoke(self, prompt):
+        return self.invoke(prompt)
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def model():
+    return StubModel()
+
+
+def _gateway(clock, **kwargs):
+    settings = dict(requests_per_minute=0, burst=1, breaker_threshold=3, breaker_reset_seconds=30, deadline_seconds=5)
+    settings.update(kwargs)
+    return LLMGateway(use_fake=True, clock=clock, **settings)
+
+
+def test_token_bucket_reserves_burst_then_queues(clock):
+    bucket = TokenBucket(rate_per_second=1.0, burst=2, clock=clock)
+    assert [bucket.reserve() for _ in range(4)] == [0.0, 0.0, 1.0, 2.0]
+
+
+def test_token_bucket_refills_up_to_capacity(clock):
+    bucket = TokenBucket(rate_per_second=2.0, burst=2, clock=clock)
+    bucket.reserve()
+    bucket.reserve()
+    clock.advance(0.5)
+    assert bucket.reserve() == 0.0
+    clock.advance(60)
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.5]
+
+
+def test_token_bucket_over_max_wait_raises_without_taking_a_token(clock):
+    bucket = TokenBucket(rate_per_second=1.0, burst=1, clock=clock)
+    bucket.reserve()
+    with pytest.raises(LLMDeadlineExceeded):
+        bucket.reserve(max_wait=0.5)
+    assert bucket.reserve() == 1.0
+
+
+def test_unlimited_bucket_never_waits(clock):
+    bucket = TokenBucket(rate_per_second=0, burst=1, clock=clock)
+    assert all(bucket.reserve() == 0.0 for _ in range(100))
+
+
+def test_failures_open_the_breaker(clock, model):
+    gateway = _gateway(clock)
+    model.error = RuntimeError("throttled")
+    for _ in range(3):
+        with pytest.raises(RuntimeError, match="throttled"):
+            gateway.call("test", model.invoke, "hi")
+    assert gateway.breaker.state == "open"
+
+    with pytest.raises(LLMUnavailableError):
+        gateway.call("test", model.invoke, "hi")
+    assert model.calls == 3
+
+
+def test_success_resets_the_failure_count(clock, model):
+    gateway = _gateway(clock)
+    model.error = RuntimeError("throttled")
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            gateway.call("test", model.invoke, "hi")
+    model.error = None
+    gateway.call("test", model.invoke, "hi")
+    assert (gateway.breaker.state, gateway.breaker.failures) == ("closed", 0)
+
+
+def test_breaker_lets_one_probe_through_after_the_cooldown(clock):
+    breaker = CircuitBreaker(threshold=1, reset_seconds=30, clock=clock)
+    breaker.record_failure()
+    clock.advance(29)
+    with pytest.raises(LLMUnavailableError):
+        breaker.before_call()
+
+    clock.advance(1)
+    breaker.before_call()  # the probe
+    assert breaker.state == "half_open"
+    with pytest.raises(LLMUnavailableError):
+        breaker.before_call()  # only one probe at a time
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+    breaker.before_call()
+    breaker.before_call()
+
+
+def test_failed_probe_reopens_the_breaker(clock, model):
+    gateway = _gateway(clock, breaker_threshold=3)
+    model.error = RuntimeError("down")
+    for _ in range(3):
+        with pytest.raises(RuntimeError):
+            gateway.call("test", model.invoke, "hi")
+
+    clock.advance(30)
+    with pytest.raises(RuntimeError, match="down"):
+        gateway.call("test", model.invoke, "probe")
+    assert gateway.breaker.state == "open"
+    with pytest.raises(LLMUnavailableError):
+        gateway.call("test", model.invoke, "hi")
+    assert model.calls == 4
+
+    clock.advance(30)
+    model.error = None
+    assert gateway.call("test", model.invoke, "probe") == "reply to probe"
+    assert gateway.breaker.state == "closed"
+
+
+def test_released_probe_can_be_retried(clock):
+    breaker = CircuitBreaker(threshold=1, reset_seconds=30, clock=clock)
+    breaker.record_failure()
+    clock.advance(30)
+    breaker.before_call()
+    breaker.release()
+    breaker.before_call()
+
+
+def test_deadline_expiry_raises_without_calling_the_model(clock, model):
+    gateway = _gateway(clock, requests_per_minute=60, burst=1, deadline_seconds=0.5)
+    assert gateway.call("test", model.invoke, "first") == "reply to first"
+
+    with pytest.raises(LLMDeadlineExceeded):
+        gateway.call("test", model.invoke, "second")
+    with pytest.raises(LLMDeadlineExceeded):
+        asyncio.run(gateway.acall("test", model.ainvoke, "third"))
+    assert model.calls == 1
+    # A rejected call is not a model failure
+    assert (gateway.breaker.state, gateway.breaker.failures) == ("closed", 0)
+
+
+def test_acall_counts_as_failure_when_the_model_overruns_the_deadline(clock):
+    gateway = _gateway(clock, deadline_seconds=0.05, breaker_threshold=1)
+
+    async def slow(prompt):
+        await asyncio.sleep(1)
+
+    with pytest.raises(LLMDeadlineExceeded):
+        asyncio.run(gateway.acall("test", slow, "hi"))
+    assert gateway.breaker.state == "open"
@@ -0,0 +1,71 @@
+import json
+
+import pytest
+
+from llm_json import FactorRowCollector, JSONObjectExtractor, extract_rows, find_object
+
+ROWS = [
+    {"Id": "A1", "rt": 0.9, "factor": 25.5},
+    {"Id": "B{2}", "rt": 0.8, "factor": 35.0},
+    {"Id": "C\"3\\", "rt": 0.7, "factor": 42.25},
+]
+DOCUMENT = json.dumps({"output": ROWS})
+
+
+def _feed_in_pieces(text: str, size: int):
+    extractor = JSONObjectExtractor()
+    found = []
+    for start in range(0, len(text), size):
+        found.extend(extractor.feed(text[start:start + size]))
+    return found
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 16, len(DOCUMENT)])
+def test_extractor_returns_rows_however_the_text_is_split(size):
+    assert _feed_in_pieces(DOCUMENT, size) == ROWS
+
+
+def test_extractor_skips_prose_and_code_fences():
+    text = 'Sure! Here are the "factors" you asked for:\n```json\n' + DOCUMENT + "\n```\nLet me know {if} needed."
+    assert _feed_in_pieces(text, 5) == ROWS
+
+
+def test_extractor_salvages_rows_before_truncation():
+    truncated = DOCUMENT[: DOCUMENT.index('"C')]
+    assert _feed_in_pieces(truncated, 4) == ROWS[:2]
+
+
+def test_extractor_drops_invalid_objects():
+    text = '{"output": [{"Id": "A1", "factor": 1}, {"Id": oops}, {"Id": "B2", "factor": 2}]}'
+    assert [row["Id"] for row in JSONObjectExtractor().feed(text)] == ["A1", "B2"]
+
+
+def test_extract_rows_decodes_wellformed_documents_and_salvages_the_rest():
+    assert extract_rows(DOCUMENT) == ROWS
+    assert extract_rows("```json\n" + DOCUMENT + "\n```") == ROWS
+    assert extract_rows(DOCUMENT[:-30]) == ROWS[:2]
+
+
+def test_find_object_requires_keys():
+    text = 'noise {"other": 1} {"sellerNumber": "123", "hedgeFactor": 0.0025} tail'
+    assert find_object(text, ["sellerNumber", "hedgeFactor"]) == {"sellerNumber": "123", "hedgeFactor": 0.0025}
+    assert find_object(text, ["missing"]) is None
+
+
+def test_collector_validates_rows_and_tracks_missing_sellers():
+    sellers = [{"Id": "A1", "rt": 0.9}, {"Id": "B2", "rt": 0.8}, {"Id": "C3", "rt": 0.7}]
+    collector = FactorRowCollector(sellers, min_factor=15, max_factor=55)
+    accepted = collector.add([
+        {"Id": "A1", "rt": 0.1, "factor": "25"},  # rt comes from the request, factor may be a string
+        {"Id": "B2", "factor": 99},  # out of range
+        {"Id": "X9", "factor": 30},  # not requested
+        {"Id": "C3", "factor": float("nan")},
+        {"Id": "A1", "factor": 40},  # duplicate
+    ])
+    assert accepted == [{"Id": "A1", "rt": 0.9, "factor": 25.0}]
+    assert collector.rejected == 3
+    assert [seller["Id"] for seller in collector.missing] == ["B2", "C3"]
+    assert not collector.complete
+
+    collector.add_text('{"output": [{"Id": "B2", "factor": 30}, {"Id": "C3", "factor": 45}]}')
+    assert collector.complete and collector.missing == []
@@ -0,0 +1,100 @@
+import asyncio
+import sqlite3
+import threading
+import time
+
+from report_jobs import JOB_NOT_FOUND, JOB_RUNNING, JOB_SUCCEEDED, ReportJobQueue, SQLiteJobStore
+
+
+async def _collect(queue: ReportJobQueue, job_id: str):
+    return [event async for event in queue.stream(job_id)]
+
+
+def test_stream_of_unknown_job_ends_with_not_found():
+    queue = ReportJobQueue(store_backend="memory")
+    events = asyncio.run(_collect(queue, "missing"))
+    assert events == [("status", {"status": JOB_NOT_FOUND, "error": "Report job missing not found"})]
+
+
+def test_stream_of_unknown_job_in_shared_store_ends_with_not_found(tmp_path):
+    queue = ReportJobQueue(store_backend="sqlite")
+    queue._store = SQLiteJobStore(str(tmp_path / "jobs.sqlite3"))
+    events = asyncio.run(_collect(queue, "missing"))
+    assert [payload["status"] for _, payload in events] == [JOB_NOT_FOUND]
+
+
+def _queue_on(path) -> ReportJobQueue:
+    """One server worker's view of the shared job store."""
+    queue = ReportJobQueue(concurrency=1, store_backend="sqlite")
+    queue._store = SQLiteJobStore(str(path))
+    return queue
+
+
+def _fake_reports(monkeypatch, rows: int = 3, delay: float = 0.01):
+    async def run_report_in_pool(progress_callback=None, **params):
+        def work():
+            for i in range(rows):
+                time.sleep(delay)
+                progress_callback([{"Id": f"S{i}", "rt": 0.5, "factor": 30.0}])
+            return {"output": [{"Id": f"S{i}", "rt": 0.5, "factor": 30.0} for i in range(rows)], "charts": {}}
+
+        return await asyncio.to_thread(work)
+
+    monkeypatch.setattr("report_jobs.run_report_in_pool", run_report_in_pool)
+
+
+def test_other_worker_sees_and_streams_a_job(tmp_path, monkeypatch):
+    _fake_reports(monkeypatch)
+    path = tmp_path / "jobs.sqlite3"
+
+    async def scenario():
+        owner, other = _queue_on(path), _queue_on(path)
+        job = await owner.asubmit(method="engine")
+        assert (await other.aget(job.job_id)) is not None
+        events = [event async for event in other.stream(job.job_id)]
+        snapshot = await other.aget(job.job_id)
+        await owner.shutdown(grace_seconds=1)
+        return events, snapshot
+
+    events, snapshot = asyncio.run(scenario())
+    assert [name for name, _ in events] == ["status", "rows", "rows", "rows", "status"]
+    assert [payload["status"] for name, payload in events if name == "status"] == [JOB_RUNNING, JOB_SUCCEEDED]
+    assert snapshot.status == JOB_SUCCEEDED
+    assert [row["Id"] for row in snapshot.rows] == ["S0", "S1", "S2"]
+
+
+def test_locked_store_does_not_block_the_event_loop(tmp_path, monkeypatch):
+    _fake_reports(monkeypatch, rows=5, delay=0.0)
+    path = tmp_path / "jobs.sqlite3"
+    queue = _queue_on(path)
+    SQLiteJobStore(str(path)).close()  # create the schema before locking the file
+
+    # Another worker holds the write lock for a while
+    locker = sqlite3.connect(str(path), isolation_level=None, check_same_thread=False)
+    locker.execute("BEGIN IMMEDIATE")
+    release = threading.Timer(0.5, locker.execute, args=("COMMIT",))
+
+    async def scenario():
+        gaps = []
+
+        async def ticker():
+            last = time.perf_counter()
+            while True:
+                await asyncio.sleep(0.01)
+                now = time.perf_counter()
+                gaps.append(now - last)
+                last = now
+
+        ticks = asyncio.create_task(ticker())
+        release.start()
+        job = queue.submit(method="engine")
+        async for _ in queue.stream(job.job_id):
+            pass
+        await queue.shutdown(grace_seconds=1)  # waits for the queued writes
+        ticks.cancel()
+        return job, max(gaps)
+
+    job, worst_gap = asyncio.run(scenario())
+    locker.close()
+    assert worst_gap < 0.2
+    assert SQLiteJobStore(str(path)).status(job.job_id) == JOB_SUCCEEDED
@@ -0,0 +1,52 @@
+import io
+
+import numpy as np
+import pytest
+
+from seller_source import iter_seller_chunks, load_sellers
+
+
+def _load(data: bytes, fmt: str):
+    return load_sellers(io.BytesIO(data), fmt=fmt)
+
+
+def test_csv_loads_rates():
+    batch = _load(b"Id,rt\nA,0.5\nB,1\n", "csv")
+    assert batch.ids.tolist() == ["A", "B"]
+    assert batch.rt.tolist() == [0.5, 1.0]
+
+
+@pytest.mark.parametrize("rate", ["nan", "inf", "-inf", "1.5", "-0.1", "abc"])
+def test_csv_rejects_invalid_rate(rate):
+    with pytest.raises(ValueError, match="line 3"):
+        _load(f"Id,rt\nA,0.5\nB,{rate}\n".encode(), "csv")
+
+
+@pytest.mark.parametrize("rate", ['"nan"', '"inf"', "2", "-1"])
+def test_jsonl_rejects_invalid_rate(rate):
+    data = f'{{"Id": "A", "rt": 0.5}}\n{{"Id": "B", "rt": {rate}}}\n'.encode()
+    with pytest.raises(ValueError, match="line 2"):
+        _load(data, "jsonl")
+
+
+@pytest.mark.parametrize("rate", [float("nan"), float("inf"), 1.2, None])
+def test_parquet_rejects_invalid_rate(rate):
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    buffer = io.BytesIO()
+    pq.write_table(pa.table({"Id": ["A", "B", "C"], "rt": [0.5, 0.7, rate]}), buffer)
+    buffer.seek(0)
+    with pytest.raises(ValueError, match="row 2"):
+        list(iter_seller_chunks(buffer, fmt="parquet", chunk_size=2))
+
+
+def test_default_sellers_are_read_only():
+    batch = load_sellers()
+    assert np.isfinite(batch.rt).all()
+    with pytest.raises(ValueError):
+        batch.rt[0] = 0.0
+
+
+def test_duplicate_ids_are_rejected():
+    with pytest.raises(ValueError, match="Duplicate seller Ids: 'A'"):
+        _load(b"Id,rt\nA,0.5\nB,0.6\nA,0.7\n", "csv")